@@ -1,45 +1,40 @@
+from __future__ import annotations
 import ccxt
 import logging
+import threading
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from database import DatabaseManager
+from data_pkg.exchange_pool import ExchangePool
 from config import Config
 
 logger = logging.getLogger("account")
 
 class AccountManager:
-    def __init__(self, db: DatabaseManager):
+    NETWORKS = ("mainnet", "testnet")  # допустимые сети: список опроса не растёт от произвольных запросов
+
+    def __init__(self, db: DatabaseManager, pool: ExchangePool | None = None):
         self.db = db
+        self.pool = pool or ExchangePool()
+        # снимки балансов по сетям, обновляются фоновым поллером
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._snap_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.poll_sec = float(getattr(Config, "BALANCE_POLL_SEC", 60.0))
+        self.networks = [n for n in getattr(Config, "BALANCE_POLL_NETWORKS", ["testnet", "mainnet"]) if n in self.NETWORKS]
 
-    def _build_exchange(self, network: str, api_key: str, api_secret: str):
-        ex = getattr(ccxt, Config.EXCHANGE_ID)({
-            "enableRateLimit": True,
-            "timeout": 30000,
-            "apiKey": api_key,
-            "secret": api_secret,
-            "options": {
-                "defaultType": "spot",
-                "adjustForTimeDifference": True,
-            },
-        })
-        if network == "testnet":
-            try:
-                ex.set_sandbox_mode(True)
-            except Exception as e:
-                logger.warning("set_sandbox_mode failed: %s", e)
-        return ex
+    def _get_exchange(self, network: str, api_key: str, api_secret: str):
+        # долгоживущий экземпляр на (network, key); рынки — из дискового кэша
+        return self.pool.get(network, api_key, api_secret)
 
     def get_balance_usdt(self, network: str) -> Dict[str, Any]:
         keys = self.db.load_api_keys(network)
         if not keys:
             return {"connected": False, "balance_usdt": None, "error": "no_api_keys", "last_checked": datetime.utcnow().isoformat()}
-        ex = None
         try:
-            ex = self._build_exchange(network, keys["api_key"], keys["api_secret"])
-            try:
-                ex.load_markets()
-            except Exception as e:
-                logger.debug("load_markets issue (%s): %s", network, e)
+            ex = self._get_exchange(network, keys["api_key"], keys["api_secret"])
             bal = ex.fetch_balance()
             usdt_total = None
             total = bal.get("total") or {}
@@ -57,5 +52,59 @@ class AccountManager:
         except Exception as e:
             logger.warning("balance fetch error (%s): %s", network, e)
             return {"connected": False, "balance_usdt": None, "error": "network_error", "last_checked": datetime.utcnow().isoformat()}
-        finally:
-            ex = None
\ No newline at end of file
+
+    # -------- Фоновый опрос ----------
+    def refresh(self, network: str) -> Dict[str, Any]:
+        snap = self.get_balance_usdt(network)
+        with self._snap_lock:
+            self._snapshots[network] = snap
+        return snap
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            # сброс до прохода: request_refresh во время опроса даст ещё один проход, а не потеряется
+            self._wake.clear()
+            for net in list(self.networks):
+                if self._stop.is_set():
+                    break
+                try:
+                    self.refresh(net)
+                except Exception as e:
+                    logger.warning("balance poll failed (%s): %s", net, e)
+            self._wake.wait(self.poll_sec)
+
+    def start_poller(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="balance-poller", daemon=True)
+        self._thread.start()
+
+    def stop_poller(self):
+        self._stop.set()
+        self._wake.set()
+
+    def request_refresh(self, network: str | None = None) -> bool:
+        """Внеочередной опрос (например, после смены ключей); False — неизвестная сеть, ничего не делаем."""
+        if network and network not in self.NETWORKS:
+            return False
+        if network:
+            with self._snap_lock:
+                self._snapshots.pop(network, None)
+            if network not in self.networks:
+                self.networks.append(network)
+        self._wake.set()
+        return True
+
+    def get_balance_snapshot(self, network: str) -> Dict[str, Any]:
+        """
+        Последний снимок баланса без сетевых запросов.
+        Если снимка ещё нет — будим поллер и отдаём заглушку со статусом pending (неизвестная сеть — unknown_network).
+        """
+        with self._snap_lock:
+            snap = self._snapshots.get(network)
+        if snap is not None:
+            return snap
+        if not self.request_refresh(network):
+            return {"connected": False, "balance_usdt": None, "error": "unknown_network", "last_checked": None}
+        return {"connected": False, "balance_usdt": None, "error": "pending", "last_checked": None}
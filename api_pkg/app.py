@@ -6,6 +6,7 @@ from flask import Blueprint
 from config import Config
 from database import DatabaseManager
 from data_manager import CCXTDataManager
+from data_pkg.exchange_pool import ExchangePool
 from websocket_manager import WebsocketManager
 from model_manager import ModelManager
 from news_ingestor import NewsIngestor
@@ -17,7 +18,7 @@ api_bp = Blueprint("api", __name__)
 
 
 class Services:
-    def __init__(self, db, data, ws, models, news, bots, accounts, executor, loop):
+    def __init__(self, db, data, ws, models, news, bots, accounts, executor, loop, train_queue=None, log_sink=None, train_events=None):
         self.db: DatabaseManager = db
         self.data: CCXTDataManager = data
         self.ws: WebsocketManager | None = ws
@@ -27,6 +28,9 @@ class Services:
         self.accounts: AccountManager = accounts
         self.executor = executor
         self.loop: asyncio.AbstractEventLoop = loop
+        self.train_queue = train_queue
+        self.log_sink = log_sink
+        self.train_events = train_events
 
 
 def make_services(app):
@@ -43,13 +47,16 @@ def make_services(app):
         # не падаем, если конкретная реализация БД не SQLite или недоступна
         pass
 
-    data = CCXTDataManager(db)
+    # общий пул бирж: ленивое создание и кэш рынков на диске
+    pool = ExchangePool()
+    data = CCXTDataManager(db, pool=pool)
     ws = WebsocketManager() if getattr(Config, "ENABLE_WS", False) else None
     if ws:
         ws.start()
         ws.subscribe(getattr(Config, "SYMBOLS", []), getattr(Config, "TIMEFRAMES", []))
 
     models = ModelManager(db)
+    models.start_janitor()  # чистка вытесненных версий моделей
     news = NewsIngestor(db)
 
     loop = asyncio.new_event_loop()
@@ -62,7 +69,8 @@ def make_services(app):
         pass
 
     bots = BotManager(db, data, models, ws)
-    accounts = AccountManager(db)
+    accounts = AccountManager(db, pool=pool)
+    accounts.start_poller()
 
     # Ленивая импортировка, чтобы не тянуть concurrent в рантайм импорта
     from concurrent.futures import ThreadPoolExecutor
@@ -71,10 +79,23 @@ def make_services(app):
     services = Services(db, data, ws, models, news, bots, accounts, executor, loop)
     app.extensions["services"] = services
 
+    # Журнал/статусы обучения — пачками из фонового потока + шина событий для SSE
+    from .jobs.events import TrainingEventBus
+    from .jobs.log_sink import TrainingLogSink
+    services.train_events = TrainingEventBus()
+    services.log_sink = TrainingLogSink(db, bus=services.train_events)
+    services.log_sink.start()
+
+    # Очередь обучения (персистентна в training_jobs, свой пул воркеров)
+    from .jobs.queue import TrainingQueue
+    services.train_queue = TrainingQueue(services)
+    services.train_queue.start()
+
     # Регистрация маршрутов, разбитых по модулям
-    from .routes import common, training, analysis, explain, bots as bots_routes, market, news_trades, indicators_profiles, settings_pages
+    from .routes import common, training, training_stream, analysis, explain, bots as bots_routes, market, news_trades, indicators_profiles, settings_pages
     common.register(api_bp)
     training.register(api_bp)
+    training_stream.register(api_bp)
     analysis.register(api_bp)
     explain.register(api_bp)
     bots_routes.register(api_bp)
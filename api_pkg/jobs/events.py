@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+from config import Config
+
+
+class TrainingEventBus:
+    """
+    In-memory pub/sub событий обучения для SSE: status (переходы статуса/прогресса) и log (строки журнала).
+    - Кольцевой буфер последних TRAIN_EVENTS_MAX событий с монотонными id — возобновление по Last-Event-ID.
+    - Последнее состояние каждого задания (snapshot) — для первого кадра подписчика, без запросов к БД.
+    - Подписчик одного задания будится только событиями этого задания и читает только его события;
+      gap для него — вытеснение событий этого задания (per-job low-water mark), а не чужих.
+    Пишут очередь (queued) и TrainingLogSink (всё, что пишет раннер); читают SSE-маршруты.
+    """
+    _DROPPED_MAX = 1024   # заданий с запомненной отметкой вытеснения
+
+    def __init__(self, max_events: int | None = None):
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)   # подписчики всех заданий
+        self._events: deque = deque(maxlen=max(100, int(max_events or getattr(Config, "TRAIN_EVENTS_MAX", 2000))))
+        self._by_job: dict = {}                        # job_id -> deque событий задания (те же кортежи)
+        self._job_conds: dict = {}                     # job_id -> [Condition, число ждущих]
+        self._dropped: OrderedDict = OrderedDict()     # job_id -> max id вытесненного события задания
+        self._dropped_floor = 0                        # отметка забытых (вытесненных из _dropped) заданий
+        self._next_id = 1
+        self._jobs: OrderedDict = OrderedDict()   # job_id -> последнее состояние (LRU, 256)
+
+    def publish(self, kind: str, job_id: int, data: dict) -> int:
+        with self._cond:
+            eid = self._next_id
+            self._next_id += 1
+            jid = int(job_id)
+            payload = {"job_id": jid, **data}
+            if kind == "status":
+                st = self._jobs.setdefault(jid, {"id": jid})
+                st.update({k: v for k, v in data.items() if v is not None})
+                self._jobs.move_to_end(jid)
+                while len(self._jobs) > 256:
+                    self._jobs.popitem(last=False)
+                payload = {**st, "job_id": jid}
+            if len(self._events) == self._events.maxlen:
+                self._evict(self._events[0])
+            ev = (eid, kind, jid, payload)
+            self._events.append(ev)
+            self._by_job.setdefault(jid, deque()).append(ev)
+            self._cond.notify_all()
+            jc = self._job_conds.get(jid)
+            if jc is not None:
+                jc[0].notify_all()
+            return eid
+
+    def _evict(self, ev):
+        # под self._cond: самое старое событие уходит из общего буфера — и из буфера его задания
+        jid = ev[2]
+        buf = self._by_job[jid]
+        buf.popleft()
+        if not buf:
+            del self._by_job[jid]
+        self._dropped[jid] = ev[0]
+        self._dropped.move_to_end(jid)
+        while len(self._dropped) > self._DROPPED_MAX:
+            self._dropped_floor = max(self._dropped_floor, self._dropped.popitem(last=False)[1])
+
+    def last_id(self) -> int:
+        with self._cond:
+            return self._next_id - 1
+
+    def job_state(self, job_id: int) -> dict | None:
+        with self._cond:
+            st = self._jobs.get(int(job_id))
+            return dict(st) if st else None
+
+    @staticmethod
+    def _tail(buf, last_id: int) -> list:
+        # события с id > last_id — с конца буфера, без просмотра уже отданных
+        out = []
+        for e in reversed(buf):
+            if e[0] <= last_id:
+                break
+            out.append(e)
+        out.reverse()
+        return out
+
+    def _since(self, last_id: int, job_id: int | None):
+        # под self._cond; (events, gap): gap=True, если нужные события уже вытеснены из буфера
+        # или last_id из будущего — шина в памяти, после рестарта сервера id начинаются с 1
+        if job_id is None:
+            dropped = self._events[0][0] - 1 if self._events else 0
+            buf = self._events
+        else:
+            dropped = self._dropped.get(job_id, self._dropped_floor)
+            buf = self._by_job.get(job_id, ())
+        gap = last_id > self._next_id - 1 or (last_id > 0 and last_id < dropped)
+        return self._tail(buf, last_id), gap
+
+    def wait(self, last_id: int, job_id: int | None = None, timeout: float = 15.0):
+        """Ждать событий с id > last_id (не дольше timeout); возвращает (events, gap)."""
+        deadline = time.monotonic() + timeout
+        job_id = int(job_id) if job_id is not None else None
+        with self._cond:
+            cond = self._cond
+            if job_id is not None:
+                jc = self._job_conds.setdefault(job_id, [threading.Condition(self._lock), 0])
+                jc[1] += 1
+                cond = jc[0]
+            try:
+                while True:
+                    events, gap = self._since(last_id, job_id)
+                    if events or gap:
+                        return events, gap
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return [], False
+                    cond.wait(remaining)
+            finally:
+                if job_id is not None:
+                    jc[1] -= 1
+                    if jc[1] <= 0:
+                        self._job_conds.pop(job_id, None)
+
+    def snapshot(self, job_id: int | None = None) -> list[dict]:
+        with self._cond:
+            if job_id is not None:
+                st = self._jobs.get(int(job_id))
+                return [dict(st)] if st else []
+            return [dict(st) for st in self._jobs.values()]
+
+
+def sse_format(eid: int | None, kind: str, data) -> str:
+    head = f"id: {eid}\n" if eid is not None else ""
+    return f"{head}event: {kind}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
@@ -0,0 +1,187 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from config import Config
+from ..status_cache import job_log_path, write_status_cache
+from utils.retry import with_retries
+
+logger = logging.getLogger("train")
+
+_COUNTER_RE = re.compile(r"\d+/\d+")
+
+
+class TrainingLogSink:
+    """
+    Единый фоновый писатель журнала и статусов обучения.
+    - log()/status() только кладут запись в память (без файлов и SQLite) — дёшево из любых потоков;
+      при наличии шины (TrainingEventBus) запись сразу публикуется для SSE.
+    - Поток-флашер раз в LOG_SINK_FLUSH_SEC пишет пачку одной транзакцией (логи + последний статус каждого задания),
+      дописывает JSON-lines файлы заданий и status.json; терминальные статусы флашатся сразу.
+    - Память ограничена LOG_SINK_MAX_ROWS: при переполнении сначала отбрасываются DEBUG-записи, затем самые старые.
+    - Статусы в шину прореживаются (_should_publish): оптимизатор обновляет статус на каждую комбинацию,
+      и без этого тысячи status-событий вытесняли бы строки журнала из буфера SSE.
+    """
+    def __init__(self, db, flush_sec: float | None = None, max_rows: int | None = None, bus=None):
+        self.db = db
+        self.bus = bus  # TrainingEventBus: те же записи сразу уходят подписчикам SSE
+        self.flush_sec = float(flush_sec or getattr(Config, "LOG_SINK_FLUSH_SEC", 0.5))
+        self.max_rows = max(100, int(max_rows or getattr(Config, "LOG_SINK_MAX_ROWS", 5000)))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._rows: deque = deque()                 # (job_id, level, phase, message, data, ts_iso)
+        self._pending_status: dict[int, dict] = {}  # job_id -> последнее ещё не записанное состояние
+        self._status: OrderedDict = OrderedDict()   # job_id -> последнее известное состояние (для API), LRU
+        self._published: dict[int, tuple] = {}      # job_id -> (status, progress, message без счётчиков, time) в шине
+        self._min_step = float(getattr(Config, "TRAIN_EVENTS_MIN_PROGRESS", 0.005))
+        self._min_sec = float(getattr(Config, "TRAIN_EVENTS_MIN_SEC", 2.0))
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats = {"enqueued": 0, "dropped": 0, "flushed_rows": 0, "flushed_status": 0,
+                       "flushes": 0, "flush_errors": 0, "last_flush_ms": None}
+
+    # -------- постановка --------
+    def log(self, job_id: int, level: str, phase: str, message: str, data: dict | None = None):
+        row = (int(job_id), level or "INFO", phase, message, data or {}, datetime.utcnow().isoformat())
+        if self.bus is not None:
+            self.bus.publish("log", row[0], {"ts": row[5], "level": row[1], "phase": phase, "message": message, "data": row[4]})
+        with self._lock:
+            self._stats["enqueued"] += 1
+            if len(self._rows) >= self.max_rows:
+                self._stats["dropped"] += 1
+                if row[1] == "DEBUG":
+                    return
+                self._drop_one()
+            self._rows.append(row)
+            half_full = len(self._rows) >= self.max_rows // 2
+        if half_full:
+            self._wake.set()  # не ждать периода, пока буфер не переполнился
+
+    def _drop_one(self):
+        # под self._lock: первая DEBUG-запись, иначе самая старая
+        for i, r in enumerate(self._rows):
+            if r[1] == "DEBUG":
+                del self._rows[i]
+                return
+        self._rows.popleft()
+
+    def status(self, job_id: int, status: str | None = None, progress: float | None = None, message: str | None = None):
+        st = {"ts": time.time(), "status": status, "progress": None if progress is None else float(progress), "message": message}
+        with self._lock:
+            cur = self._status.setdefault(int(job_id), {})
+            self._status.move_to_end(int(job_id))
+            while len(self._status) > 256:
+                self._status.popitem(last=False)
+            pend = self._pending_status.setdefault(int(job_id), {})
+            for k, v in st.items():
+                if v is not None:
+                    cur[k] = v
+                    pend[k] = v
+            publish = self.bus is not None and self._should_publish(int(job_id), cur)
+        if publish:
+            # в шину — полное текущее состояние (пропущенные промежуточные обновления в него уже вошли)
+            self.bus.publish("status", int(job_id), {"status": cur.get("status"), "progress": cur.get("progress"), "message": cur.get("message")})
+        if status in ("finished", "error"):
+            self._wake.set()
+
+    def _should_publish(self, job_id: int, cur: dict) -> bool:
+        # под self._lock: смена статуса или этапа (сообщение без счётчиков i/N), шаг прогресса >= _min_step,
+        # либо прошло _min_sec с прошлой публикации; терминальные статусы — всегда
+        status, prog = cur.get("status"), float(cur.get("progress") or 0.0)
+        key = _COUNTER_RE.sub("", str(cur.get("message") or ""))
+        now = time.monotonic()
+        prev = self._published.get(job_id)
+        if (prev is None or status in ("finished", "error") or status != prev[0] or key != prev[2]
+                or abs(prog - prev[1]) >= self._min_step or now - prev[3] >= self._min_sec):
+            self._published[job_id] = (status, prog, key, now)
+            while len(self._published) > 256:
+                self._published.pop(next(iter(self._published)))
+            return True
+        return False
+
+    def get_status(self, job_id: int) -> dict | None:
+        with self._lock:
+            st = self._status.get(int(job_id))
+            return dict(st) if st else None
+
+    # -------- запись --------
+    def flush(self) -> bool:
+        """Записать всё накопленное (синхронно); при ошибке БД записи возвращаются в буфер."""
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._rows)
+                self._rows.clear()
+                statuses = self._pending_status
+                self._pending_status = {}
+            if not rows and not statuses:
+                return True
+            t0 = time.perf_counter()
+            # ts — момент записи в журнал, а не сброса (формат как у CURRENT_TIMESTAMP, с долями секунды)
+            db_rows = [(j, ts.replace("T", " "), lvl, ph, msg, json.dumps(d, ensure_ascii=False, default=str))
+                       for j, lvl, ph, msg, d, ts in rows]
+            ok = with_retries(lambda: self.db.write_training_batch(db_rows, statuses)) is True
+            if not ok:
+                with self._lock:
+                    self._stats["flush_errors"] += 1
+                    # вернуть в начало буфера с учётом лимита; свежие статусы важнее старых
+                    room = max(0, self.max_rows - len(self._rows))
+                    self._stats["dropped"] += max(0, len(rows) - room)
+                    self._rows.extendleft(reversed(rows[-room:] if room else []))
+                    for j, st in statuses.items():
+                        self._pending_status[j] = {**st, **self._pending_status.get(j, {})}
+                return False
+            self._write_files(rows, statuses)
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["flushed_rows"] += len(rows)
+                self._stats["flushed_status"] += len(statuses)
+                self._stats["last_flush_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+            return True
+
+    def _write_files(self, rows, statuses):
+        by_job: dict[int, list[str]] = {}
+        for j, lvl, ph, msg, d, ts in rows:
+            by_job.setdefault(j, []).append(json.dumps(
+                {"ts": ts, "level": lvl, "phase": ph, "message": msg, "data": d}, ensure_ascii=False, default=str))
+        for j, lines in by_job.items():
+            try:
+                with open(job_log_path(j), "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+            except OSError:
+                pass
+        for j in statuses:
+            st = self.get_status(j) or {}
+            write_status_cache(j, st.get("status"), st.get("progress") or 0.0, st.get("message"))
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_sec)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("training log sink flush failed: %s", e)
+        self.flush()
+
+    # -------- жизненный цикл --------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="training-log-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out.update({"buffered_rows": len(self._rows), "buffered_status": len(self._pending_status), "max_rows": self.max_rows})
+        return out
@@ -0,0 +1,152 @@
+import heapq
+import logging
+import threading
+
+from config import Config
+from ..status_cache import write_status_cache
+from utils.retry import with_retries
+
+logger = logging.getLogger("train")
+
+
+def _merge_tfs(a: list[str], b: list[str]) -> list[str]:
+    # объединение ТФ в каноническом порядке Config.TIMEFRAMES
+    order = {tf: i for i, tf in enumerate(getattr(Config, "TIMEFRAMES", []))}
+    return sorted(set(a) | set(b), key=lambda tf: (order.get(tf, 1_000), tf))
+
+
+class TrainingQueue:
+    """
+    Персистентная очередь обучения поверх таблицы training_jobs.
+    - Дубли по тикеру: новое задание сливается с ожидающим (queued) — объединение ТФ,
+      mode=full побеждает auto, optimize — логическое ИЛИ, годы и приоритет — максимум.
+    - Приоритеты: больший priority раньше, при равенстве — FIFO по id.
+    - Один тикер не обучается в двух воркерах одновременно; воркеров TRAIN_QUEUE_WORKERS.
+    - Рестарт: задания в статусе running (осиротевшие) возвращаются в очередь, queued подхватываются.
+    """
+    def __init__(self, sv, workers: int | None = None):
+        self.sv = sv
+        self.workers = max(1, int(workers or getattr(Config, "TRAIN_QUEUE_WORKERS", 2)))
+        self._cond = threading.Condition()
+        self._heap: list[tuple[int, int]] = []      # (-priority, job_id)
+        self._queued: dict[int, dict] = {}          # job_id -> запрос
+        self._running_symbols: set[str] = set()
+        self._threads: list[threading.Thread] = []
+        self._stop = False
+
+    # -------- жизненный цикл --------
+    def start(self):
+        self._recover()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"train-queue-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+
+    def _recover(self):
+        try:
+            jobs = self.sv.db.list_training_jobs(("queued", "running"))
+        except Exception as e:
+            logger.warning("training queue recover failed: %s", e)
+            return
+        with self._cond:
+            for j in jobs:
+                if j["status"] == "running":
+                    with_retries(lambda: self.sv.db.update_training_job(j["id"], status="queued", message="requeued after restart"))
+                    write_status_cache(j["id"], "queued", 0.0, "requeued after restart")
+                self._push(j["id"], j["symbol"], j["timeframes"], j["priority"], j["params"])
+                self._publish(j["id"], j["symbol"], j["timeframes"], "requeued after restart" if j["status"] == "running" else "queued")
+            if jobs:
+                logger.info("training queue recovered %s job(s)", len(jobs))
+
+    def _publish(self, job_id: int, symbol: str, timeframes: list[str], message: str):
+        bus = getattr(self.sv, "train_events", None)
+        if bus is not None:
+            bus.publish("status", job_id, {"symbol": symbol, "timeframes": list(timeframes), "status": "queued", "progress": 0.0, "message": message})
+
+    def _push(self, job_id: int, symbol: str, timeframes: list[str], priority: int, params: dict):
+        self._queued[job_id] = {"symbol": symbol, "timeframes": list(timeframes), "priority": int(priority), "params": dict(params or {})}
+        heapq.heappush(self._heap, (-int(priority), job_id))
+        self._cond.notify_all()
+
+    # -------- постановка --------
+    def submit(self, symbol: str, timeframes: list[str], years: int, mode: str, do_opt: bool, priority: int = 0) -> tuple[int, bool]:
+        """Возвращает (job_id, coalesced): coalesced=True, если запрос слит с уже ожидающим заданием."""
+        params = {"years": int(years), "mode": mode, "optimize": bool(do_opt)}
+        with self._cond:
+            for job_id, req in self._queued.items():
+                if req["symbol"] != symbol:
+                    continue
+                old = req["params"]
+                merged = {
+                    "years": max(int(old.get("years", years)), int(years)),
+                    "mode": "full" if "full" in (old.get("mode"), mode) else mode,
+                    "optimize": bool(old.get("optimize")) or bool(do_opt),
+                }
+                tfs = _merge_tfs(req["timeframes"], timeframes)
+                prio = max(req["priority"], int(priority))
+                with_retries(lambda: self.sv.db.update_training_job_request(job_id, tfs, prio, merged))
+                self._push(job_id, symbol, tfs, prio, merged)
+                self._publish(job_id, symbol, tfs, "queued")
+                return job_id, True
+            job_id = self.sv.db.create_training_job(symbol, timeframes, priority=priority, params=params)
+            write_status_cache(job_id, "queued", 0.0, "queued")
+            self._push(job_id, symbol, timeframes, priority, params)
+            self._publish(job_id, symbol, timeframes, "queued")
+            return job_id, False
+
+    def pending(self) -> list[dict]:
+        with self._cond:
+            items = sorted(((-r["priority"], jid), r) for jid, r in self._queued.items())
+            return [{"id": jid, **r} for (_p, jid), r in items]
+
+    # -------- исполнение --------
+    def _pop(self):
+        """Следующее задание по приоритету, тикер которого сейчас не обучается (под self._cond)."""
+        skipped = []
+        found = None
+        while self._heap:
+            neg_prio, job_id = heapq.heappop(self._heap)
+            req = self._queued.get(job_id)
+            if req is None or -neg_prio != req["priority"]:
+                continue  # устаревшая запись кучи
+            if req["symbol"] in self._running_symbols:
+                skipped.append((neg_prio, job_id))
+                continue
+            found = (job_id, self._queued.pop(job_id))
+            break
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return found
+
+    def _worker(self):
+        from .training_runner import run_training_job
+        while True:
+            with self._cond:
+                item = None
+                while not self._stop:
+                    item = self._pop()
+                    if item:
+                        break
+                    self._cond.wait()
+                if self._stop:
+                    return
+                job_id, req = item
+                self._running_symbols.add(req["symbol"])
+            p = req["params"]
+            try:
+                run_training_job(
+                    self.sv, job_id, req["symbol"], req["timeframes"],
+                    int(p.get("years", getattr(Config, "HISTORY_YEARS", 2))),
+                    p.get("mode", "auto"), bool(p.get("optimize", True)),
+                )
+            except Exception as e:
+                logger.exception("training job %s crashed: %s", job_id, e)
+            finally:
+                with self._cond:
+                    self._running_symbols.discard(req["symbol"])
+                    self._cond.notify_all()
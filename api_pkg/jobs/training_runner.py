@@ -5,29 +5,44 @@ from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 from flask import current_app
 
 from config import Config
-from ..status_cache import append_job_file, write_status_cache
-from precompute_cache import build_precompute
+from precompute_cache import build_precompute, ProbStore
 from optimizer import optimize_symbol_tf, GridDefaults, grid_size
 from backtest import run_backtest
+from backtest_pkg.portfolio import run_portfolio_backtest
+from backtest_pkg.robustness import trade_robustness
 from utils.retry import with_retries
+from utils.cpu_budget import cpu_budget
 
 
 def _sv():
     return current_app.extensions["services"]
 
 
-def start_training_job(sv, symbol: str, timeframes: list[str], years: int, mode: str, do_opt: bool) -> int:
-    job_id = sv.db.create_training_job(symbol, timeframes)
+def start_training_job(sv, symbol: str, timeframes: list[str], years: int, mode: str, do_opt: bool, priority: int = 0) -> int:
+    """Поставить обучение в очередь (sv.train_queue); дубли по тикеру сливаются в одно задание."""
+    job_id, _coalesced = sv.train_queue.submit(symbol, timeframes, years, mode, do_opt, priority=priority)
+    return job_id
+
+
+def _bt_slot(*args):
+    # бэктест — листовая задача: занимает слот общего CPU-бюджета
+    with cpu_budget().slot():
+        return run_backtest(*args)
+
+
+def run_training_job(sv, job_id: int, symbol: str, timeframes: list[str], years: int, mode: str, do_opt: bool) -> None:
+    """Выполнить задание обучения синхронно (вызывается воркером очереди)."""
+
+    # журнал и статусы — через фоновый sink (пачки раз в LOG_SINK_FLUSH_SEC, без блокировки записи в БД)
+    sink = sv.log_sink
 
     def add_log(level: str, phase: str, message: str, data: dict | None = None):
-        append_job_file(job_id, level, phase, message, data)
-        with_retries(lambda: sv.db.add_training_log(job_id, level, phase, message, data or {}))
+        sink.log(job_id, level, phase, message, data)
 
     def update_job(msg: str, prog: float, status: str = "running"):
-        write_status_cache(job_id, status, prog, msg)
-        with_retries(lambda: sv.db.update_training_job(job_id, status=status, progress=prog, message=msg))
+        sink.status(job_id, status, prog, msg)
 
-    def backtest_and_update_metrics_parallel(tfs: list[str]):
+    def backtest_and_update_metrics_parallel(tfs: list[str], store=None):
         # Параллельная предвычислительная стадия (до бэктеста)
         pre_workers = min(len(tfs), max(1, int(getattr(Config, "BACKTEST_MAX_WORKERS", 4))))
         add_log("INFO", "backtest", f"start post-backtest parallel for {tfs}", {"workers": pre_workers})
@@ -41,7 +56,8 @@ def start_training_job(sv, symbol: str, timeframes: list[str], years: int, mode:
         # Параллельно строим прекаш по TF
         def _do_precompute(tf: str):
             try:
-                pc = build_precompute(sv.db, sv.models, symbol, tf, limit=5000)
+                with cpu_budget().slot():
+                    pc = build_precompute(sv.db, sv.models, symbol, tf, limit=5000, store=store)
                 return tf, pc, None
             except Exception as e:
                 return tf, None, e
@@ -75,7 +91,7 @@ def start_training_job(sv, symbol: str, timeframes: list[str], years: int, mode:
             for tf in tfs:
                 tuned = sv.db.load_model_params(symbol, tf) or {}
                 futures[pool.submit(
-                    run_backtest,
+                    _bt_slot,
                     sv.db, sv.models, symbol, tf,
                     5000,
                     float(tuned.get("signal_threshold", getattr(Config, "SIGNAL_THRESHOLD", 0.6))),
@@ -118,7 +134,7 @@ def start_training_job(sv, symbol: str, timeframes: list[str], years: int, mode:
                     fut.cancel()
                     add_log("ERROR", "backtest", f"timeout, fallback sync {symbol} {tf}", {"timeout": timeout_sec})
                     try:
-                        bt = run_backtest(
+                        bt = _bt_slot(
                             sv.db, sv.models, symbol, tf,
                             5000,
                             float(tuned.get("signal_threshold", getattr(Config, "SIGNAL_THRESHOLD", 0.6))),
@@ -139,14 +155,26 @@ def start_training_job(sv, symbol: str, timeframes: list[str], years: int, mode:
         # Метрики по результатам
         for tf, tuned, bt in results:
             stats = (bt or {}).get("stats", {}) if bt else {}
+            # bootstrap сделок подобранной конфигурации: доверительные интервалы доходности/просадки/winrate
+            robust = None
+            if getattr(Config, "ROBUST_ENABLED", True):
+                try:
+                    robust = trade_robustness([t.get("pnl_percent", 0.0) for t in (bt or {}).get("trades", [])])
+                except Exception as e:
+                    add_log("ERROR", "backtest", f"robustness failed {symbol} {tf}: {e}")
+
+            # метрики — в ту версию, на которой считался бэктест (активной к записи могла стать другая)
+            version = ((precomps.get(tf) or {}).get("versions") or {}).get(tf)
+
             def _upd():
                 sv.db.update_model_metrics(symbol, tf, {
                     "bt_winrate": stats.get("winrate"),
                     "bt_trades_count": stats.get("count"),
+                    "bt_robust": robust,
                     "tuned_params": tuned or None
-                })
+                }, version=version)
             with_retries(_upd)
-            add_log("INFO", "backtest", f"done backtest {symbol} {tf}", {"stats": stats})
+            add_log("INFO", "backtest", f"done backtest {symbol} {tf}", {"stats": stats, "robust": robust})
 
     def task():
         try:
@@ -176,39 +204,53 @@ def start_training_job(sv, symbol: str, timeframes: list[str], years: int, mode:
                         frac = (sum(tf_done.values()) / max(1, sum(totals.values())))
                         p = 0.80 + 0.17 * min(1.0, frac)
                         p = min(0.97, max(0.80, p))
-                        write_status_cache(job_id, "running", p, f"optimizing {tf} {tf_done[tf]}/{totals.get(tf, total)}")
+                        update_job(f"optimizing {tf} {tf_done[tf]}/{totals.get(tf, total)}", p)
                         if ev.get("phase") == "final" or i % 50 == 0 or i == total:
                             add_log("DEBUG", "optimize", f"tf {tf} step {i}/{total}", {"best": ev.get("best")})
 
-                add_log("INFO", "optimize", f"opt start {symbol} tfs={timeframes}")
-                tf_workers = min(len(timeframes), max(1, int(getattr(Config, "OPTIMIZE_TF_MAX_WORKERS", 4))))
-                with ThreadPoolExecutor(max_workers=tf_workers) as pool:
-                    futures = {pool.submit(optimize_symbol_tf, sv.db, sv.models, symbol, tf, on_progress=on_prog): tf for tf in timeframes}
-                    for fut in as_completed(futures):
-                        tf = futures[fut]
-                        try:
-                            fut.result()
-                            add_log("INFO", "optimize", f"tf {tf} finished")
-                        except Exception as e:
-                            add_log("ERROR", "optimize", f"tf {tf} failed: {e}")
+                # вероятности каждой модели считаются один раз на задание (окно — максимум из стадий)
+                store_limit = max(5000, int(getattr(Config, "BACKTEST_OPTIM_LIMIT", 2000)))
+                with ProbStore(sv.db, sv.models, symbol, limit=store_limit) as store:
+                    add_log("INFO", "optimize", f"opt start {symbol} tfs={timeframes}")
+                    tf_workers = min(len(timeframes), max(1, int(getattr(Config, "OPTIMIZE_TF_MAX_WORKERS", 4))))
+                    with ThreadPoolExecutor(max_workers=tf_workers) as pool:
+                        futures = {pool.submit(optimize_symbol_tf, sv.db, sv.models, symbol, tf, on_progress=on_prog, store=store): tf for tf in timeframes}
+                        for fut in as_completed(futures):
+                            tf = futures[fut]
+                            try:
+                                fut.result()
+                                add_log("INFO", "optimize", f"tf {tf} finished")
+                            except Exception as e:
+                                add_log("ERROR", "optimize", f"tf {tf} failed: {e}")
 
-                add_log("INFO", "optimize", f"opt complete {symbol}")
-                write_status_cache(job_id, "running", 0.97, "backtesting with tuned params")
+                    add_log("INFO", "optimize", f"opt complete {symbol}")
+                    update_job("backtesting with tuned params", 0.97)
 
-                backtest_and_update_metrics_parallel(timeframes)
+                    backtest_and_update_metrics_parallel(timeframes, store=store)
+                    add_log("DEBUG", "backtest", "probability store", store.stats())
 
-                write_status_cache(job_id, "finished", 1.0, "Completed")
-                with_retries(lambda: sv.db.update_training_job(job_id, status="finished", progress=1.0, message="Completed"), tries=4)
+                    # портфель по всем тикерам: свежие вероятности этого тикера — из store
+                    ptf = getattr(Config, "PORTFOLIO_TF", "1h")
+                    if getattr(Config, "PORTFOLIO_AFTER_TRAIN", True) and ptf in timeframes:
+                        try:
+                            p_limit = int(getattr(Config, "PORTFOLIO_LIMIT", 2000))
+                            port = run_portfolio_backtest(sv.db, sv.models, ptf, limit=p_limit,
+                                                          precomputes={symbol: store.view(ptf, p_limit)})
+                            add_log("INFO", "portfolio", f"portfolio {ptf} after {symbol}", port["stats"])
+                        except Exception as e:
+                            add_log("ERROR", "portfolio", f"portfolio backtest failed: {e}")
+
+                update_job("Completed", 1.0, "finished")
                 add_log("INFO", "final", "training pipeline completed", {"symbol": symbol, "tfs": timeframes})
             else:
-                write_status_cache(job_id, "finished", 1.0, "Completed")
-                with_retries(lambda: sv.db.update_training_job(job_id, status="finished", progress=1.0, message="Completed"), tries=4)
+                update_job("Completed", 1.0, "finished")
                 add_log("INFO", "final", "training completed (optimize disabled)", {"symbol": symbol, "tfs": timeframes})
 
         except Exception as e:
-            write_status_cache(job_id, "error", 0.0, str(e))
-            with_retries(lambda: sv.db.update_training_job(job_id, status="error", message=str(e)), tries=3, delay=0.2, locked_only=False)
-            append_job_file(job_id, "ERROR", "error", f"train task error: {e}")
+            update_job(str(e), 0.0, "error")
+            add_log("ERROR", "error", f"train task error: {e}")
+        finally:
+            # финальное состояние задания должно быть в БД до того, как воркер очереди возьмёт следующее
+            sink.flush()
 
-    sv.executor.submit(task)
-    return job_id
+    task()
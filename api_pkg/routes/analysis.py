@@ -7,8 +7,12 @@ from analysis_utils import compute_indicators_block, detect_candle_patterns, det
 from indicator_settings import get_indicator_settings, sanitize_indicator_settings, default_indicator_settings
 from indicators_panels import build_indicator_panels, build_signal_panel
 from precompute_cache import build_precompute
+from precompute_pkg.align import probs_at_row
 from signal_engine import aggregate_signal
 from backtest import run_backtest
+from backtest_pkg.cache import get_backtest_cache
+from backtest_pkg.streaming import run_backtest_streaming
+from backtest_pkg.portfolio import run_portfolio_backtest
 
 
 def _sv():
@@ -26,6 +30,60 @@ def register(bp):
             limit = 500
         return render_template("analysis.html", symbol=symbol, timeframe=timeframe, limit=limit)
 
+    @bp.route("/backtest/cache", methods=["GET"])
+    def backtest_cache_stats():
+        # счётчики кэша бэктестов: hits/misses/evictions, занятый объём
+        return jsonify({"data": get_backtest_cache().stats()})
+
+    @bp.route("/backtest/full", methods=["GET"])
+    def backtest_full():
+        # бэктест по всей истории чанками: статистика по периодам (period=D/W/M/Q/Y), since/until — опционально
+        sv = _sv()
+        symbol = request.args.get("symbol")
+        timeframe = request.args.get("timeframe", "15m")
+        if not symbol:
+            return jsonify({"error": "symbol is required"}), 400
+        if timeframe not in getattr(Config, "TIMEFRAMES", []):
+            return jsonify({"error": f"timeframe must be one of {getattr(Config, 'TIMEFRAMES', [])}"}), 400
+        tuned = sv.db.load_model_params(symbol, timeframe) or {}
+        sp = sv.db.get_signal_profiles()
+        active_params = sp["profiles"].get(sp["active"], {})
+        try:
+            res = run_backtest_streaming(
+                sv.db, sv.models, symbol, timeframe,
+                signal_threshold=float(tuned.get("signal_threshold", getattr(Config, "SIGNAL_THRESHOLD", 0.6))),
+                hold_margin=float(tuned.get("hold_margin", getattr(Config, "SIGNAL_HOLD_MARGIN", 0.05))),
+                min_confirmed_higher=int(tuned.get("min_confirmed_higher", 0)),
+                sl_atr_mult=float(active_params.get("sl_atr_mult", getattr(Config, "BT_SL_ATR", 1.0))),
+                tp_atr_mult=float(active_params.get("tp_atr_mult", getattr(Config, "BT_TP_ATR", 2.0))),
+                max_bars_in_trade=int(active_params.get("max_bars_in_trade", getattr(Config, "BT_MAX_BARS", 200))),
+                since=request.args.get("since") or None,
+                until=request.args.get("until") or None,
+                period=request.args.get("period") or None,
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"data": res})
+
+    @bp.route("/backtest/portfolio", methods=["GET"])
+    def backtest_portfolio():
+        # портфель по SYMBOLS: общий капитал, лимит позиций, кривая капитала
+        sv = _sv()
+        timeframe = request.args.get("timeframe") or getattr(Config, "PORTFOLIO_TF", "1h")
+        if timeframe not in getattr(Config, "TIMEFRAMES", []):
+            return jsonify({"error": f"timeframe must be one of {getattr(Config, 'TIMEFRAMES', [])}"}), 400
+        symbols = [s for s in (request.args.get("symbols") or "").split(",") if s.strip()] or None
+        try:
+            res = run_portfolio_backtest(
+                sv.db, sv.models, timeframe, symbols=symbols,
+                limit=int(request.args["limit"]) if request.args.get("limit") else None,
+                capital=float(request.args["capital"]) if request.args.get("capital") else None,
+                max_positions=int(request.args["max_positions"]) if request.args.get("max_positions") else None,
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"data": res})
+
     @bp.route("/analysis", methods=["GET"])
     def analysis():
         sv = _sv()
@@ -77,24 +135,8 @@ def register(bp):
         try:
             precomp = build_precompute(sv.db, sv.models, symbol, timeframe, limit=max(600, limit))
             if precomp is not None:
-                X_idx = precomp["X_idx"]
-                ts_last = X_idx[-1]
-                probs_by_tf = {}
-                base = precomp["base"]
-                probs_by_tf[timeframe] = {
-                    "buy": float(base["pb_buy"][-1]),
-                    "hold": float(base["pb_hold"][-1]),
-                    "sell": float(base["pb_sell"][-1]),
-                }
-                for tf, obj in precomp["higher"].items():
-                    idx_h = obj["idx"]
-                    pos = idx_h.searchsorted(ts_last, side="right") - 1
-                    if pos >= 0:
-                        probs_by_tf[tf] = {
-                            "buy": float(obj["pb_buy"][pos]),
-                            "hold": float(obj["pb_hold"][pos]),
-                            "sell": float(obj["pb_sell"][pos]),
-                        }
+                # последний бар: старшие ТФ — по матрице выравнивания (закрытые к его закрытию)
+                probs_by_tf = probs_at_row(precomp, timeframe, -1)
                 agg = aggregate_signal(probs_by_tf, timeframe, getattr(Config, "HIERARCHY_WEIGHTS", {}), lookback_scores=None)
                 prediction = {
                     "consensus": (1 if agg["score"] > 0 else (-1 if agg["score"] < 0 else 0)),
@@ -145,21 +187,9 @@ def register(bp):
             lookback_min = max(windows_min) if windows_min else 0
             if lookback_min > 0:
                 since_news = end_ts - timedelta(minutes=int(lookback_min))
-                df_news = sv.db.news_since(since_news, limit=2000)
+                # диапазон по индексу published_at + фильтр по тикеру через news_symbols
+                df_news = sv.db.news_between(since_news, end_ts, symbol=symbol)
                 if df_news is not None and not df_news.empty:
-                    df_news = df_news[df_news["published_at"] <= end_ts]
-                    base = (symbol.split("/")[0] if "/" in symbol else symbol).upper()
-
-                    def match_sym(symcsv: str) -> bool:
-                        if not symcsv:
-                            return True
-                        try:
-                            items = [x.strip().upper() for x in str(symcsv).split(",") if x.strip()]
-                            return (base in items)
-                        except Exception:
-                            return True
-
-                    df_news = df_news[df_news["symbols"].apply(match_sym)]
                     news_used = [{
                         "time": pd.to_datetime(r["published_at"]).isoformat() if pd.notna(r["published_at"]) else None,
                         "provider": r.get("provider"),
@@ -167,7 +197,7 @@ def register(bp):
                         "url": r.get("url"),
                         "sentiment": float(r.get("sentiment")) if r.get("sentiment") is not None else None,
                         "symbols": r.get("symbols") or ""
-                    } for _, r in df_news.sort_values("published_at", ascending=False).iterrows()]
+                    } for _, r in df_news.sort_values("published_at", ascending=False).head(2000).iterrows()]
         except Exception:
             news_used = []
 
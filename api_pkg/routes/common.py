@@ -43,24 +43,25 @@ def register(bp):
         if not api_key or not api_secret:
             return jsonify({"error": "api_key/api_secret required"}), 400
         sv.db.save_api_keys(network, api_key, api_secret)
+        sv.accounts.request_refresh(network)
         return jsonify({"status": "ok"})
 
     @bp.route("/account", methods=["GET"])
     def account():
         sv = _sv()
         network = request.args.get("network", "testnet")
-        acc = sv.accounts.get_balance_usdt(network)
-        trades = sv.db.get_trades(limit=1000, network=network)
-        open_count = len([t for t in trades if t["status"] == "open"])
-        closed = [t for t in trades if t["status"] == "closed"]
-        pnl = sum([float(t["pnl_percent"] or 0.0) for t in closed]) if closed else 0.0
+        if network not in sv.accounts.NETWORKS:
+            return jsonify({"error": "network must be mainnet|testnet"}), 400
+        # баланс — из снимка фонового поллера, сделки — SQL-агрегаты
+        acc = sv.accounts.get_balance_snapshot(network)
+        summary = sv.db.get_trades_summary(network)
         resp = {
             "network": network,
             "connected": bool(acc.get("connected")),
             "balance_usdt": acc.get("balance_usdt"),
-            "open_positions": open_count,
-            "closed_trades": len(closed),
-            "total_pnl_percent": pnl,
+            "open_positions": summary["open_count"],
+            "closed_trades": summary["closed_count"],
+            "total_pnl_percent": summary["total_pnl_percent"],
             "last_checked": acc.get("last_checked"),
             "error": acc.get("error"),
         }
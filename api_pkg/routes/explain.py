@@ -3,7 +3,7 @@ import pandas as pd
 from flask import jsonify, request, current_app
 
 from config import Config
-from precompute_cache import build_precompute
+from precompute_pkg.point import point_probs
 from signal_engine import aggregate_signal, decide_entry, _tf_score_from_pb
 from indicators_panels import _rsi, _stoch, _macd, _ema
 
@@ -26,32 +26,18 @@ def register(bp):
         except Exception:
             return jsonify({"ok": False, "message": "invalid time format"}), 400
 
-        precomp = build_precompute(sv.db, sv.models, symbol, timeframe, limit=5000)
-        if precomp is None:
-            return jsonify({"ok": False, "message": "no precompute/model"}), 400
-
-        X_idx = precomp["X_idx"]
-        pos = X_idx.searchsorted(t_dt, side="right") - 1
-        if pos < 0:
+        # только запрошенный бар: окно разогрева по каждому ТФ, вероятности — из LRU по версии модели
+        point = point_probs(sv.db, sv.models, symbol, timeframe, t_dt)
+        if point is None:
+            if not (sv.db.load_model(symbol, timeframe) or {}).get("model"):
+                return jsonify({"ok": False, "message": "no precompute/model"}), 400
             return jsonify({"ok": False, "message": "time outside range"}), 400
 
-        ts = X_idx[pos]
-        df_use = precomp["df_use"]
-        close_price = float(df_use.loc[ts, "close"])
-        base = precomp["base"]
-        higher = precomp["higher"]
-        probs_by_tf = {timeframe: {
-            "buy": float(base["pb_buy"][pos]), "hold": float(base["pb_hold"][pos]), "sell": float(base["pb_sell"][pos]),
-        }}
-        for tf, obj in higher.items():
-            idx_h = obj["idx"]
-            hpos = idx_h.searchsorted(ts, side="right") - 1
-            if hpos >= 0:
-                probs_by_tf[tf] = {
-                    "buy": float(obj["pb_buy"][hpos]),
-                    "hold": float(obj["pb_hold"][hpos]),
-                    "sell": float(obj["pb_sell"][hpos]),
-                }
+        ts = point["ts"]
+        df_use = point["df"]
+        close_price = float(df_use["close"].iloc[-1])
+        # старшие ТФ — бар, закрытый к закрытию базового (как в align.py)
+        probs_by_tf = point["probs"]
 
         weights_cfg = getattr(Config, "HIERARCHY_WEIGHTS", {})
         agg = aggregate_signal(probs_by_tf, timeframe, weights_cfg, lookback_scores=None)
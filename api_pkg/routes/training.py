@@ -4,7 +4,7 @@ from flask import jsonify, request, current_app, render_template
 
 from config import Config
 from ..status_cache import read_status_cache
-from ..jobs.training_runner import start_training_job
+from utils.cpu_budget import cpu_budget
 
 
 def _sv():
@@ -23,8 +23,47 @@ def register(bp):
         years = int(body.get("years", getattr(Config, "HISTORY_YEARS", 2)))
         mode = body.get("mode", "auto")
         do_opt = bool(body.get("optimize", getattr(Config, "OPTIMIZE_AFTER_TRAIN", True)))
-        job_id = start_training_job(sv, symbol, timeframes, years, mode, do_opt)
-        return jsonify({"job_id": job_id, "status": "queued", "mode": mode, "optimize": do_opt})
+        try:
+            priority = int(body.get("priority", 0))
+        except Exception:
+            priority = 0
+        job_id, coalesced = sv.train_queue.submit(symbol, timeframes, years, mode, do_opt, priority=priority)
+        return jsonify({"job_id": job_id, "status": "queued", "mode": mode, "optimize": do_opt, "coalesced": coalesced})
+
+    @bp.route("/training/queue", methods=["GET"])
+    def training_queue():
+        sv = _sv()
+        return jsonify({"data": {"pending": sv.train_queue.pending(), "cpu_budget": cpu_budget().total, "cpu_in_use": cpu_budget().in_use()}})
+
+    @bp.route("/training/log_sink", methods=["GET"])
+    def training_log_sink():
+        # счётчики фонового писателя журнала: enqueued/dropped/flushed_*/flush_errors
+        return jsonify({"data": _sv().log_sink.stats()})
+
+    @bp.route("/models/versions", methods=["GET"])
+    def model_versions():
+        sv = _sv()
+        symbol = request.args.get("symbol")
+        timeframe = request.args.get("timeframe")
+        if not symbol or not timeframe:
+            return jsonify({"error": "symbol and timeframe are required"}), 400
+        return jsonify({"data": sv.db.list_model_versions(symbol, timeframe)})
+
+    @bp.route("/models/activate", methods=["POST"])
+    def model_activate():
+        # откат/переключение на сохранённую версию (атомарно)
+        sv = _sv()
+        body = request.get_json(force=True) or {}
+        symbol, timeframe = body.get("symbol"), body.get("timeframe")
+        try:
+            version = int(body.get("version"))
+        except Exception:
+            return jsonify({"error": "version must be int"}), 400
+        if not symbol or not timeframe:
+            return jsonify({"error": "symbol and timeframe are required"}), 400
+        if not sv.db.activate_model_version(symbol, timeframe, version):
+            return jsonify({"error": "version not found"}), 404
+        return jsonify({"status": "ok", "version": version})
 
     @bp.route("/training/<int:job_id>", methods=["GET"])
     def training_status(job_id: int):
@@ -32,7 +71,7 @@ def register(bp):
         job = sv.db.get_training_job(job_id)
         if not job:
             return jsonify({"error": "not found"}), 404
-        sc = read_status_cache(job_id)
+        sc = sv.log_sink.get_status(job_id) or read_status_cache(job_id)
         if sc:
             job["status"] = sc.get("status", job.get("status"))
             job["progress"] = sc.get("progress", job.get("progress"))
@@ -45,7 +84,7 @@ def register(bp):
         job = sv.db.get_active_training_job()
         if not job:
             return jsonify({"data": None})
-        sc = read_status_cache(job["id"])
+        sc = sv.log_sink.get_status(job["id"]) or read_status_cache(job["id"])
         if sc:
             job["status"] = sc.get("status", job.get("status"))
             job["progress"] = sc.get("progress", job.get("progress"))
@@ -0,0 +1,61 @@
+import time
+from flask import Response, request, current_app, stream_with_context
+
+from config import Config
+from ..jobs.events import sse_format
+
+
+def _sv():
+    return current_app.extensions["services"]
+
+
+def _last_event_id() -> int:
+    raw = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    try:
+        return max(0, int(raw)) if raw is not None else 0
+    except Exception:
+        return 0
+
+
+def _stream(bus, job_id: int | None):
+    """
+    SSE-поток событий обучения из шины в памяти (без запросов к БД).
+    Первый коннект: snapshot состояний + буферизованные события; переподключение — события после Last-Event-ID,
+    а если они уже вытеснены из буфера — reset со snapshot (клиент один раз дочитывает журнал через REST).
+    Соединение живёт SSE_MAX_SEC, затем браузер переподключается сам (retry).
+    """
+    last_id = _last_event_id()
+    max_sec = float(getattr(Config, "SSE_MAX_SEC", 300))
+
+    def gen():
+        nonlocal last_id
+        yield "retry: 3000\n\n"
+        if last_id == 0:
+            yield sse_format(None, "snapshot", {"jobs": bus.snapshot(job_id), "last_id": bus.last_id()})
+        started = time.monotonic()
+        while time.monotonic() - started < max_sec:
+            events, gap = bus.wait(last_id, job_id=job_id, timeout=min(15.0, max(0.1, max_sec - (time.monotonic() - started))))
+            if gap:
+                last_id = bus.last_id()
+                yield sse_format(last_id, "reset", {"jobs": bus.snapshot(job_id), "last_id": last_id})
+                continue
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for eid, kind, _jid, payload in events:
+                yield sse_format(eid, kind, payload)
+                last_id = eid
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(gen()), mimetype="text/event-stream", headers=headers)
+
+
+def register(bp):
+    @bp.route("/training/<int:job_id>/stream", methods=["GET"])
+    def training_stream(job_id: int):
+        return _stream(_sv().train_events, job_id)
+
+    @bp.route("/training/active/stream", methods=["GET"])
+    def training_active_stream():
+        # все задания: клиент сам выбирает активное по событиям status
+        return _stream(_sv().train_events, None)
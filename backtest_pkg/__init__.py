@@ -1 +1,5 @@
-from .runner import run_backtest
\ No newline at end of file
+from .runner import run_backtest
+from .cache import BacktestCache, get_backtest_cache
+from .streaming import run_backtest_streaming
+from .portfolio import run_portfolio_backtest
+from .robustness import trade_robustness
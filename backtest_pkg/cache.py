@@ -0,0 +1,112 @@
+from __future__ import annotations
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from config import Config
+
+# грубая оценка размера записи: dict сделки/маркера со строками ISO — порядка 0.5 КБ, точка кривой капитала — ~0.1 КБ
+_ROW_BYTES = 512
+_POINT_BYTES = 128
+_ENTRY_BYTES = 256
+
+
+def _copy(result: Dict[str, Any]) -> Dict[str, Any]:
+    # сделки/маркеры/статистика — плоские dict, кривая капитала — dict списков:
+    # хватает копии на уровень строк (deepcopy заметно дороже)
+    return {k: ([dict(r) for r in v] if isinstance(v, list)
+                else {kk: (list(vv) if isinstance(vv, list) else vv) for kk, vv in v.items()} if isinstance(v, dict) else v)
+            for k, v in result.items()}
+
+
+def _entry_size(result: Dict[str, Any]) -> int:
+    points = len((result.get("equity") or {}).get("time") or [])
+    return _ENTRY_BYTES + _ROW_BYTES * (len(result.get("trades") or []) + len(result.get("markers") or [])) + _POINT_BYTES * points
+
+
+class BacktestCache:
+    """
+    Ограниченный по объёму LRU результатов бэктеста (trades, markers, stats).
+    Ключ — (symbol, TF, версии моделей всех ТФ, последний бар и его close, limit, все параметры
+    и настройки, влияющие на симуляцию): новая свеча или новая активная модель — новый ключ,
+    поэтому между закрытиями свечей одинаковые бэктесты не пересчитываются.
+    """
+    def __init__(self, max_bytes: int | None = None):
+        mb = float(getattr(Config, "BACKTEST_CACHE_MB", 32))
+        self.max_bytes = int(max_bytes if max_bytes is not None else mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[tuple, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "puts": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(symbol: str, timeframe: str, versions: Dict[str, Optional[int]], last_bar, last_close: float,
+                 limit: int, params: Tuple) -> Optional[tuple]:
+        """None — ключ ненадёжен (модель без версии), такой бэктест не кэшируется."""
+        if not versions or versions.get(timeframe) is None:
+            return None
+        env = (
+            bool(getattr(Config, "EXIT_ON_FLIP", False)),
+            int(getattr(Config, "BT_ATR_PERIOD", 14)),
+            json.dumps(getattr(Config, "HIERARCHY_WEIGHTS", {}), sort_keys=True),
+            tuple(getattr(Config, "TIMEFRAMES", ())),
+        )
+        vers = tuple(sorted((tf, v) for tf, v in versions.items()))
+        return (symbol, timeframe, vers, str(last_bar), float(last_close), int(limit), tuple(params), env)
+
+    def get(self, key) -> Optional[Dict[str, Any]]:
+        if key is None:
+            return None
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is None:
+                self._stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            result = hit[0]
+        # наружу — копия: вызывающие могут дописывать маркеры/сделки
+        return _copy(result)
+
+    def put(self, key, result: Dict[str, Any]) -> None:
+        if key is None or self.max_bytes <= 0:
+            return
+        size = _entry_size(result)
+        if size > self.max_bytes:
+            return
+        stored = _copy(result)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (stored, size)
+            self._bytes += size
+            self._stats["puts"] += 1
+            while self._bytes > self.max_bytes and self._items:
+                _k, (_v, sz) = self._items.popitem(last=False)
+                self._bytes -= sz
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._stats["hits"] + self._stats["misses"]
+            return {**self._stats, "entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hit_rate": round(self._stats["hits"] / total, 4) if total else None}
+
+
+_DEFAULT: Optional[BacktestCache] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_backtest_cache() -> BacktestCache:
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = BacktestCache()
+        return _DEFAULT
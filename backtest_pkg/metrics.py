@@ -0,0 +1,106 @@
+from __future__ import annotations
+import math
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_pkg.ccxt_manager import TF_TO_MS
+
+_YEAR_MS = 365 * 24 * 3600 * 1000
+_PF_CAP = 100.0  # profit factor без убыточных сделок (inf не сериализуется в JSON)
+
+# цели оптимизации: ключ stats -> знак (1 — больше лучше, -1 — меньше лучше)
+OBJECTIVES: Dict[str, int] = {
+    "winrate": 1,
+    "pnl_sum": 1,
+    "expectancy": 1,
+    "profit_factor": 1,
+    "sharpe": 1,
+    "sortino": 1,
+    "return_pct": 1,
+    "max_drawdown": -1,
+}
+
+
+def objective_score(stats: Dict[str, Any], objective: str) -> Optional[float]:
+    """Значение цели для ранжирования (больше — лучше); None — не оценивается."""
+    sign = OBJECTIVES.get(objective)
+    v = stats.get(objective)
+    if sign is None or v is None:
+        return None
+    # без сделок метрики кроме winrate вырождены (нулевая просадка «лучшая»)
+    if objective != "winrate" and int(stats.get("count") or 0) == 0:
+        return None
+    return sign * float(v)
+
+
+def _ratio(num: float, den: float) -> float:
+    return float(num / den) if den > 0 and math.isfinite(den) else 0.0
+
+
+def backtest_metrics(
+    bars: pd.DatetimeIndex,
+    close: np.ndarray,
+    entry_time: np.ndarray,
+    exit_time: np.ndarray,
+    side: np.ndarray,
+    exit_price: np.ndarray,
+    pnl_percent: np.ndarray,
+    timeframe: str,
+) -> Tuple[Dict[str, float], np.ndarray]:
+    """
+    Метрики бэктеста по списку сделок одними векторными операциями.
+    Доходности баров: позиция (+1/-1) × изменение close, на баре выхода — до цены выхода (SL/TP).
+    Возвращает (метрики, кривая капитала по барам окна; старт — 1.0).
+    """
+    n = len(bars)
+    close = pd.Series(close, dtype=float).ffill().bfill().to_numpy()
+    pnl = np.asarray(pnl_percent, dtype=float)
+    count = int(pnl.size)
+
+    r = np.zeros(n)
+    pos = np.zeros(n)
+    if count and n > 1:
+        ent = np.clip(bars.get_indexer(pd.DatetimeIndex(entry_time)), 0, n - 1)
+        ext = bars.get_indexer(pd.DatetimeIndex(exit_time))
+        ext = np.where(ext < 0, n - 1, ext)
+        s = np.where(np.asarray(side) == "BUY", 1.0, -1.0)
+        live = ext > ent
+        ent, ext, s, px = ent[live], ext[live], s[live], np.asarray(exit_price, dtype=float)[live]
+        # позиция на барах (entry, exit]: разностный массив + cumsum
+        delta = np.zeros(n + 1)
+        np.add.at(delta, ent + 1, s)
+        np.add.at(delta, ext + 1, -s)
+        pos = np.cumsum(delta[:n])
+        r[1:] = pos[1:] * (close[1:] / close[:-1] - 1.0)
+        r[ext] = s * (px / close[ext - 1] - 1.0)
+
+    equity = np.cumprod(1.0 + r)
+    peak = np.maximum.accumulate(equity) if n else equity
+    dd = float(np.max((peak - equity) / peak) * 100.0) if n else 0.0
+
+    bars_per_year = _YEAR_MS / float(TF_TO_MS.get(timeframe, 3600 * 1000))
+    mean = float(r.mean()) if n else 0.0
+    std = float(r.std(ddof=1)) if n > 1 else 0.0
+    downside = float(np.sqrt(np.mean(np.minimum(r, 0.0) ** 2))) if n else 0.0
+    ann = math.sqrt(bars_per_year)
+
+    wins = pnl[pnl > 0.0]
+    losses = pnl[pnl < 0.0]
+    gross_win, gross_loss = float(wins.sum()), float(-losses.sum())
+    stats = {
+        "count": count,
+        "winrate": float(wins.size) / count * 100.0 if count else 0.0,
+        "pnl_sum": float(pnl.sum()),
+        "expectancy": float(pnl.mean()) if count else 0.0,
+        "profit_factor": min(_PF_CAP, _ratio(gross_win, gross_loss)) if gross_loss > 0 else (_PF_CAP if gross_win > 0 else 0.0),
+        "avg_win": float(wins.mean()) if wins.size else 0.0,
+        "avg_loss": float(losses.mean()) if losses.size else 0.0,
+        "return_pct": float(equity[-1] - 1.0) * 100.0 if n else 0.0,
+        "max_drawdown": dd,
+        "sharpe": _ratio(mean, std) * ann,
+        "sortino": _ratio(mean, downside) * ann,
+        "exposure": float(np.count_nonzero(pos)) / n * 100.0 if n else 0.0,
+    }
+    return stats, equity
@@ -0,0 +1,217 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from config import Config
+from precompute_cache import build_precompute
+from utils.cpu_budget import cpu_budget
+from .trader import Trade, signal_arrays, trade_records, walk_bars
+from .utils import atr
+
+
+def _symbol_params(db, symbol: str, timeframe: str) -> Dict[str, Any]:
+    # подобранные оптимизатором параметры (model_params) с дефолтами из Config — как в пост-бэктесте обучения
+    tuned = db.load_model_params(symbol, timeframe) or {}
+    return {
+        "signal_threshold": float(tuned.get("signal_threshold", getattr(Config, "SIGNAL_THRESHOLD", 0.6))),
+        "hold_margin": float(tuned.get("hold_margin", getattr(Config, "SIGNAL_HOLD_MARGIN", 0.05))),
+        "min_confirmed_higher": int(tuned.get("min_confirmed_higher", 0)),
+        "sl_atr_mult": float(tuned.get("sl_atr_mult", getattr(Config, "BT_SL_ATR", 1.0))),
+        "tp_atr_mult": float(tuned.get("tp_atr_mult", getattr(Config, "BT_TP_ATR", 2.0))),
+        "max_bars_in_trade": int(tuned.get("max_bars_in_trade", getattr(Config, "BT_MAX_BARS", 200))),
+    }
+
+
+def symbol_arrays(db, models, symbol: str, timeframe: str, limit: int, precomp=None) -> Optional[Dict[str, Any]]:
+    """Массивы одного тикера за окно limit: бары, сигналы (ok, dir), OHLC, ATR и его параметры."""
+    with cpu_budget().slot():
+        precomp = precomp or build_precompute(db, models, symbol, timeframe, limit=max(limit, 600))
+        if precomp is None or precomp.get("df_use") is None or precomp["df_use"].empty:
+            return None
+        params = _symbol_params(db, symbol, timeframe)
+        df = precomp["df_use"]
+        bars = precomp["X_idx"][-limit:]
+        ok_arr, dir_arr = signal_arrays(precomp, timeframe, bars, params["signal_threshold"],
+                                        float(getattr(Config, "SIG_MIN_SUPPORT", 0.3)), params["hold_margin"],
+                                        params["min_confirmed_higher"])
+        ohlc = df.reindex(bars)
+        atr_s = atr(df, n=getattr(Config, "BT_ATR_PERIOD", 14))
+        return {
+            "symbol": symbol,
+            "params": params,
+            "bars": bars,
+            "in_df": bars.isin(df.index),
+            "ok": ok_arr,
+            "dir": dir_arr,
+            "close": ohlc["close"].to_numpy(dtype=float),
+            "high": ohlc["high"].to_numpy(dtype=float),
+            "low": ohlc["low"].to_numpy(dtype=float),
+            "atr": atr_s.reindex(bars).fillna(float(atr_s.iloc[-1])).to_numpy(dtype=float),
+        }
+
+
+def _max_drawdown(equity: np.ndarray) -> float:
+    if equity.size == 0:
+        return 0.0
+    peak = np.maximum.accumulate(equity)
+    return float(np.max((peak - equity) / np.where(peak > 0, peak, 1.0)) * 100.0)
+
+
+def run_portfolio_backtest(
+    db,
+    models,
+    timeframe: str,
+    symbols: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    capital: Optional[float] = None,
+    max_positions: Optional[int] = None,
+    position_pct: Optional[float] = None,
+    fee_pct: Optional[float] = None,
+    precomputes: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Портфельный бэктест по Config.SYMBOLS на одном ТФ.
+    Сигналы тикеров считаются параллельно (готовые precompute из precomputes переиспользуются), затем
+    бары всех тикеров сливаются в один поток по времени: общий капитал, не больше max_positions позиций,
+    размер позиции — position_pct от реализованного капитала, комиссия fee_pct (%) за сторону.
+    Кривая капитала — по закрытиям баров с переоценкой открытых позиций.
+    """
+    symbols = list(symbols or getattr(Config, "SYMBOLS", []))
+    limit = int(limit or getattr(Config, "PORTFOLIO_LIMIT", 2000))
+    capital = float(capital if capital is not None else getattr(Config, "PORTFOLIO_CAPITAL", 10000.0))
+    max_positions = max(1, int(max_positions or getattr(Config, "PORTFOLIO_MAX_POSITIONS", 3)))
+    position_pct = float(position_pct or getattr(Config, "PORTFOLIO_POSITION_PCT", 0.0) or 1.0 / max_positions)
+    fee = float(fee_pct if fee_pct is not None else getattr(Config, "PORTFOLIO_FEE_PCT", 0.1)) / 100.0
+    precomputes = precomputes or {}
+
+    workers = max(1, min(len(symbols) or 1, int(getattr(Config, "BACKTEST_MAX_WORKERS", 8))))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(symbol_arrays, db, models, s, timeframe, limit, precomputes.get(s)) for s in symbols]
+        arrays = []
+        for s, fut in zip(symbols, futures):
+            try:
+                a = fut.result()
+            except Exception:
+                a = None  # тикер без модели/данных не роняет портфель
+            if a is not None and len(a["bars"]):
+                arrays.append(a)
+    if not arrays:
+        return {"ok": False, "message": "no symbols with models", "timeframe": timeframe, "symbols": [],
+                "stats": {"count": 0, "winrate": 0.0}, "per_symbol": {}, "equity": {"format": "columnar", "time": [], "equity": []},
+                "trades": []}
+
+    # единый поток событий: (время, порядок тикера) -> (тикер, строка)
+    ts_all = np.concatenate([a["bars"].as_unit("ns").asi8 for a in arrays])
+    sym_all = np.concatenate([np.full(len(a["bars"]), k) for k, a in enumerate(arrays)])
+    row_all = np.concatenate([np.arange(len(a["bars"])) for a in arrays])
+    order = np.lexsort((sym_all, ts_all))
+
+    state = {"cash": capital, "used": 0.0, "skipped": 0}
+    books = [{"open": None} for _ in arrays]
+    sizes: Dict[int, float] = {}           # id(Trade) -> номинал позиции
+    last_close = np.full(len(arrays), np.nan)
+    trades: List[Dict[str, Any]] = []
+    per_symbol = {a["symbol"]: {"count": 0, "wins": 0, "pnl": 0.0} for a in arrays}
+    eq_time: List[int] = []
+    eq_val: List[float] = []
+
+    def _can_open() -> bool:
+        # открытые = с зарезервированным номиналом (book тикера обновляется только после walk_bars)
+        if len(sizes) >= max_positions or state["cash"] - state["used"] < state["cash"] * position_pct - 1e-9:
+            state["skipped"] += 1
+            return False
+        return True
+
+    def _opened(t: Trade):
+        size = state["cash"] * position_pct
+        sizes[id(t)] = size
+        state["used"] += size
+
+    def _closer(k: int):
+        sym = arrays[k]["symbol"]
+
+        def _closed(t: Trade):
+            size = sizes.pop(id(t), 0.0)
+            pnl = size * t.pnl_percent / 100.0 - size * fee * 2.0
+            state["used"] -= size
+            state["cash"] += pnl
+            rec = trade_records(t, sym, timeframe)[0]
+            rec.update({"size": size, "pnl_cash": pnl})
+            trades.append(rec)
+            agg = per_symbol[sym]
+            agg["count"] += 1
+            agg["wins"] += 1 if pnl > 0.0 else 0
+            agg["pnl"] += pnl
+        return _closed
+
+    closers = [_closer(k) for k in range(len(arrays))]
+
+    def _mark(ts: int):
+        unreal = 0.0
+        for k, b in enumerate(books):
+            t = b["open"]
+            if t is not None and np.isfinite(last_close[k]):
+                size = sizes.get(id(t), 0.0)
+                ret = last_close[k] / t.entry_price - 1.0 if t.side == "BUY" else t.entry_price / last_close[k] - 1.0
+                unreal += size * ret
+        eq_time.append(ts)
+        eq_val.append(state["cash"] + unreal)
+
+    prev_ts = None
+    for e in order:
+        ts, k, j = int(ts_all[e]), int(sym_all[e]), int(row_all[e])
+        if prev_ts is not None and ts != prev_ts:
+            _mark(prev_ts)
+        prev_ts = ts
+        a = arrays[k]
+        p = a["params"]
+        sl = slice(j, j + 1)
+        walk_bars(
+            books[k], a["bars"][sl], a["in_df"][sl], a["ok"][sl], a["dir"][sl],
+            a["close"][sl], a["high"][sl], a["low"][sl], a["atr"][sl],
+            sl_atr_mult=p["sl_atr_mult"], tp_atr_mult=p["tp_atr_mult"], max_bars_in_trade=p["max_bars_in_trade"],
+            exit_on_flip=bool(getattr(Config, "EXIT_ON_FLIP", False)),
+            on_close=closers[k], can_open=_can_open, on_open=_opened,
+        )
+        if a["in_df"][j] and np.isfinite(a["close"][j]):
+            last_close[k] = a["close"][j]
+
+    # незакрытые позиции — по последней цене тикера
+    for k, b in enumerate(books):
+        t = b["open"]
+        if t is not None and t.status == "open" and np.isfinite(last_close[k]):
+            t.close(arrays[k]["bars"][-1], float(last_close[k]))
+            closers[k](t)
+            b["open"] = None
+    if prev_ts is not None:
+        _mark(prev_ts)
+
+    equity = np.asarray(eq_val, dtype=float)
+    count = len(trades)
+    wins = sum(1 for t in trades if t["pnl_cash"] > 0.0)
+    stats = {
+        "count": count,
+        "winrate": float(wins) / count * 100.0 if count else 0.0,
+        "pnl_cash": float(state["cash"] - capital),
+        "return_pct": float(state["cash"] / capital - 1.0) * 100.0 if capital > 0 else 0.0,
+        "max_drawdown_pct": _max_drawdown(equity),
+        "final_equity": float(state["cash"]),
+        "skipped_signals": int(state["skipped"]),
+        "capital": capital,
+        "max_positions": max_positions,
+        "position_pct": position_pct,
+    }
+    return {
+        "ok": True,
+        "timeframe": timeframe,
+        "symbols": [a["symbol"] for a in arrays],
+        "stats": stats,
+        "per_symbol": {s: {"count": v["count"], "winrate": float(v["wins"]) / v["count"] * 100.0 if v["count"] else 0.0,
+                           "pnl_cash": float(v["pnl"])} for s, v in per_symbol.items()},
+        "equity": {"format": "columnar",
+                   "time": np.datetime_as_string(np.asarray(eq_time, dtype="datetime64[ns]"), unit="s").tolist(),
+                   "equity": equity.tolist()},
+        "trades": trades,
+    }
@@ -4,9 +4,33 @@ import pandas as pd
 
 from config import Config
 from precompute_cache import build_precompute
+from .cache import BacktestCache, get_backtest_cache
 from .trader import simulate_trades
 
 
+def _versions(db, symbol: str, timeframe: str, precomp: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    # версии моделей всех ТФ (None — нет модели — не входит в ключ)
+    if precomp is not None:
+        vers = precomp.get("versions") or {}
+    elif hasattr(db, "get_active_model_version"):
+        vers = {tf: db.get_active_model_version(symbol, tf) for tf in dict.fromkeys([timeframe, *Config.TIMEFRAMES])}
+    else:
+        vers = {}
+    return {tf: int(v) for tf, v in vers.items() if v is not None}
+
+
+def _last_bar(precomp: Dict[str, Any], df: pd.DataFrame):
+    """Последний бар предрасчёта и его close (из df_use предрасчёта, иначе из df); None — не определить."""
+    idx = precomp.get("X_idx")
+    if idx is None or len(idx) == 0:
+        return None
+    t = idx[-1]
+    for src in (precomp.get("df_use"), df):
+        if src is not None and t in src.index:
+            return t, float(src.loc[t, "close"])
+    return None
+
+
 def run_backtest(
     db,
     models,
@@ -21,27 +45,60 @@ def run_backtest(
     max_bars_in_trade: int,
     precompute: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
+    """
+    Бэктест по предрасчёту вероятностей. Результат кэшируется (backtest_pkg.cache) по версиям моделей,
+    последнему бару и всем параметрам — повторный одинаковый бэктест до новой свечи берётся из кэша.
+    Последний бар ключа — бар предрасчёта (переданный precompute мог быть построен до новой свечи в БД);
+    бары БД после него отрезаются, иначе открытая сделка закрывалась бы по ним, а ключ этого не отражал.
+    """
     df = db.load_ohlcv(symbol, timeframe)
     if df is None or df.empty:
         return {"trades": [], "markers": [], "stats": {"count": 0, "winrate": 0.0}}
 
     df = df.tail(max(600, limit))
+    min_support = float(getattr(Config, "SIG_MIN_SUPPORT", 0.3))
+    params = (float(signal_threshold), float(hold_margin), int(min_confirmed_higher or 0), float(sl_atr_mult),
+              float(tp_atr_mult), int(max_bars_in_trade), min_support)
+    cache = get_backtest_cache() if getattr(Config, "BACKTEST_CACHE_ENABLED", True) else None
+
+    db_bar = (df.index[-1], float(df["close"].iloc[-1]))
+
+    def _key(vers, bar):
+        return BacktestCache.make_key(symbol, timeframe, vers, bar[0], bar[1], limit, params)
+
+    if cache is not None:
+        bar = _last_bar(precompute, df) if precompute is not None else db_bar
+        hit = cache.get(_key(_versions(db, symbol, timeframe, precompute), bar)) if bar is not None else None
+        if hit is not None:
+            return hit
+
     precomp = precompute or build_precompute(db, models, symbol, timeframe, limit=max(limit, 600))
     if precomp is None:
         return {"trades": [], "markers": [], "stats": {"count": 0, "winrate": 0.0}}
+    bar = _last_bar(precomp, df)
+    if bar is not None:
+        df = df.loc[:bar[0]]
+    if df.empty:
+        return {"trades": [], "markers": [], "stats": {"count": 0, "winrate": 0.0}}
 
-    trades, markers, stats = simulate_trades(
+    trades, markers, stats, equity = simulate_trades(
         df=df,
         precomp=precomp,
         symbol=symbol,
         timeframe=timeframe,
         limit=limit,
         entry_threshold=float(signal_threshold),
-        min_support=float(getattr(Config, "SIG_MIN_SUPPORT", 0.3)),
+        min_support=min_support,
         hold_margin_min=float(hold_margin),
         min_confirmed_higher=int(min_confirmed_higher or 0),
         sl_atr_mult=float(sl_atr_mult),
         tp_atr_mult=float(tp_atr_mult),
         max_bars_in_trade=int(max_bars_in_trade),
     )
-    return {"trades": trades, "markers": markers, "stats": stats}
\ No newline at end of file
+    result = {"trades": trades, "markers": markers, "stats": stats, "equity": equity}
+    if cache is not None:
+        # ключ — по версиям и бару, на которых реально посчитано (могли смениться между проверкой и расчётом);
+        # предрасчёт, разошедшийся с историей БД на своём последнем баре (свеча обновилась), не кэшируем
+        if bar is not None and (df.index[-1], float(df["close"].iloc[-1])) == bar:
+            cache.put(_key(_versions(db, symbol, timeframe, precomp), bar), result)
+    return result
\ No newline at end of file
@@ -0,0 +1,169 @@
+from __future__ import annotations
+import math
+from collections import deque
+from contextlib import ExitStack
+from typing import Dict, Any, Optional, Callable
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from model_pkg.versions import model_pins
+from precompute_pkg.align import tf_delta
+from precompute_pkg.core import _extract_model_bundle, score_frame
+from .trader import Trade, signal_arrays, trade_records, walk_bars
+from .utils import atr
+
+_PERIOD_FMT = {"D": "%Y-%m-%d", "W": "%G-W%V", "M": "%Y-%m", "Q": None, "Y": "%Y"}
+
+
+def _period_key(ts: pd.Timestamp, period: str) -> str:
+    if period == "Q":
+        return f"{ts.year}-Q{(ts.month - 1) // 3 + 1}"
+    return ts.strftime(_PERIOD_FMT.get(period) or "%Y-%m")
+
+
+class _PeriodStats:
+    """Агрегаты закрытых сделок по периодам (по времени выхода) и итог — без хранения всех сделок."""
+    def __init__(self, period: str, keep_trades: int):
+        self.period = period if period in _PERIOD_FMT else "M"
+        self.rows: Dict[str, Dict[str, float]] = {}
+        self.total = {"count": 0, "wins": 0, "pnl_sum": 0.0}
+        self.last_trades: deque = deque(maxlen=max(0, int(keep_trades)))
+
+    def add(self, t: Trade, symbol: str, timeframe: str):
+        key = _period_key(t.exit_time, self.period)
+        row = self.rows.setdefault(key, {"count": 0, "wins": 0, "pnl_sum": 0.0})
+        win = 1 if t.pnl_percent > 0.0 else 0
+        for agg in (row, self.total):
+            agg["count"] += 1
+            agg["wins"] += win
+            agg["pnl_sum"] += float(t.pnl_percent)
+        if self.last_trades.maxlen:
+            self.last_trades.append(trade_records(t, symbol, timeframe)[0])
+
+    @staticmethod
+    def _fmt(agg: Dict[str, float]) -> Dict[str, Any]:
+        n = int(agg["count"])
+        return {"count": n, "winrate": float(agg["wins"]) / n * 100.0 if n else 0.0,
+                "pnl_sum": float(agg["pnl_sum"]), "pnl_avg": float(agg["pnl_sum"]) / n if n else 0.0}
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "stats": self._fmt(self.total),
+            "periods": [{"period": k, **self._fmt(v)} for k, v in sorted(self.rows.items())],
+            "trades": list(self.last_trades),
+        }
+
+
+def _higher_probs(db, symbol: str, base_tf: str, tf: str, bundle, t0: pd.Timestamp, t1: pd.Timestamp, warmup: int):
+    """Вероятности старшего ТФ для баров, закрывшихся к закрытиям базовых баров [t0, t1] (+ разогрев признаков)."""
+    d_h = tf_delta(tf)
+    if d_h <= pd.Timedelta(0):
+        return None
+    since = t0 + tf_delta(base_tf) - d_h * (warmup + 2)
+    n = int(math.ceil((t1 - since) / d_h)) + 2
+    df = db.load_ohlcv(symbol, tf, since=since.to_pydatetime(), limit=n)
+    if df is None or df.empty:
+        return None
+    res = score_frame(db, symbol, tf, bundle, df)
+    # разогрев признаков скорить нужно, но отдавать — нет; отсечка по времени, а не по числу строк:
+    # история старшего ТФ может начинаться позже since, тогда строк разогрева меньше warmup
+    keep = int(np.searchsorted(res["idx"].as_unit("ns").asi8, (t0 + tf_delta(base_tf) - 2 * d_h).as_unit("ns").value))
+    return {k: res[k][keep:] for k in ("pb_buy", "pb_hold", "pb_sell", "idx")}
+
+
+def run_backtest_streaming(
+    db,
+    models,
+    symbol: str,
+    timeframe: str,
+    signal_threshold: float,
+    hold_margin: float,
+    min_confirmed_higher: int,
+    sl_atr_mult: float,
+    tp_atr_mult: float,
+    max_bars_in_trade: int,
+    since=None,
+    until=None,
+    period: Optional[str] = None,
+    chunk: Optional[int] = None,
+    keep_trades: Optional[int] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Бэктест по всей сохранённой истории (или [since, until]) чанками по BT_STREAM_CHUNK баров.
+    Между чанками переносятся: хвост OHLCV (разогрев признаков и ATR) и открытая сделка.
+    Память ограничена чанком: сделки агрегируются по периодам (period: D/W/M/Q/Y), хранятся последние keep_trades.
+    Версии моделей закреплены на весь прогон.
+    """
+    chunk = max(500, int(chunk or getattr(Config, "BT_STREAM_CHUNK", 20000)))
+    warmup = max(int(getattr(Config, "FEATURE_CACHE_WARMUP_BARS", 500)), int(getattr(Config, "BT_ATR_PERIOD", 14)))
+    stats = _PeriodStats(str(period or getattr(Config, "BT_STREAM_PERIOD", "M")).upper(),
+                         keep_trades if keep_trades is not None else int(getattr(Config, "BT_STREAM_KEEP_TRADES", 200)))
+    until_ts = pd.Timestamp(until) if until is not None else None
+    total = int((db.get_hist_stats(symbol, timeframe) or {}).get("count") or 0)
+    min_support = float(getattr(Config, "SIG_MIN_SUPPORT", 0.3))
+    book: Dict[str, Any] = {"open": None}
+    carry: Optional[pd.DataFrame] = None
+    last_bar = None
+    bars_done = chunks = 0
+
+    with ExitStack() as pins:
+        bundles = {}
+        for tf in dict.fromkeys([timeframe, *Config.TIMEFRAMES]):
+            b = _extract_model_bundle(db, models, symbol, tf)
+            if b.get("model") is not None:
+                pins.enter_context(model_pins().pin(b.get("version")))
+                bundles[tf] = b
+        if timeframe not in bundles:
+            return {"ok": False, "message": "no model", **stats.result()}
+        versions = {tf: b.get("version") for tf, b in bundles.items()}
+
+        cursor = pd.Timestamp(since).to_pydatetime() if since is not None else None
+        while True:
+            df = db.load_ohlcv(symbol, timeframe, since=cursor, limit=chunk)
+            if df is None or df.empty:
+                break
+            if until_ts is not None:
+                df = df[df.index <= until_ts]
+                if df.empty:
+                    break
+            n_new = len(df)
+            full = pd.concat([carry, df]) if carry is not None else df
+            res = score_frame(db, symbol, timeframe, bundles[timeframe], full)
+            bars = df.index
+            base = {k: res[k][-n_new:] for k in ("pb_buy", "pb_hold", "pb_sell", "idx")}
+            higher = {}
+            for tf, b in bundles.items():
+                if tf == timeframe:
+                    continue
+                h = _higher_probs(db, symbol, timeframe, tf, b, bars[0], bars[-1], warmup)
+                if h is not None and len(h["idx"]):
+                    higher[tf] = h
+            precomp = {"X_idx": bars, "base": base, "higher": higher}
+            ok_arr, dir_arr = signal_arrays(precomp, timeframe, bars, float(signal_threshold), min_support,
+                                            float(hold_margin), int(min_confirmed_higher or 0))
+            atr_arr = atr(full, n=getattr(Config, "BT_ATR_PERIOD", 14)).to_numpy(dtype=float)[-n_new:]
+            walk_bars(
+                book, bars, np.ones(n_new, dtype=bool), ok_arr, dir_arr,
+                df["close"].to_numpy(dtype=float), df["high"].to_numpy(dtype=float), df["low"].to_numpy(dtype=float), atr_arr,
+                sl_atr_mult=float(sl_atr_mult), tp_atr_mult=float(tp_atr_mult), max_bars_in_trade=int(max_bars_in_trade),
+                exit_on_flip=bool(getattr(Config, "EXIT_ON_FLIP", False)),
+                on_close=lambda t: stats.add(t, symbol, timeframe),
+            )
+            carry = full.tail(warmup)
+            last_bar = (bars[-1], float(df["close"].iloc[-1]))
+            bars_done += n_new
+            chunks += 1
+            if on_progress:
+                on_progress({"bars": bars_done, "total": total, "chunks": chunks, "last": bars[-1].isoformat()})
+            if n_new < chunk or (until_ts is not None and bars[-1] >= until_ts):
+                break
+            cursor = (bars[-1] + pd.Timedelta(seconds=1)).to_pydatetime()
+
+    t = book.get("open")
+    if t is not None and t.status == "open" and last_bar is not None:
+        t.close(last_bar[0], last_bar[1])
+        stats.add(t, symbol, timeframe)
+    return {"ok": True, "bars": bars_done, "chunks": chunks, "versions": versions, **stats.result()}
@@ -1,12 +1,13 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Callable, Dict, Any, List, Tuple, Optional
 from dataclasses import dataclass
 import numpy as np
 import pandas as pd
 
 from config import Config
-from signal_engine import aggregate_signal, decide_entry
-from .utils import atr, build_probs_at_i, consistent_support_count
+from signal_pkg.batch import aggregate_signal_batch, confirmed_higher_batch, entry_mask_batch, probs_matrix, weights_vector
+from .metrics import backtest_metrics
+from .utils import atr
 
 
 @dataclass
@@ -33,56 +34,87 @@ class Trade:
             self.pnl_percent = (self.entry_price / self.exit_price - 1.0) * 100.0
 
 
-def simulate_trades(
-    df: pd.DataFrame,
+def trade_records(t: Trade, symbol: str, timeframe: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Закрытая сделка -> (запись сделки, маркеры входа/выхода)."""
+    rec = {
+        "entry_time": t.entry_time.isoformat(),
+        "exit_time": t.exit_time.isoformat() if t.exit_time else None,
+        "entry_price": t.entry_price,
+        "exit_price": t.exit_price,
+        "side": t.side,
+        "pnl_percent": t.pnl_percent,
+        "status": t.status,
+        "symbol": symbol,
+        "timeframe": timeframe,
+    }
+    marks = [{
+        "time": t.entry_time.isoformat(),
+        "type": "entry_buy" if t.side == "BUY" else "entry_sell",
+        "note": f"{t.side} {t.entry_price:.4f}",
+        "color": "#66BB6A" if t.side == "BUY" else "#EF5350"
+    }]
+    if t.exit_time:
+        marks.append({
+            "time": t.exit_time.isoformat(),
+            "type": "exit",
+            "note": f"EXIT {t.exit_price:.4f} PnL {t.pnl_percent:.2f}%",
+            "color": "#78909C"
+        })
+    return rec, marks
+
+
+def signal_arrays(
     precomp: Dict[str, Any],
-    symbol: str,
     timeframe: str,
-    limit: int,
+    bars: pd.DatetimeIndex,
     entry_threshold: float,
     min_support: float,
     hold_margin_min: float,
     min_confirmed_higher: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Сигналы по всем барам сразу (signal_pkg.batch): (ok, dir)."""
+    tfs, buy, hold, sell = probs_matrix(precomp, timeframe, bars)
+    agg = aggregate_signal_batch(buy, hold, sell, weights_vector(tfs, getattr(Config, "HIERARCHY_WEIGHTS", {})))
+    ok_arr = entry_mask_batch(agg, buy[:, 0], hold[:, 0], sell[:, 0],
+                              entry_threshold=entry_threshold, min_support=min_support, hold_margin_min=hold_margin_min)
+    if min_confirmed_higher > 0:
+        ok_arr &= confirmed_higher_batch(buy, sell, np.sign(agg["score"])) >= int(min_confirmed_higher)
+    return ok_arr, agg["dir"]
+
+
+def walk_bars(
+    book: Dict[str, Any],
+    bars: pd.DatetimeIndex,
+    in_df: np.ndarray,
+    ok_arr: np.ndarray,
+    dir_arr: np.ndarray,
+    close_arr: np.ndarray,
+    high_arr: np.ndarray,
+    low_arr: np.ndarray,
+    atr_arr: np.ndarray,
+    *,
     sl_atr_mult: float,
     tp_atr_mult: float,
     max_bars_in_trade: int,
-) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, float]]:
-    X_idx: pd.DatetimeIndex = precomp["X_idx"]
-    use_len = min(len(X_idx), limit)
-    start = len(X_idx) - use_len
-    atr_series = atr(df, n=getattr(Config, "BT_ATR_PERIOD", 14))
-
-    open_trade: Optional[Trade] = None
-    trades: List[Dict[str, Any]] = []
-    markers: List[Dict[str, Any]] = []
-
-    weights_cfg = getattr(Config, "HIERARCHY_WEIGHTS", {})
-    exit_on_flip = bool(getattr(Config, "EXIT_ON_FLIP", False))
-
-    for i in range(start, len(X_idx)):
-        ts, probs_by_tf = build_probs_at_i(precomp, timeframe, i)
-        base_pb = probs_by_tf[timeframe]
-        agg = aggregate_signal(probs_by_tf, timeframe, weights_cfg, lookback_scores=None)
-
-        ok, dir_sig, _ = decide_entry(
-            agg, base_pb,
-            entry_threshold=entry_threshold,
-            min_support=min_support,
-            hold_margin_min=hold_margin_min,
-        )
-
-        if ok and min_confirmed_higher > 0:
-            consistent = consistent_support_count(int(np.sign(agg["score"])), probs_by_tf, timeframe)
-            if consistent < int(min_confirmed_higher):
-                ok = False
-
-        if ts not in df.index:
+    exit_on_flip: bool,
+    on_close: Callable[[Trade], None],
+    can_open: Optional[Callable[[], bool]] = None,
+    on_open: Optional[Callable[[Trade], None]] = None,
+) -> None:
+    """
+    Ведение позиции по барам. book["open"] — открытая сделка (переживает вызовы: потоковый бэктест
+    передаёт её между чанками); закрытые сделки уходят в on_close.
+    can_open/on_open — ограничения портфеля: вход только при can_open(), открытая сделка — в on_open.
+    """
+    open_trade: Optional[Trade] = book.get("open")
+    for j, ts in enumerate(bars):
+        if not in_df[j]:
             continue
-        row = df.loc[ts]
-        close = float(row["close"])
-        high = float(row["high"])
-        low = float(row["low"])
-        atr_now = float(atr_series.loc[ts]) if ts in atr_series.index else float(atr_series.iloc[-1])
+        ok, dir_sig = bool(ok_arr[j]), int(dir_arr[j])
+        close = float(close_arr[j])
+        high = float(high_arr[j])
+        low = float(low_arr[j])
+        atr_now = float(atr_arr[j])
 
         if open_trade:
             open_trade.bars_held += 1
@@ -103,33 +135,10 @@ def simulate_trades(
                 open_trade.close(ts, close)
 
             if open_trade.status == "closed":
-                trades.append({
-                    "entry_time": open_trade.entry_time.isoformat(),
-                    "exit_time": open_trade.exit_time.isoformat() if open_trade.exit_time else None,
-                    "entry_price": open_trade.entry_price,
-                    "exit_price": open_trade.exit_price,
-                    "side": open_trade.side,
-                    "pnl_percent": open_trade.pnl_percent,
-                    "status": open_trade.status,
-                    "symbol": symbol,
-                    "timeframe": timeframe,
-                })
-                markers.append({
-                    "time": open_trade.entry_time.isoformat(),
-                    "type": "entry_buy" if open_trade.side == "BUY" else "entry_sell",
-                    "note": f"{open_trade.side} {open_trade.entry_price:.4f}",
-                    "color": "#66BB6A" if open_trade.side == "BUY" else "#EF5350"
-                })
-                if open_trade.exit_time:
-                    markers.append({
-                        "time": open_trade.exit_time.isoformat(),
-                        "type": "exit",
-                        "note": f"EXIT {open_trade.exit_price:.4f} PnL {open_trade.pnl_percent:.2f}%",
-                        "color": "#78909C"
-                    })
+                on_close(open_trade)
                 open_trade = None
 
-        if open_trade is None and ok and dir_sig != 0:
+        if open_trade is None and ok and dir_sig != 0 and (can_open is None or can_open()):
             side = "BUY" if dir_sig > 0 else "SELL"
             if side == "BUY":
                 sl = close - sl_atr_mult * atr_now
@@ -146,40 +155,74 @@ def simulate_trades(
                 max_bars=int(max_bars_in_trade),
                 bars_held=0
             )
+            if on_open is not None:
+                on_open(open_trade)
+    book["open"] = open_trade
+
+
+def simulate_trades(
+    df: pd.DataFrame,
+    precomp: Dict[str, Any],
+    symbol: str,
+    timeframe: str,
+    limit: int,
+    entry_threshold: float,
+    min_support: float,
+    hold_margin_min: float,
+    min_confirmed_higher: int,
+    sl_atr_mult: float,
+    tp_atr_mult: float,
+    max_bars_in_trade: int,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, float], Dict[str, Any]]:
+    """
+    Симуляция сделок на окне limit -> (сделки, маркеры, stats, equity).
+    stats — метрики backtest_pkg.metrics (winrate, profit factor, просадка, Sharpe/Sortino, экспозиция...),
+    equity — кривая капитала по барам окна в колоночном виде {"format": "columnar", "time", "equity"}.
+    """
+    X_idx: pd.DatetimeIndex = precomp["X_idx"]
+    use_len = min(len(X_idx), limit)
+    start = len(X_idx) - use_len
+    atr_series = atr(df, n=getattr(Config, "BT_ATR_PERIOD", 14))
 
+    trades: List[Dict[str, Any]] = []
+    markers: List[Dict[str, Any]] = []
+    closed: List[Trade] = []
+
+    def _closed(t: Trade):
+        closed.append(t)
+        rec, marks = trade_records(t, symbol, timeframe)
+        trades.append(rec)
+        markers.extend(marks)
+
+    # сигналы по всем барам окна сразу (signal_pkg.batch), в цикле — только ведение позиции
+    bars = X_idx[start:]
+    ok_arr, dir_arr = signal_arrays(precomp, timeframe, bars, entry_threshold, min_support, hold_margin_min, min_confirmed_higher)
+
+    in_df = bars.isin(df.index)
+    ohlc = df.reindex(bars)
+    book: Dict[str, Any] = {"open": None}
+    walk_bars(
+        book, bars, in_df, ok_arr, dir_arr,
+        ohlc["close"].to_numpy(dtype=float), ohlc["high"].to_numpy(dtype=float), ohlc["low"].to_numpy(dtype=float),
+        atr_series.reindex(bars).fillna(float(atr_series.iloc[-1])).to_numpy(dtype=float),
+        sl_atr_mult=sl_atr_mult, tp_atr_mult=tp_atr_mult, max_bars_in_trade=max_bars_in_trade,
+        exit_on_flip=bool(getattr(Config, "EXIT_ON_FLIP", False)), on_close=_closed,
+    )
+
+    open_trade = book["open"]
     if open_trade and open_trade.status == "open":
-        last_ts = df.index[-1]
-        last_close = float(df["close"].iloc[-1])
-        open_trade.close(last_ts, last_close)
-        trades.append({
-            "entry_time": open_trade.entry_time.isoformat(),
-            "exit_time": open_trade.exit_time.isoformat() if open_trade.exit_time else None,
-            "entry_price": open_trade.entry_price,
-            "exit_price": open_trade.exit_price,
-            "side": open_trade.side,
-            "pnl_percent": open_trade.pnl_percent,
-            "status": open_trade.status,
-            "symbol": symbol,
-            "timeframe": timeframe,
-        })
-        markers.append({
-            "time": open_trade.entry_time.isoformat(),
-            "type": "entry_buy" if open_trade.side == "BUY" else "entry_sell",
-            "note": f"{open_trade.side} {open_trade.entry_price:.4f}",
-            "color": "#66BB6A" if open_trade.side == "BUY" else "#EF5350"
-        })
-        if open_trade.exit_time:
-            markers.append({
-                "time": open_trade.exit_time.isoformat(),
-                "type": "exit",
-                "note": f"EXIT {open_trade.exit_price:.4f} PnL {open_trade.pnl_percent:.2f}%",
-                "color": "#78909C"
-            })
-
-    closed = [t for t in trades if t.get("status") == "closed"]
-    count = len(closed)
-    win = len([t for t in closed if t.get("pnl_percent", 0.0) > 0.0])
-    winrate = float(win) / count * 100.0 if count > 0 else 0.0
-
-    stats = {"count": int(count), "winrate": float(winrate)}
-    return trades, markers, stats
\ No newline at end of file
+        open_trade.close(df.index[-1], float(df["close"].iloc[-1]))
+        _closed(open_trade)
+
+    # метрики и кривая капитала — векторно по списку сделок, без второго прохода по барам
+    stats, equity = backtest_metrics(
+        bars, ohlc["close"].to_numpy(dtype=float),
+        np.array([t.entry_time for t in closed], dtype="datetime64[ns]"),
+        np.array([t.exit_time for t in closed], dtype="datetime64[ns]"),
+        np.array([t.side for t in closed]),
+        np.array([t.exit_price for t in closed], dtype=float),
+        np.array([t.pnl_percent for t in closed], dtype=float),
+        timeframe,
+    )
+    curve = {"format": "columnar", "time": np.datetime_as_string(bars.values, unit="s").tolist(), "equity": equity.tolist()}
+    return trades, markers, stats, curve
@@ -20,11 +20,14 @@ def consistent_support_count(base_dir: int, probs_by_tf: Dict[str, Dict[str, flo
             count += 1
     return count
 
-def pick_higher_probs_at_ts(higher: Dict[str, Dict[str, Any]], ts: pd.Timestamp) -> Dict[str, Dict[str, float]]:
+def pick_higher_probs_at_ts(higher: Dict[str, Dict[str, Any]], ts: pd.Timestamp, base_tf: str | None = None) -> Dict[str, Dict[str, float]]:
+    """Вероятности старших ТФ на момент ts; с base_tf — по закрытию бара (без заглядывания вперёд)."""
+    from precompute_pkg.align import tf_delta
     out = {}
     for tf, obj in higher.items():
         idx_h: pd.DatetimeIndex = obj["idx"]
-        pos = idx_h.searchsorted(ts, side="right") - 1
+        t = ts + (tf_delta(base_tf) - tf_delta(tf)) if base_tf else ts
+        pos = idx_h.searchsorted(t, side="right") - 1
         if pos >= 0:
             out[tf] = {
                 "buy": float(obj["pb_buy"][pos]),
@@ -34,16 +37,6 @@ def pick_higher_probs_at_ts(higher: Dict[str, Dict[str, Any]], ts: pd.Timestamp)
     return out
 
 def build_probs_at_i(precomp: Dict[str, Any], base_tf: str, i: int) -> Tuple[pd.Timestamp, Dict[str, Dict[str, float]]]:
-    idx = precomp["X_idx"]
-    ts = idx[i]
-    base = precomp["base"]
-    probs_by_tf = {
-        base_tf: {
-            "buy": float(base["pb_buy"][i]),
-            "hold": float(base["pb_hold"][i]),
-            "sell": float(base["pb_sell"][i]),
-        }
-    }
-    higher_now = pick_higher_probs_at_ts(precomp["higher"], ts)
-    probs_by_tf.update(higher_now)
-    return ts, probs_by_tf
\ No newline at end of file
+    # старшие ТФ — gather по матрице выравнивания precompute
+    from precompute_pkg.align import probs_at_row
+    return precomp["X_idx"][i], probs_at_row(precomp, base_tf, i)
@@ -23,6 +23,11 @@ class Config:
     # Paths
     DB_PATH = os.environ.get("DB_PATH", "ai_trader.db")
     MODELS_DIR = os.environ.get("MODELS_DIR", "models")
+    # Дисковый кэш матриц признаков (features_pkg/cache.py)
+    FEATURE_CACHE_ENABLED = os.environ.get("FEATURE_CACHE_ENABLED", "1") not in ("0", "false", "False")
+    FEATURE_CACHE_DIR = os.environ.get("FEATURE_CACHE_DIR", os.path.join("cache", "features"))
+    FEATURE_CACHE_WARMUP_BARS = int(os.environ.get("FEATURE_CACHE_WARMUP_BARS", "500"))  # разогрев индикаторов при дозаписи
+    FEATURE_CACHE_TAIL_BARS = int(os.environ.get("FEATURE_CACHE_TAIL_BARS", "3"))        # отпечаток последних баров
 
     # Market config
     SYMBOLS = ["BTC/USDT", "ETH/USDT", "BNB/USDT", "SOL/USDT", "XRP/USDT", "ADA/USDT"]
@@ -31,6 +36,12 @@ class Config:
 
     # Exchange / WS
     EXCHANGE_ID = os.environ.get("EXCHANGE_ID", "binance")
+    # Кэш метаданных рынков (load_markets) на диске
+    MARKETS_CACHE_DIR = os.environ.get("MARKETS_CACHE_DIR", "cache")
+    MARKETS_CACHE_TTL_SEC = float(os.environ.get("MARKETS_CACHE_TTL_SEC", str(24 * 3600)))
+    # Фоновый опрос балансов (для /account)
+    BALANCE_POLL_SEC = float(os.environ.get("BALANCE_POLL_SEC", "60"))
+    BALANCE_POLL_NETWORKS = [n.strip() for n in os.environ.get("BALANCE_POLL_NETWORKS", "testnet,mainnet").split(",") if n.strip()]
     ENABLE_WS = True
 
     # WebSocket manager defaults
@@ -41,11 +52,74 @@ class Config:
     # Training / inference
     MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "4"))
     TRAIN_MAX_WORKERS = int(os.environ.get("TRAIN_MAX_WORKERS", "8"))  # было 4, стало 8
+    # Инкрементальное дообучение (mode=auto): полная переобучка не реже раза в N дней
+    TRAIN_FULL_REFIT_DAYS = float(os.environ.get("TRAIN_FULL_REFIT_DAYS", "7"))
+    TRAIN_INCR_WARMUP_BARS = int(os.environ.get("TRAIN_INCR_WARMUP_BARS", "500"))  # разогрев индикаторов
+    TRAIN_INCR_STEPS = int(os.environ.get("TRAIN_INCR_STEPS", "25"))                # шагов градиента на новых барах
+    TRAIN_INCR_LR = float(os.environ.get("TRAIN_INCR_LR", "0.1"))
+    # Walk-forward валидация при полном обучении (0 — отключить)
+    WF_FOLDS = int(os.environ.get("WF_FOLDS", "5"))
+    WF_MIN_TRAIN = int(os.environ.get("WF_MIN_TRAIN", "200"))
+    WF_MAX_WORKERS = _auto_workers(os.environ.get("WF_MAX_WORKERS"))  # общий пул процессов для фолдов
+    # Поиск C логистической регрессии по пути регуляризации (тёплый старт), кэш по паре в app_settings
+    LR_C_SEARCH = os.environ.get("LR_C_SEARCH", "0") not in ("0", "false", "False")
+    LR_C_GRID = [float(c) for c in os.environ.get("LR_C_GRID", "").split(",") if c.strip()]  # пусто -> logspace(2, -3, 10)
+    LR_C_HOLDOUT = float(os.environ.get("LR_C_HOLDOUT", "0.2"))       # доля последних строк под оценку
+    LR_C_CACHE_DAYS = float(os.environ.get("LR_C_CACHE_DAYS", "7"))
+    # Хранение моделей: компактный артефакт (npz + JSON); 1 — дополнительно писать pickle (для отката версии)
+    MODEL_STORE_PICKLE = os.environ.get("MODEL_STORE_PICKLE", "0") not in ("0", "false", "False")
+    # Версии моделей: сколько последних хранить на пару, период фоновой чистки, размер кэша бандлов по версии
+    MODEL_VERSIONS_KEEP = int(os.environ.get("MODEL_VERSIONS_KEEP", "3"))
+    MODEL_JANITOR_SEC = float(os.environ.get("MODEL_JANITOR_SEC", "600"))
+    MODEL_BUNDLE_CACHE = int(os.environ.get("MODEL_BUNDLE_CACHE", "64"))
 
     # Parallelism for tuning/backtest
     OPTIMIZE_MAX_WORKERS = int(os.environ.get("OPTIMIZE_MAX_WORKERS", "8"))        # внутри ТФ (перебор сетки), было 4
     OPTIMIZE_TF_MAX_WORKERS = int(os.environ.get("OPTIMIZE_TF_MAX_WORKERS", "8"))  # по таймфреймам, было 4
+    # Стратегия подбора параметров: grid (полный перебор) | random | halving | local; бюджет бэктестов для не-grid
+    OPTIMIZE_STRATEGY = os.environ.get("OPTIMIZE_STRATEGY", "grid")
+    OPTIMIZE_BUDGET = int(os.environ.get("OPTIMIZE_BUDGET", "60"))
+    OPTIMIZE_HALVING_ETA = int(os.environ.get("OPTIMIZE_HALVING_ETA", "3"))
+    # Цель оптимизатора: winrate | pnl_sum | expectancy | profit_factor | sharpe | sortino | return_pct | max_drawdown
+    OPTIMIZE_OBJECTIVE = os.environ.get("OPTIMIZE_OBJECTIVE", "winrate")
     BACKTEST_MAX_WORKERS = int(os.environ.get("BACKTEST_MAX_WORKERS", "8"))        # было авто/4, теперь дефолт 8
+    # Кэш результатов бэктеста (ключ: версии моделей, последний бар, параметры); объём в МБ
+    BACKTEST_CACHE_ENABLED = os.environ.get("BACKTEST_CACHE_ENABLED", "1") not in ("0", "false", "False")
+    BACKTEST_CACHE_MB = float(os.environ.get("BACKTEST_CACHE_MB", "32"))
+    # Потоковый бэктест по всей истории: размер чанка (бары), период агрегации (D/W/M/Q/Y), сколько последних сделок вернуть
+    BT_STREAM_CHUNK = int(os.environ.get("BT_STREAM_CHUNK", "20000"))
+    BT_STREAM_PERIOD = os.environ.get("BT_STREAM_PERIOD", "M")
+    BT_STREAM_KEEP_TRADES = int(os.environ.get("BT_STREAM_KEEP_TRADES", "200"))
+    # Портфельный бэктест по SYMBOLS: окно (бары), стартовый капитал, лимит позиций, доля капитала на позицию
+    # (0 -> 1/PORTFOLIO_MAX_POSITIONS), комиссия % за сторону; ТФ и запуск после каждого обучения
+    PORTFOLIO_LIMIT = int(os.environ.get("PORTFOLIO_LIMIT", "2000"))
+    PORTFOLIO_CAPITAL = float(os.environ.get("PORTFOLIO_CAPITAL", "10000"))
+    PORTFOLIO_MAX_POSITIONS = int(os.environ.get("PORTFOLIO_MAX_POSITIONS", "3"))
+    PORTFOLIO_POSITION_PCT = float(os.environ.get("PORTFOLIO_POSITION_PCT", "0"))
+    PORTFOLIO_FEE_PCT = float(os.environ.get("PORTFOLIO_FEE_PCT", "0.1"))
+    PORTFOLIO_TF = os.environ.get("PORTFOLIO_TF", "1h")
+    PORTFOLIO_AFTER_TRAIN = os.environ.get("PORTFOLIO_AFTER_TRAIN", "1") not in ("0", "false", "False")
+    # Устойчивость результата пост-бэктеста: число путей, метод (bootstrap | permute), ширина интервала, %
+    ROBUST_ENABLED = os.environ.get("ROBUST_ENABLED", "1") not in ("0", "false", "False")
+    ROBUST_PATHS = int(os.environ.get("ROBUST_PATHS", "10000"))
+    ROBUST_METHOD = os.environ.get("ROBUST_METHOD", "bootstrap")
+    ROBUST_CI = float(os.environ.get("ROBUST_CI", "90"))
+    # Explain одной точки: окно разогрева признаков/индикаторов по каждому ТФ (>= 400 для EMA200 в снимке) и размер LRU вероятностей
+    EXPLAIN_WARMUP_BARS = int(os.environ.get("EXPLAIN_WARMUP_BARS", "500"))
+    EXPLAIN_CACHE_SIZE = int(os.environ.get("EXPLAIN_CACHE_SIZE", "4096"))
+    # Общий бюджет CPU на листовые задачи обучения/оптимизации/бэктеста (0 -> авто: cpu-1)
+    CPU_BUDGET = _auto_workers(os.environ.get("CPU_BUDGET"))
+    # Очередь обучения: число одновременно выполняемых заданий (по разным тикерам)
+    TRAIN_QUEUE_WORKERS = int(os.environ.get("TRAIN_QUEUE_WORKERS", "2"))
+    # Журнал обучения: период пакетной записи и предел буфера строк в памяти
+    LOG_SINK_FLUSH_SEC = float(os.environ.get("LOG_SINK_FLUSH_SEC", "0.5"))
+    LOG_SINK_MAX_ROWS = int(os.environ.get("LOG_SINK_MAX_ROWS", "5000"))
+    # SSE событий обучения: размер буфера для Last-Event-ID и время жизни одного соединения (потом переподключение)
+    TRAIN_EVENTS_MAX = int(os.environ.get("TRAIN_EVENTS_MAX", "2000"))
+    SSE_MAX_SEC = float(os.environ.get("SSE_MAX_SEC", "300"))
+    # Прореживание status-событий в шине: минимальный шаг прогресса и период (смена статуса/этапа — всегда)
+    TRAIN_EVENTS_MIN_PROGRESS = float(os.environ.get("TRAIN_EVENTS_MIN_PROGRESS", "0.005"))
+    TRAIN_EVENTS_MIN_SEC = float(os.environ.get("TRAIN_EVENTS_MIN_SEC", "2.0"))
 
     # Signal engine thresholds (мягкая иерархия)
     SIG_ENTRY_THRESHOLD = float(os.environ.get("SIG_ENTRY_THRESHOLD", "0.60"))  # порог входа по |score|
@@ -84,6 +158,7 @@ class Config:
         "https://cointelegraph.com/rss"
     ]
     NEWS_AGG_MINUTES = int(os.environ.get("NEWS_AGG_MINUTES", "60"))
+    NEWS_SEEN_MAX = int(os.environ.get("NEWS_SEEN_MAX", "5000"))  # размер набора виденных ссылок на фид
     NEWS_WINDOWS_BY_TF = {
         "15m": [60, 180, 720],
         "1h":  [180, 720, 1440],
@@ -91,6 +166,16 @@ class Config:
         "1d":  [1440, 4320, 10080],
         "1w":  [10080, 43200],
     }
+    # Ключевые слова для привязки новостей к тикерам (base-валюта -> слова):
+    # слова в нижнем регистре — без учёта регистра; с заглавными — точно (тикеры-омонимы: SOL, ADA, ETH, Ether)
+    NEWS_SYMBOL_KEYWORDS = {
+        "BTC": ["bitcoin", "btc"],
+        "ETH": ["ethereum", "Ether", "ETH"],
+        "BNB": ["bnb", "binance coin", "bnb chain"],
+        "SOL": ["solana", "SOL"],
+        "XRP": ["xrp", "ripple"],
+        "ADA": ["cardano", "ADA"],
+    }
 
 
 def configure_logging(level=logging.INFO):
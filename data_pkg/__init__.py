@@ -1 +1,2 @@
-from .ccxt_manager import CCXTDataManager
\ No newline at end of file
+from .ccxt_manager import CCXTDataManager
+from .exchange_pool import ExchangePool, MarketsCache
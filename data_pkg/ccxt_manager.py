@@ -1,8 +1,9 @@
+from __future__ import annotations
 import ccxt
 import pandas as pd
 from datetime import datetime, timedelta
-from config import Config
 from database import DatabaseManager
+from data_pkg.exchange_pool import ExchangePool
 import logging
 import time
 
@@ -23,22 +24,14 @@ TF_TO_MS = {
 
 
 class CCXTDataManager:
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, db: DatabaseManager, pool: ExchangePool | None = None):
         self.db = db
-        self.exchange = getattr(ccxt, Config.EXCHANGE_ID)(
-            {
-                "enableRateLimit": True,
-                "timeout": 30000,
-                "options": {
-                    "defaultType": "spot",
-                    "adjustForTimeDifference": True,
-                },
-            }
-        )
-        try:
-            self.exchange.load_markets()
-        except Exception as e:
-            logger.warning("load_markets warning: %s", e)
+        # биржа создаётся лениво: старт приложения не ждёт сетевого load_markets()
+        self.pool = pool or ExchangePool()
+
+    @property
+    def exchange(self):
+        return self.pool.get("public")
 
     def _to_binance_symbol(self, s: str):
         return s.replace("/", "")
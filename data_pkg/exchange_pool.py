@@ -0,0 +1,137 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import ccxt
+
+from config import Config
+
+logger = logging.getLogger("data")
+
+
+class MarketsCache:
+    """
+    Кэш метаданных рынков биржи (markets/currencies) на диске с TTL.
+    Один JSON-файл на (exchange_id, network): cache/markets_<exchange>_<network>.json
+    """
+    def __init__(self, cache_dir: str | None = None, ttl_sec: float | None = None):
+        self.cache_dir = cache_dir or Config.MARKETS_CACHE_DIR
+        self.ttl_sec = float(Config.MARKETS_CACHE_TTL_SEC if ttl_sec is None else ttl_sec)
+
+    def path(self, exchange_id: str, network: str) -> str:
+        return os.path.join(self.cache_dir, f"markets_{exchange_id}_{network}.json")
+
+    def load(self, exchange_id: str, network: str, allow_expired: bool = False) -> Optional[Dict[str, Any]]:
+        """Payload кэша или None; allow_expired — отдать и просроченный (запасной вариант, когда биржа недоступна)."""
+        p = self.path(exchange_id, network)
+        try:
+            if not allow_expired and time.time() - os.path.getmtime(p) > self.ttl_sec:
+                return None
+            with open(p, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if not payload.get("markets"):
+                return None
+            return payload
+        except Exception:
+            return None
+
+    def save(self, exchange_id: str, network: str, markets: Dict[str, Any], currencies: Dict[str, Any] | None):
+        p = self.path(exchange_id, network)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = p + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"ts": time.time(), "markets": markets, "currencies": currencies or {}}, f, default=str)
+            os.replace(tmp, p)
+        except Exception as e:
+            logger.warning("markets cache save failed (%s): %s", p, e)
+
+
+class ExchangePool:
+    """
+    Долгоживущие экземпляры ccxt-биржи, по одному на (network, api_key).
+    - Экземпляр создаётся лениво при первом обращении, без сетевых запросов.
+    - Рынки подгружаются лениво: сначала из дискового кэша, при промахе — load_markets() с сохранением в кэш.
+    - Для приватных ключей сети держим только последний ключ (при смене ключа старый экземпляр вытесняется).
+    """
+    def __init__(self, exchange_id: str | None = None, markets_cache: MarketsCache | None = None):
+        self.exchange_id = exchange_id or Config.EXCHANGE_ID
+        self.markets_cache = markets_cache or MarketsCache()
+        self._lock = threading.Lock()
+        self._exchanges: Dict[Tuple[str, str], Any] = {}
+        self._ready: Dict[Tuple[str, str], bool] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def _build(self, network: str, api_key: str | None, api_secret: str | None):
+        params: Dict[str, Any] = {
+            "enableRateLimit": True,
+            "timeout": 30000,
+            "options": {
+                "defaultType": "spot",
+                "adjustForTimeDifference": True,
+            },
+        }
+        if api_key:
+            params["apiKey"] = api_key
+            params["secret"] = api_secret
+        ex = getattr(ccxt, self.exchange_id)(params)
+        if network == "testnet":
+            try:
+                ex.set_sandbox_mode(True)
+            except Exception as e:
+                logger.warning("set_sandbox_mode failed: %s", e)
+        return ex
+
+    def get(self, network: str = "public", api_key: str | None = None, api_secret: str | None = None, with_markets: bool = True):
+        key = (network, api_key or "")
+        with self._lock:
+            ex = self._exchanges.get(key)
+            if ex is None:
+                # вытесняем устаревшие ключи той же сети
+                for old in [k for k in self._exchanges if k[0] == network and k != key]:
+                    self._exchanges.pop(old, None)
+                    self._ready.pop(old, None)
+                    self._key_locks.pop(old, None)
+                ex = self._build(network, api_key, api_secret)
+                self._exchanges[key] = ex
+                self._key_locks[key] = threading.Lock()
+            key_lock = self._key_locks[key]
+        if with_markets and not self._ready.get(key):
+            with key_lock:
+                if not self._ready.get(key):
+                    self._ready[key] = self._ensure_markets(ex, network)
+        return ex
+
+    def _ensure_markets(self, ex, network: str) -> bool:
+        cached = self.markets_cache.load(self.exchange_id, network)
+        if cached:
+            try:
+                ex.set_markets(cached["markets"], cached.get("currencies") or None)
+                return True
+            except Exception as e:
+                logger.debug("markets cache apply failed (%s): %s", network, e)
+        try:
+            ex.load_markets()
+        except Exception as e:
+            logger.warning("load_markets warning (%s): %s", network, e)
+            # биржа недоступна — просроченный кэш лучше пустых рынков; готовность не ставим, чтобы повторить загрузку
+            stale = self.markets_cache.load(self.exchange_id, network, allow_expired=True)
+            if stale:
+                try:
+                    ex.set_markets(stale["markets"], stale.get("currencies") or None)
+                except Exception as e2:
+                    logger.debug("stale markets apply failed (%s): %s", network, e2)
+            return False
+        self.markets_cache.save(self.exchange_id, network, ex.markets, getattr(ex, "currencies", None))
+        return True
+
+    def invalidate(self, network: str | None = None):
+        with self._lock:
+            for k in [k for k in self._exchanges if network is None or k[0] == network]:
+                self._exchanges.pop(k, None)
+                self._ready.pop(k, None)
+                self._key_locks.pop(k, None)
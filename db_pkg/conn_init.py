@@ -62,10 +62,29 @@ class _ConnInitMixin:
             model_blob BLOB,
             classes_blob BLOB,
             features JSON,
+            artifact BLOB,
+            version INTEGER,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
             UNIQUE(symbol, timeframe)
         );
 
+        -- Версии моделей: models.version указывает на активную, старые чистит janitor
+        CREATE TABLE IF NOT EXISTS model_versions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            algo TEXT NOT NULL,
+            metrics TEXT,
+            last_full_train_end TEXT,
+            last_incremental_train_end TEXT,
+            model_blob BLOB,
+            classes_blob BLOB,
+            features JSON,
+            artifact BLOB,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_model_versions_pair ON model_versions(symbol, timeframe, id);
+
         CREATE TABLE IF NOT EXISTS training_jobs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             symbol TEXT NOT NULL,
@@ -123,6 +142,15 @@ class _ConnInitMixin:
             symbols TEXT,
             UNIQUE(url)
         );
+        CREATE INDEX IF NOT EXISTS idx_news_published ON news(published_at);
+
+        -- Привязка новостей к тикерам (base-валюта, напр. BTC); заполняется при сохранении
+        CREATE TABLE IF NOT EXISTS news_symbols (
+            news_id INTEGER NOT NULL,
+            symbol TEXT NOT NULL,
+            PRIMARY KEY(news_id, symbol)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_news_symbols_symbol ON news_symbols(symbol, news_id);
 
         CREATE TABLE IF NOT EXISTS model_params (
             symbol TEXT NOT NULL,
@@ -148,10 +176,36 @@ class _ConnInitMixin:
                 c.execute("ALTER TABLE trades ADD COLUMN network TEXT DEFAULT 'testnet'")
             if "origin" not in cols:
                 c.execute("ALTER TABLE trades ADD COLUMN origin TEXT DEFAULT 'bot'")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_trades_net_status ON trades(network, status)")
             conn.commit()
         except Exception as e:
             logger.warning("trades migrate add columns failed: %s", e)
 
+        # миграции models: компактный артефакт модели (npz + JSON) рядом с pickle, указатель активной версии
+        try:
+            c.execute("PRAGMA table_info(models)")
+            cols = {row[1] for row in c.fetchall()}
+            if "artifact" not in cols:
+                c.execute("ALTER TABLE models ADD COLUMN artifact BLOB")
+            if "version" not in cols:
+                c.execute("ALTER TABLE models ADD COLUMN version INTEGER")
+            conn.commit()
+        except Exception as e:
+            logger.warning("models migrate failed: %s", e)
+
+        # миграции training_jobs: приоритет и параметры задания (для очереди)
+        try:
+            c.execute("PRAGMA table_info(training_jobs)")
+            cols = {row[1] for row in c.fetchall()}
+            if "priority" not in cols:
+                c.execute("ALTER TABLE training_jobs ADD COLUMN priority INTEGER DEFAULT 0")
+            if "params" not in cols:
+                c.execute("ALTER TABLE training_jobs ADD COLUMN params JSON")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_tjobs_status ON training_jobs(status, priority)")
+            conn.commit()
+        except Exception as e:
+            logger.warning("training_jobs migrate failed: %s", e)
+
         # Инициализация профиля сигналов по умолчанию при первом запуске
         try:
             cur = conn.cursor()
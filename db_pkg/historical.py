@@ -61,6 +61,17 @@ class _HistoricalMixin:
         conn.close()
         return df
 
+    def load_ohlcv_window(self, symbol, timeframe, until, bars):
+        """Последние bars свечей с open_time <= until (по возрастанию) — окно разогрева для одной точки."""
+        conn = self._conn()
+        q = (
+            "SELECT open_time, open, high, low, close, volume FROM historical_data"
+            " WHERE symbol=? AND timeframe=? AND open_time <= ? ORDER BY open_time DESC LIMIT ?"
+        )
+        df = pd.read_sql_query(q, conn, params=[symbol, timeframe, until, int(bars)], parse_dates=["open_time"], index_col="open_time")
+        conn.close()
+        return df.sort_index()
+
     def get_hist_stats(self, symbol, timeframe):
         from .utils import to_iso
         conn = self._conn()
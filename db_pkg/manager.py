@@ -5,6 +5,7 @@ from .settings import _SettingsMixin
 from .api_keys import _ApiKeysMixin
 from .historical import _HistoricalMixin
 from .models_store import _ModelsMixin
+from .model_versions import _ModelVersionsMixin
 from .training_jobs import _TrainingJobsMixin
 from .training_logs import _TrainingLogsMixin
 from .trades import _TradesMixin
@@ -20,6 +21,7 @@ class DatabaseManager(
     _ApiKeysMixin,
     _HistoricalMixin,
     _ModelsMixin,
+    _ModelVersionsMixin,
     _TrainingJobsMixin,
     _TrainingLogsMixin,
     _TradesMixin,
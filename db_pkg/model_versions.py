@@ -0,0 +1,104 @@
+from __future__ import annotations
+import json
+
+# строка models — «указатель» на активную версию (+ метаданные для статусов), блобы — в model_versions
+_ACTIVATE_SQL = """
+    INSERT INTO models(symbol,timeframe,algo,metrics,last_full_train_end,last_incremental_train_end,model_blob,classes_blob,features,artifact,version)
+    SELECT symbol,timeframe,algo,metrics,last_full_train_end,last_incremental_train_end,NULL,NULL,features,NULL,id
+    FROM model_versions WHERE id=? AND symbol=? AND timeframe=?
+    ON CONFLICT(symbol,timeframe) DO UPDATE SET
+        algo=excluded.algo,
+        metrics=excluded.metrics,
+        last_full_train_end=excluded.last_full_train_end,
+        last_incremental_train_end=excluded.last_incremental_train_end,
+        model_blob=NULL,
+        classes_blob=NULL,
+        features=excluded.features,
+        artifact=NULL,
+        version=excluded.version
+"""
+
+
+class _ModelVersionsMixin:
+    # -------- Версии моделей ----------
+    def _insert_model_version(self, c, symbol, timeframe, algo, metrics, full_end, incr_end, model_bytes, classes_bytes, features, artifact) -> int:
+        c.execute(
+            """
+            INSERT INTO model_versions(symbol,timeframe,algo,metrics,last_full_train_end,last_incremental_train_end,model_blob,classes_blob,features,artifact)
+            VALUES(?,?,?,?,?,?,?,?,?,?)
+            """,
+            (symbol, timeframe, algo, json.dumps(metrics or {}), full_end, incr_end, model_bytes, classes_bytes, json.dumps(features), artifact),
+        )
+        return int(c.lastrowid)
+
+    def activate_model_version(self, symbol: str, timeframe: str, version: int) -> bool:
+        """Атомарно переключить активную версию (одним UPSERT): читатели видят либо старую, либо новую модель."""
+        conn = self._conn()
+        c = conn.cursor()
+        c.execute(_ACTIVATE_SQL, (int(version), symbol, timeframe))
+        ok = c.rowcount > 0
+        conn.commit()
+        conn.close()
+        return ok
+
+    def get_active_model_version(self, symbol: str, timeframe: str):
+        """Версия активной модели (int), None — нет модели или старая запись без версии."""
+        conn = self._conn()
+        c = conn.cursor()
+        c.execute("SELECT version FROM models WHERE symbol=? AND timeframe=?", (symbol, timeframe))
+        row = c.fetchone()
+        conn.close()
+        return int(row[0]) if row and row[0] is not None else None
+
+    def list_model_versions(self, symbol: str, timeframe: str):
+        conn = self._conn()
+        c = conn.cursor()
+        c.execute("SELECT version FROM models WHERE symbol=? AND timeframe=?", (symbol, timeframe))
+        row = c.fetchone()
+        active = row[0] if row else None
+        c.execute(
+            """
+            SELECT id, algo, metrics, last_full_train_end, last_incremental_train_end, created_at
+            FROM model_versions WHERE symbol=? AND timeframe=? ORDER BY id DESC
+            """,
+            (symbol, timeframe),
+        )
+        out = []
+        for vid, algo, metrics, full_end, incr_end, created in c.fetchall():
+            out.append({
+                "version": vid,
+                "algo": algo,
+                "metrics": json.loads(metrics or "{}"),
+                "last_full_train_end": full_end,
+                "last_incremental_train_end": incr_end,
+                "created_at": str(created) if created is not None else None,
+                "active": vid == active,
+            })
+        conn.close()
+        return out
+
+    def prune_model_versions(self, keep: int = 3, protected=()) -> int:
+        """
+        Удалить вытесненные версии: кроме активных, защищённых (закреплённых читателями)
+        и `keep` последних на пару. Возвращает число удалённых.
+        Номер версии в паре — оконной функцией за один проход (а не COUNT по каждой строке).
+        """
+        conn = self._conn()
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY symbol, timeframe ORDER BY id DESC) AS rn
+                FROM model_versions
+            )
+            WHERE rn > ? AND id NOT IN (SELECT version FROM models WHERE version IS NOT NULL)
+            """,
+            (max(0, int(keep)),),
+        )
+        keep_ids = {int(v) for v in protected or ()}
+        ids = [(int(r[0]),) for r in c.fetchall() if int(r[0]) not in keep_ids]
+        if ids:
+            c.executemany("DELETE FROM model_versions WHERE id=?", ids)
+        conn.commit()
+        conn.close()
+        return len(ids)
@@ -1,7 +1,9 @@
 from __future__ import annotations
 import json
 import io
-import joblib
+
+from config import Config
+from .model_versions import _ACTIVATE_SQL
 
 
 class _ModelsMixin:
@@ -17,74 +19,125 @@ class _ModelsMixin:
         last_full_end=None,
         last_incr_end=None,
         metrics=None,
+        activate=True,
     ):
+        """
+        Новая версия модели в model_versions; при activate=True в той же транзакции
+        строка models переключается на неё (без окна «модели нет»). Возвращает id версии.
+        """
+        from model_pkg.artifact import pack_bundle
+        # логистический bundle -> компактный артефакт (npz + JSON); pickle — только для прочих моделей
+        # или если включён MODEL_STORE_PICKLE (совместимость со старыми версиями приложения)
+        artifact = pack_bundle(model, extra={"classes_saved": list(classes or [])})
+        model_bytes = classes_bytes = None
+        if artifact is None or getattr(Config, "MODEL_STORE_PICKLE", False):
+            import joblib
+            mbuf = io.BytesIO()
+            joblib.dump(model, mbuf)
+            cbuf = io.BytesIO()
+            joblib.dump(classes, cbuf)
+            model_bytes, classes_bytes = mbuf.getvalue(), cbuf.getvalue()
         conn = self._conn()
         c = conn.cursor()
-        mbuf = io.BytesIO()
-        joblib.dump(model, mbuf)
-        cbuf = io.BytesIO()
-        joblib.dump(classes, cbuf)
-        last_full_str = self._to_iso(last_full_end)
-        last_incr_str = self._to_iso(last_incr_end)
-
-        c.execute(
-            """
-            INSERT INTO models(symbol,timeframe,algo,metrics,last_full_train_end,last_incremental_train_end,model_blob,classes_blob,features)
-            VALUES(?,?,?,?,?,?,?,?,?)
-            ON CONFLICT(symbol,timeframe) DO UPDATE SET 
-                algo=excluded.algo,
-                metrics=excluded.metrics,
-                last_full_train_end=excluded.last_full_train_end,
-                last_incremental_train_end=excluded.last_incremental_train_end,
-                model_blob=excluded.model_blob,
-                classes_blob=excluded.classes_blob,
-                features=excluded.features
-        """,
-            (
-                symbol,
-                timeframe,
-                algo,
-                json.dumps(metrics or {}),
-                last_full_str,
-                last_incr_str,
-                mbuf.getvalue(),
-                cbuf.getvalue(),
-                json.dumps(features),
-            ),
-        )
-        conn.commit()
-        conn.close()
+        try:
+            version = self._insert_model_version(
+                c, symbol, timeframe, algo, metrics,
+                self._to_iso(last_full_end), self._to_iso(last_incr_end),
+                model_bytes, classes_bytes, features, artifact,
+            )
+            if activate:
+                c.execute(_ACTIVATE_SQL, (version, symbol, timeframe))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return version
 
-    def update_model_metrics(self, symbol: str, timeframe: str, new_metrics: dict):
+    def update_model_metrics(self, symbol: str, timeframe: str, new_metrics: dict, version=None):
+        """
+        Дописать метрики в версию модели version (None — активную на момент записи).
+        Строка models обновляется, только если эта версия всё ещё активна: бэктест, закончившийся
+        после активации новой версии, не припишет ей свои bt_* метрики.
+        """
         conn = self._conn()
         c = conn.cursor()
-        c.execute("SELECT metrics FROM models WHERE symbol=? AND timeframe=?", (symbol, timeframe))
-        row = c.fetchone()
-        cur = {}
-        if row and row[0]:
-            try:
-                cur = json.loads(row[0]) or {}
-            except Exception:
-                cur = {}
-        cur.update(new_metrics or {})
-        c.execute("UPDATE models SET metrics=? WHERE symbol=? AND timeframe=?", (json.dumps(cur), symbol, timeframe))
-        conn.commit()
-        conn.close()
+        try:
+            if version is None:
+                c.execute("SELECT version, metrics FROM models WHERE symbol=? AND timeframe=?", (symbol, timeframe))
+            else:
+                c.execute(
+                    "SELECT id, metrics FROM model_versions WHERE id=? AND symbol=? AND timeframe=?",
+                    (int(version), symbol, timeframe),
+                )
+            row = c.fetchone()
+            if not row:
+                return
+            version = row[0]
+            cur = {}
+            if row[1]:
+                try:
+                    cur = json.loads(row[1]) or {}
+                except Exception:
+                    cur = {}
+            cur.update(new_metrics or {})
+            if version is None:
+                # старая запись без версий
+                c.execute("UPDATE models SET metrics=? WHERE symbol=? AND timeframe=?", (json.dumps(cur), symbol, timeframe))
+            else:
+                c.execute("UPDATE model_versions SET metrics=? WHERE id=?", (json.dumps(cur), int(version)))
+                c.execute(
+                    "UPDATE models SET metrics=? WHERE symbol=? AND timeframe=? AND version=?",
+                    (json.dumps(cur), symbol, timeframe, int(version)),
+                )
+            conn.commit()
+        finally:
+            conn.close()
 
-    def load_model(self, symbol, timeframe):
+    def load_model(self, symbol, timeframe, version=None):
+        """
+        Активная модель пары (или конкретная версия, если version задан) — одним SELECT,
+        т.е. согласованный снимок даже при одновременной активации новой версии.
+        Компактный артефакт читается без pickle и без sklearn (CompactLogReg/CompactScaler);
+        pickle (model_blob) — только для старых моделей без артефакта.
+        """
         conn = self._conn()
         c = conn.cursor()
-        c.execute(
-            "SELECT algo, metrics, last_full_train_end, last_incremental_train_end, model_blob, classes_blob, features FROM models WHERE symbol=? AND timeframe=?",
-            (symbol, timeframe),
-        )
+        if version is None:
+            c.execute(
+                """
+                SELECT m.algo, m.metrics, m.last_full_train_end, m.last_incremental_train_end,
+                       COALESCE(v.artifact, m.artifact), COALESCE(v.model_blob, m.model_blob),
+                       COALESCE(v.classes_blob, m.classes_blob), m.features, m.version
+                FROM models m LEFT JOIN model_versions v ON v.id = m.version
+                WHERE m.symbol=? AND m.timeframe=?
+                """,
+                (symbol, timeframe),
+            )
+        else:
+            c.execute(
+                """
+                SELECT algo, metrics, last_full_train_end, last_incremental_train_end,
+                       artifact, model_blob, classes_blob, features, id
+                FROM model_versions WHERE id=? AND symbol=? AND timeframe=?
+                """,
+                (int(version), symbol, timeframe),
+            )
         row = c.fetchone()
         conn.close()
         if not row:
             return None
-        algo, metrics, full_end, incr_end, mb, cb, feats = row
-        model = joblib.load(io.BytesIO(mb)) if mb else None
-        classes = joblib.load(io.BytesIO(cb)) if cb else None
+        algo, metrics, full_end, incr_end, art, mb, cb, feats, ver = row
+        model = classes = None
+        if art:
+            from model_pkg.artifact import unpack_bundle
+            model = unpack_bundle(art)
+            classes = model["artifact"].get("classes_saved")
+        elif mb or cb:
+            import joblib
+            model = joblib.load(io.BytesIO(mb)) if mb else None
+            classes = joblib.load(io.BytesIO(cb)) if cb else None
         features = json.loads(feats) if feats else []
         return {
             "algo": algo,
@@ -94,6 +147,7 @@ class _ModelsMixin:
             "model": model,
             "classes": classes,
             "features": features,
+            "version": ver,
         }
 
     def get_pairs_status(self, symbols, timeframes):
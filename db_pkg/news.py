@@ -18,12 +18,59 @@ class _NewsMixin:
             """,
                 (provider, title, url, published_at, summary, sentiment, symbols_csv),
             )
+            if c.rowcount:
+                self._insert_news_symbols(c, c.lastrowid, symbols_csv)
             conn.commit()
         except Exception as e:
             logger.warning("news insert error: %s", e)
         finally:
             conn.close()
 
+    def add_news_many(self, rows):
+        """
+        Пакетная вставка новостей одной транзакцией.
+        rows: [(provider, title, url, published_at, summary, sentiment, symbols_csv), ...]
+        Возвращает число реально добавленных (новых по url) записей;
+        None — транзакция откатилась (например, database is locked), ничего не записано.
+        """
+        if not rows:
+            return 0
+        conn = self._conn()
+        c = conn.cursor()
+        inserted: int | None = 0
+        try:
+            for row in rows:
+                c.execute(
+                    """
+                INSERT OR IGNORE INTO news(provider,title,url,published_at,summary,sentiment,symbols)
+                VALUES(?,?,?,?,?,?,?)
+                """,
+                    tuple(row),
+                )
+                if c.rowcount:
+                    inserted += 1
+                    self._insert_news_symbols(c, c.lastrowid, row[6])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            inserted = None
+            logger.warning("news batch insert error: %s", e)
+        finally:
+            conn.close()
+        return inserted
+
+    @staticmethod
+    def _split_symbols(symbols_csv):
+        return sorted({x.strip().upper() for x in str(symbols_csv or "").split(",") if x.strip()})
+
+    def _insert_news_symbols(self, c, news_id, symbols_csv):
+        syms = self._split_symbols(symbols_csv)
+        if syms:
+            c.executemany(
+                "INSERT OR IGNORE INTO news_symbols(news_id, symbol) VALUES(?,?)",
+                [(news_id, s) for s in syms],
+            )
+
     def news_since(self, since_dt, limit=200):
         conn = self._conn()
         df = pd.read_sql_query(
@@ -36,4 +83,51 @@ class _NewsMixin:
             parse_dates=["published_at"],
         )
         conn.close()
-        return df
\ No newline at end of file
+        return df
+
+    def news_after_id(self, after_id=0):
+        """
+        Сводка по новостям с id > after_id (id растут с каждой вставкой — водяной знак кэша признаков):
+        {"max_id", "first", "last"} — максимальный id и диапазон published_at; None — таких новостей нет.
+        """
+        conn = self._conn()
+        try:
+            row = conn.execute(
+                "SELECT MAX(id), MIN(published_at), MAX(published_at) FROM news WHERE id > ?",
+                (int(after_id or 0),),
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row or row[0] is None:
+            return None
+        return {"max_id": int(row[0]), "first": row[1], "last": row[2]}
+
+    _NEWS_COLUMNS = ("provider", "title", "url", "published_at", "summary", "sentiment", "symbols")
+
+    def news_between(self, since_dt, until_dt=None, symbol=None, columns=None):
+        """
+        Новости с published_at в [since_dt, until_dt] по возрастанию времени, без лимита.
+        Диапазон ограничивается индексом idx_news_published.
+        symbol — 'BTC/USDT' или 'BTC': только новости с этим тикером и новости без привязки.
+        columns — подмножество колонок (для агрегаций достаточно published_at, sentiment).
+        """
+        cols = [c for c in (columns or self._NEWS_COLUMNS) if c in self._NEWS_COLUMNS] or list(self._NEWS_COLUMNS)
+        q = "SELECT " + ",".join("n." + c for c in cols) + " FROM news n WHERE n.published_at >= ?"
+        params = [since_dt]
+        if until_dt is not None:
+            q += " AND n.published_at <= ?"; params.append(until_dt)
+        if symbol:
+            base = (symbol.split("/")[0] if "/" in symbol else symbol).upper()
+            q += """ AND (NOT EXISTS (SELECT 1 FROM news_symbols s WHERE s.news_id=n.id)
+                     OR EXISTS (SELECT 1 FROM news_symbols s WHERE s.news_id=n.id AND s.symbol=?))"""
+            params.append(base)
+        q += " ORDER BY n.published_at ASC"
+        conn = self._conn()
+        df = pd.read_sql_query(
+            q,
+            conn,
+            params=params,
+            parse_dates=["published_at"] if "published_at" in cols else None,
+        )
+        conn.close()
+        return df
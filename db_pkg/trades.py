@@ -69,6 +69,30 @@ class _TradesMixin:
 
         return df.to_dict(orient="records")
 
+    def get_trades_summary(self, network=None):
+        """
+        Агрегаты по сделкам одним SQL-запросом (без выгрузки строк):
+        {"open_count", "closed_count", "total_pnl_percent"}.
+        """
+        conn = self._conn()
+        q = """
+            SELECT
+                COALESCE(SUM(CASE WHEN status='open' THEN 1 ELSE 0 END), 0),
+                COALESCE(SUM(CASE WHEN status='closed' THEN 1 ELSE 0 END), 0),
+                COALESCE(SUM(CASE WHEN status='closed' THEN COALESCE(pnl_percent, 0.0) ELSE 0.0 END), 0.0)
+            FROM trades
+        """
+        params = []
+        if network:
+            q += " WHERE network=?"; params.append(network)
+        row = conn.execute(q, params).fetchone()
+        conn.close()
+        return {
+            "open_count": int(row[0] or 0),
+            "closed_count": int(row[1] or 0),
+            "total_pnl_percent": float(row[2] or 0.0),
+        }
+
     def get_open_trades_by_symbol_network(self, symbol: str, network: str):
         conn = self._conn()
         df = pd.read_sql_query(
@@ -1,14 +1,15 @@
 from __future__ import annotations
+import json
 
 
 class _TrainingJobsMixin:
     # -------- Training jobs ----------
-    def create_training_job(self, symbol, timeframes):
+    def create_training_job(self, symbol, timeframes, priority=0, params=None):
         conn = self._conn()
         c = conn.cursor()
         c.execute(
-            "INSERT INTO training_jobs(symbol,timeframes,status,progress) VALUES(?,?,?,?)",
-            (symbol, ",".join(timeframes), "queued", 0),
+            "INSERT INTO training_jobs(symbol,timeframes,status,progress,priority,params) VALUES(?,?,?,?,?,?)",
+            (symbol, ",".join(timeframes), "queued", 0, int(priority or 0), json.dumps(params or {})),
         )
         jid = c.lastrowid
         conn.commit()
@@ -66,7 +67,7 @@ class _TrainingJobsMixin:
             SELECT id,symbol,timeframes,status,progress,message,started_at,updated_at
             FROM training_jobs
             WHERE status IN ('queued','running')
-            ORDER BY updated_at DESC
+            ORDER BY CASE status WHEN 'running' THEN 0 ELSE 1 END, updated_at DESC
             LIMIT 1
             """
         )
@@ -83,4 +84,41 @@ class _TrainingJobsMixin:
             "message": row[5],
             "started_at": row[6],
             "updated_at": row[7],
-        }
\ No newline at end of file
+        }
+
+    def update_training_job_request(self, job_id, timeframes, priority, params):
+        """Обновить запрос ожидающего задания (слияние дублей в очереди)."""
+        conn = self._conn()
+        conn.execute(
+            "UPDATE training_jobs SET timeframes=?, priority=?, params=?, updated_at=CURRENT_TIMESTAMP WHERE id=? AND status='queued'",
+            (",".join(timeframes), int(priority or 0), json.dumps(params or {}), job_id),
+        )
+        conn.commit()
+        conn.close()
+
+    def list_training_jobs(self, statuses=("queued", "running")):
+        """Задания в указанных статусах с приоритетом и параметрами (для очереди)."""
+        statuses = list(statuses)
+        conn = self._conn()
+        c = conn.cursor()
+        c.execute(
+            f"""
+            SELECT id,symbol,timeframes,status,COALESCE(priority,0),params
+            FROM training_jobs WHERE status IN ({",".join("?" * len(statuses))})
+            ORDER BY id ASC
+            """,
+            statuses,
+        )
+        rows = c.fetchall()
+        conn.close()
+        out = []
+        for r in rows:
+            try:
+                params = json.loads(r[5]) if r[5] else {}
+            except Exception:
+                params = {}
+            out.append({
+                "id": r[0], "symbol": r[1], "timeframes": r[2].split(","), "status": r[3],
+                "priority": int(r[4] or 0), "params": params,
+            })
+        return out
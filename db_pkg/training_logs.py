@@ -30,4 +30,31 @@ class _TrainingLogsMixin:
             params.append(limit)
         df = pd.read_sql_query(q, conn, params=params, parse_dates=["ts"])
         conn.close()
-        return df.to_dict(orient="records")
\ No newline at end of file
+        return df.to_dict(orient="records")
+
+    def write_training_batch(self, logs, statuses) -> bool:
+        """
+        Пакетная запись журнала обучения одной транзакцией.
+        logs: [(job_id, ts, level, phase, message, data_json), ...] — ts фиксируется при записи в буфер, не при сбросе.
+        statuses: {job_id: {"status", "progress", "message"}} — последнее состояние задания.
+        """
+        conn = self._conn()
+        c = conn.cursor()
+        try:
+            if logs:
+                c.executemany("INSERT INTO training_logs(job_id,ts,level,phase,message,data) VALUES(?,?,?,?,?,?)", logs)
+            for job_id, st in (statuses or {}).items():
+                c.execute(
+                    """
+                    UPDATE training_jobs SET status=COALESCE(?, status), progress=COALESCE(?, progress),
+                        message=COALESCE(?, message), updated_at=CURRENT_TIMESTAMP WHERE id=?
+                    """,
+                    (st.get("status"), st.get("progress"), st.get("message"), job_id),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return True
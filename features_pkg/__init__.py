@@ -0,0 +1,2 @@
+from .matrix import build_feature_matrix, build_news_features_safe
+from .cache import FeatureCache, feature_frame, get_feature_cache
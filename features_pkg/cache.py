@@ -0,0 +1,268 @@
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from data_pkg.ccxt_manager import TF_TO_MS
+from indicator_settings import sanitize_indicator_settings
+from news_features import _windows_for_tf
+from .matrix import build_feature_matrix, build_news_features_safe
+
+logger = logging.getLogger("features")
+
+# версия формата/состава признаков: меняем при изменении build_features/news_features
+FEATURES_VERSION = 1
+_OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+def _to_ns(index) -> np.ndarray:
+    return np.asarray(pd.DatetimeIndex(index).values.astype("datetime64[ns]")).view(np.int64)
+
+
+def _ts_naive(v) -> pd.Timestamp:
+    t = pd.Timestamp(v)
+    return t.tz_convert(None) if t.tzinfo is not None else t
+
+
+def _tail_rows(df: pd.DataFrame, n: int) -> list:
+    t = df.tail(n)
+    ns = _to_ns(t.index)
+    vals = t[_OHLCV].to_numpy(dtype=float)
+    return [[int(ns[i])] + [float(v) for v in vals[i]] for i in range(len(t))]
+
+
+class FeatureCache:
+    """
+    Дисковый кэш матриц признаков (тех. + новости) на ключ (symbol, TF, хэш настроек).
+    Каталог ключа: X.f32 (float32, rows x cols), idx.i64 (open_time, ns), meta.json.
+    - Новые свечи дописываются в конец: признаки считаются на окне [разогрев + новые бары].
+    - Отпечаток последних баров (OHLCV) сверяется с БД: изменённые (например, незакрытая свеча) пересчитываются.
+    - Водяной знак новостей (meta.news_id — max id на момент расчёта): новости, пришедшие позже, пересчитывают
+      новостные колонки только тех строк, в окна которых они попали.
+    - Чтение — через memmap и только под блокировкой ключа (наружу отдаются копии).
+    """
+    def __init__(self, cache_dir: str | None = None):
+        self.cache_dir = cache_dir or Config.FEATURE_CACHE_DIR
+        self.warmup = int(getattr(Config, "FEATURE_CACHE_WARMUP_BARS", 500))
+        self.tail_n = max(1, int(getattr(Config, "FEATURE_CACHE_TAIL_BARS", 3)))
+        self._locks: Dict[str, threading.RLock] = {}
+        self._guard = threading.Lock()
+
+    def key(self, symbol: str, timeframe: str, settings: Dict[str, Any] | None) -> str:
+        payload = {"v": FEATURES_VERSION, "ind": sanitize_indicator_settings(settings), "news": _windows_for_tf(timeframe)}
+        h = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+        return f"{symbol.replace('/', '')}_{timeframe}_{h}"
+
+    def _lock(self, key: str) -> threading.RLock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.RLock())
+
+    def _paths(self, key: str):
+        d = os.path.join(self.cache_dir, key)
+        return d, os.path.join(d, "X.f32"), os.path.join(d, "idx.i64"), os.path.join(d, "meta.json")
+
+    # -------- низкоуровневое хранение --------
+    def _read_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        _d, px, pi, pm = self._paths(key)
+        try:
+            with open(pm, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            n, c = int(meta["n_rows"]), len(meta["columns"])
+            if meta.get("version") != FEATURES_VERSION or os.path.getsize(px) < n * c * 4 or os.path.getsize(pi) < n * 8:
+                return None
+            return meta
+        except Exception:
+            return None
+
+    def _write_meta(self, key: str, meta: Dict[str, Any]):
+        _d, _px, _pi, pm = self._paths(key)
+        tmp = pm + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, pm)
+
+    def _write(self, key: str, keep_rows: int, X: np.ndarray, idx_ns: np.ndarray, columns, tail, first_ns: int, news_id: int):
+        """Оставить первые keep_rows строк и дописать X/idx (keep_rows=0 — полная перезапись)."""
+        d, px, pi, _pm = self._paths(key)
+        os.makedirs(d, exist_ok=True)
+        c = len(columns)
+        for path, row_bytes, arr in ((px, c * 4, np.ascontiguousarray(X, dtype=np.float32)),
+                                     (pi, 8, np.ascontiguousarray(idx_ns, dtype=np.int64))):
+            with open(path, "r+b" if (keep_rows and os.path.exists(path)) else "wb") as f:
+                f.truncate(keep_rows * row_bytes)
+                f.seek(keep_rows * row_bytes)
+                arr.tofile(f)
+        self._write_meta(key, {
+            "version": FEATURES_VERSION, "columns": list(columns), "n_rows": int(keep_rows + len(idx_ns)),
+            "first_ns": int(first_ns), "tail": tail, "news_id": int(news_id),
+        })
+
+    def _load_arrays(self, key: str, meta: Dict[str, Any]):
+        _d, px, pi, _pm = self._paths(key)
+        n, c = int(meta["n_rows"]), len(meta["columns"])
+        if n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, c), dtype=np.float32)
+        idx = np.memmap(pi, dtype=np.int64, mode="r", shape=(n,))
+        X = np.memmap(px, dtype=np.float32, mode="r", shape=(n, c))
+        return idx, X
+
+    # -------- построение / дозапись --------
+    def _build_full(self, db, symbol: str, timeframe: str, settings, key: str, news_id: int) -> Optional[Dict[str, Any]]:
+        df = db.load_ohlcv(symbol, timeframe, since=None, limit=None)
+        if df is None or df.empty:
+            return None
+        X = build_feature_matrix(db, df, timeframe, settings)
+        if X.empty or X.shape[1] == 0:
+            return None
+        ns = _to_ns(df.index)
+        self._write(key, 0, X.to_numpy(dtype=np.float32), ns, list(map(str, X.columns)), _tail_rows(df, self.tail_n), int(ns[0]), news_id)
+        logger.info("feature cache built %s rows=%s", key, len(df))
+        return self._read_meta(key)
+
+    def refresh(self, db, symbol: str, timeframe: str, settings) -> Optional[Dict[str, Any]]:
+        """Привести кэш ключа в соответствие с БД; вызывать под self._lock(key)."""
+        key = self.key(symbol, timeframe, settings)
+        meta = self._read_meta(key)
+        if meta is not None and "news_id" not in meta:
+            meta = None  # кэш без водяного знака новостей — пересобрать
+        # водяной знак снимается до расчёта признаков: новости, пришедшие во время расчёта, догонит следующий refresh
+        news = db.news_after_id(int(meta["news_id"]) if meta else 0)
+        news_id = int(news["max_id"]) if news else int(meta["news_id"] if meta else 0)
+        meta = self._refresh_bars(db, symbol, timeframe, settings, key, meta, news_id)
+        if meta is not None and news is not None and int(meta["news_id"]) < news_id:
+            meta = self._refresh_news(db, timeframe, key, meta, news)
+        return meta
+
+    def _refresh_bars(self, db, symbol: str, timeframe: str, settings, key: str, meta, news_id: int):
+        """OHLCV-часть refresh: дозапись новых баров и пересчёт изменившегося хвоста (news_id — для полной пересборки)."""
+        if meta is None or not meta.get("tail"):
+            return self._build_full(db, symbol, timeframe, settings, key, news_id)
+
+        # история расширена назад (force_full sync) — полная пересборка
+        first = (db.get_hist_stats(symbol, timeframe) or {}).get("first")
+        if first and int(_to_ns([pd.Timestamp(first)])[0]) < int(meta["first_ns"]):
+            return self._build_full(db, symbol, timeframe, settings, key, news_id)
+
+        tail = meta["tail"]
+        tf_ms = TF_TO_MS.get(timeframe, 3_600_000)
+        since = pd.Timestamp(int(tail[0][0])) - pd.Timedelta(milliseconds=tf_ms * self.warmup)
+        df = db.load_ohlcv(symbol, timeframe, since=since.to_pydatetime(), limit=None)
+        if df is None or df.empty:
+            return meta
+
+        # первый изменившийся (или пропавший) бар из отпечатка хвоста
+        n = int(meta["n_rows"])
+        ns = _to_ns(df.index)
+        vals = df[_OHLCV].to_numpy(dtype=float)
+        keep = n
+        for k, row in enumerate(tail):
+            pos = int(np.searchsorted(ns, int(row[0])))
+            same = pos < len(ns) and ns[pos] == int(row[0]) and np.array_equal(vals[pos], np.asarray(row[1:], dtype=float), equal_nan=True)
+            if not same:
+                keep = n - len(tail) + k
+                break
+        if keep <= 0:
+            return self._build_full(db, symbol, timeframe, settings, key, news_id)
+        idx_mm, _X = self._load_arrays(key, meta)
+        last_kept_ns = int(idx_mm[keep - 1])
+        del idx_mm, _X
+        new_mask = ns > last_kept_ns
+        if keep == n and not new_mask.any():
+            return meta
+
+        X = build_feature_matrix(db, df, timeframe, settings)
+        if list(map(str, X.columns)) != list(meta["columns"]):
+            return self._build_full(db, symbol, timeframe, settings, key, news_id)
+        self._write(key, keep, X.to_numpy(dtype=np.float32)[new_mask], ns[new_mask], meta["columns"],
+                    _tail_rows(df, self.tail_n), int(meta["first_ns"]), int(meta["news_id"]))
+        return self._read_meta(key)
+
+    def _refresh_news(self, db, timeframe: str, key: str, meta: Dict[str, Any], news: Dict[str, Any]):
+        """
+        Пересчитать новостные колонки строк, в окна которых попали новости с id > meta["news_id"]:
+        бар t видит новость минуты p при p in (t - win, t], т.е. строки open_time in [first, last + max(win)).
+        """
+        n, columns = int(meta["n_rows"]), list(meta["columns"])
+        cols = [j for j, c in enumerate(columns) if c.startswith("news_")]
+        if n and cols and news.get("first") is not None:
+            lo = _ts_naive(news["first"]).floor("min")
+            hi = _ts_naive(news["last"]).floor("min") + pd.Timedelta(minutes=max(_windows_for_tf(timeframe)))
+            _d, px, pi, _pm = self._paths(key)
+            idx = np.memmap(pi, dtype=np.int64, mode="r", shape=(n,))
+            a, b = int(np.searchsorted(idx, lo.value)), int(np.searchsorted(idx, hi.value))
+            index = pd.DatetimeIndex(np.asarray(idx[a:b]).astype("datetime64[ns]"))
+            del idx
+            if b > a:
+                feats = build_news_features_safe(db, pd.DataFrame(index=index), timeframe)
+                if feats is None:
+                    return meta  # ошибка расчёта — водяной знак не двигаем, повторим на следующем refresh
+                vals = feats.reindex(columns=[columns[j] for j in cols]).fillna(0.0).to_numpy(dtype=np.float32)
+                X = np.memmap(px, dtype=np.float32, mode="r+", shape=(n, len(columns)))
+                X[a:b, cols] = vals
+                X.flush()
+                del X
+                logger.info("feature cache news patched %s rows=%s", key, b - a)
+        meta = {**meta, "news_id": int(news["max_id"])}
+        self._write_meta(key, meta)
+        return meta
+
+    def frame(self, db, symbol: str, timeframe: str, settings, index, df: pd.DataFrame | None = None) -> Optional[pd.DataFrame]:
+        """
+        Признаки для строк index (float64-копия) или None, если каких-то строк нет в кэше
+        либо последний бар df отличается по OHLCV от закэшированного (незакрытая свеча).
+        """
+        key = self.key(symbol, timeframe, settings)
+        with self._lock(key):
+            meta = self.refresh(db, symbol, timeframe, settings)
+            if meta is None or int(meta["n_rows"]) == 0:
+                return None
+            if df is not None and len(df):
+                last = _tail_rows(df, 1)[0]
+                for row in meta.get("tail") or []:
+                    if int(row[0]) == last[0] and not np.array_equal(np.asarray(row[1:]), np.asarray(last[1:]), equal_nan=True):
+                        return None
+            idx, X = self._load_arrays(key, meta)
+            want = _to_ns(index)
+            pos = np.searchsorted(idx, want)
+            pos_c = np.minimum(pos, len(idx) - 1)
+            if len(want) and not np.array_equal(np.asarray(idx[pos_c]), want):
+                return None
+            data = np.asarray(X[pos_c], dtype=np.float64)
+            del idx, X
+        return pd.DataFrame(data, index=index, columns=meta["columns"])
+
+
+_DEFAULT: Optional[FeatureCache] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_feature_cache() -> FeatureCache:
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = FeatureCache()
+        return _DEFAULT
+
+
+def feature_frame(db, symbol: str, timeframe: str, settings: Dict[str, Any] | None, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Матрица признаков для баров df: из кэша, если все бары уже в БД/кэше и совпадают по OHLCV,
+    иначе (например, незакрытая свеча из WS) — прямой расчёт на df.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(index=getattr(df, "index", None))
+    if getattr(Config, "FEATURE_CACHE_ENABLED", True) and db is not None and isinstance(df.index, pd.DatetimeIndex):
+        try:
+            X = get_feature_cache().frame(db, symbol, timeframe, settings, df.index, df=df)
+            if X is not None:
+                return X
+        except Exception as e:
+            logger.warning("feature cache failed %s %s: %s", symbol, timeframe, e)
+    return build_feature_matrix(db, df, timeframe, settings)
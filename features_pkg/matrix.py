@@ -0,0 +1,42 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from features import build_features
+
+
+def build_news_features_safe(db, df: pd.DataFrame, timeframe: str) -> Optional[pd.DataFrame]:
+    try:
+        from news_features import aggregate_news_features
+    except Exception:
+        return None
+
+    try:
+        if not isinstance(df.index, pd.DatetimeIndex) or df.index.size == 0:
+            return None
+        feats = aggregate_news_features(db, df.index, timeframe)
+        if feats is None or feats.empty:
+            return None
+        feats = feats.reindex(df.index, method="pad").fillna(0.0)
+        feats = feats.replace([np.inf, -np.inf], 0.0).fillna(0.0)
+        return feats
+    except Exception:
+        return None
+
+
+def build_feature_matrix(db, df: pd.DataFrame, timeframe: str, settings: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Полная матрица признаков модели: тех.индикаторы (features.build_features)
+    + «сырые» новостные признаки (news_features). Одинакова для обучения, precompute и предсказаний.
+    """
+    X_tech = build_features(df, settings)
+    if X_tech is None or X_tech.empty:
+        return pd.DataFrame(index=df.index)
+    X_news = build_news_features_safe(db, df, timeframe) if db is not None else None
+    if X_news is not None and not X_news.empty:
+        X = X_tech.join(X_news, how="left")
+    else:
+        X = X_tech.copy()
+    return X.replace([np.inf, -np.inf], np.nan).fillna(0.0)
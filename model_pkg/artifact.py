@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import io
+import json
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# версия формата компактного артефакта (npz: linear=[b|W], scaler=[mean;scale;var], classes, meta_json как uint8)
+ARTIFACT_VERSION = 1
+
+
+class CompactScaler:
+    """Замена StandardScaler для инференса: (X - mean) / scale, без sklearn."""
+    def __init__(self, mean, scale, var=None, n_samples_seen=None):
+        self.mean_ = np.asarray(mean, dtype=float)
+        self.scale_ = np.asarray(scale, dtype=float)
+        self.var_ = None if var is None else np.asarray(var, dtype=float)
+        self.n_samples_seen_ = n_samples_seen
+        self.n_features_in_ = int(self.mean_.size)
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, scaler expects {self.n_features_in_}")
+        return (X - self.mean_) / self.scale_
+
+
+class CompactLogReg:
+    """Замена LogisticRegression для инференса: бинарный случай — сигмоида, иначе — softmax."""
+    def __init__(self, coef, intercept, classes, C: float = 1.0):
+        self.coef_ = np.asarray(coef, dtype=float)
+        self.intercept_ = np.asarray(intercept, dtype=float)
+        self.classes_ = np.asarray(classes)
+        self.C = float(C)
+        self.n_features_in_ = int(self.coef_.shape[1])
+
+    def decision_function(self, X):
+        Z = np.asarray(X, dtype=float) @ self.coef_.T + self.intercept_
+        return Z[:, 0] if Z.shape[1] == 1 else Z
+
+    def predict_proba(self, X):
+        Z = self.decision_function(X)
+        if Z.ndim == 1:
+            p = 1.0 / (1.0 + np.exp(-Z))
+            return np.vstack([1.0 - p, p]).T
+        Z = Z - Z.max(axis=1, keepdims=True)
+        P = np.exp(Z)
+        return P / P.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def _is_linear(clf) -> bool:
+    return all(hasattr(clf, a) for a in ("coef_", "intercept_", "classes_"))
+
+
+def pack_bundle(bundle: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> Optional[bytes]:
+    """
+    Бандл логистической модели -> компактный артефакт (bytes) или None,
+    если модель/скейлер не линейные (тогда хранится pickle).
+    """
+    if not isinstance(bundle, dict):
+        return None
+    clf, scaler = bundle.get("model"), bundle.get("scaler")
+    if clf is None or not _is_linear(clf):
+        return None
+    # мало членов архива: чтение npz стоит ~0.1 мс на член
+    coef = np.asarray(clf.coef_, dtype=np.float64)
+    arrays = {
+        "linear": np.hstack([np.asarray(clf.intercept_, dtype=np.float64).reshape(-1, 1), coef]),  # [b | W]
+        "classes": np.asarray(clf.classes_, dtype=np.int64),
+    }
+    if scaler is not None:
+        if not (hasattr(scaler, "mean_") and hasattr(scaler, "scale_")):
+            return None
+        var = getattr(scaler, "var_", None)
+        rows = [scaler.mean_, scaler.scale_] + ([var] if var is not None else [])
+        arrays["scaler"] = np.vstack([np.asarray(r, dtype=np.float64) for r in rows])  # mean, scale[, var]
+    meta = {
+        "version": ARTIFACT_VERSION,
+        "kind": "logreg",
+        "C": float(getattr(clf, "C", 1.0)),
+        "n_samples_seen": int(np.max(getattr(scaler, "n_samples_seen_", 0) or 0)) if scaler is not None else None,
+        "feature_names": list(bundle.get("feature_names") or []),
+        "features_settings": bundle.get("features_settings") or {},
+        "meta": bundle.get("meta") or {},
+        **(extra or {}),
+    }
+    arrays["meta_json"] = np.frombuffer(json.dumps(meta, default=str).encode("utf-8"), dtype=np.uint8)
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def unpack_bundle(blob: bytes) -> Dict[str, Any]:
+    """Компактный артефакт -> бандл (CompactLogReg/CompactScaler); pickle не используется."""
+    with np.load(io.BytesIO(blob), allow_pickle=False) as z:
+        meta = json.loads(bytes(z["meta_json"]).decode("utf-8"))
+        if int(meta.get("version", 0)) > ARTIFACT_VERSION:
+            raise ValueError(f"unsupported model artifact version {meta.get('version')}")
+        lin = z["linear"]
+        clf = CompactLogReg(lin[:, 1:], lin[:, 0], z["classes"], meta.get("C", 1.0))
+        scaler = None
+        if "scaler" in z.files:
+            sc = z["scaler"]
+            scaler = CompactScaler(sc[0], sc[1], sc[2] if len(sc) > 2 else None, meta.get("n_samples_seen"))
+    return {
+        "model": clf,
+        "scaler": scaler,
+        "feature_names": meta.get("feature_names") or [],
+        "features_settings": meta.get("features_settings") or {},
+        "meta": meta.get("meta") or {},
+        "artifact": {k: meta[k] for k in ("version", "kind", "classes_saved") if k in meta},
+    }
+
+
+def to_sklearn(bundle: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Компактные объекты бандла -> LogisticRegression/StandardScaler (для дообучения: partial_fit, coef_).
+    sklearn импортируется только здесь; sklearn-объекты возвращаются как есть.
+    """
+    clf, scaler = bundle.get("model"), bundle.get("scaler")
+    if not isinstance(clf, CompactLogReg) and not isinstance(scaler, CompactScaler):
+        return bundle
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    out = dict(bundle)
+    if isinstance(clf, CompactLogReg):
+        m = LogisticRegression(C=clf.C)
+        m.coef_, m.intercept_, m.classes_ = clf.coef_.copy(), clf.intercept_.copy(), clf.classes_.copy()
+        m.n_features_in_ = clf.n_features_in_
+        m.n_iter_ = np.zeros(1, dtype=np.int32)
+        out["model"] = m
+    if isinstance(scaler, CompactScaler):
+        s = StandardScaler()
+        s.mean_, s.scale_ = scaler.mean_.copy(), scaler.scale_.copy()
+        s.var_ = scaler.var_.copy() if scaler.var_ is not None else scaler.scale_ ** 2
+        s.n_samples_seen_ = np.int64(scaler.n_samples_seen_ or 0)
+        s.n_features_in_ = scaler.n_features_in_
+        out["scaler"] = s
+    return out
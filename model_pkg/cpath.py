@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import log_loss
+from sklearn.preprocessing import StandardScaler
+
+from config import Config
+
+logger = logging.getLogger("train")
+
+
+def c_grid() -> List[float]:
+    """Сетка C по убыванию: LR_C_GRID из конфига или 10 точек logspace(2, -3)."""
+    grid = [float(c) for c in (getattr(Config, "LR_C_GRID", None) or []) if float(c) > 0]
+    if not grid:
+        grid = list(np.logspace(2, -3, 10))
+    return sorted(set(grid), reverse=True)
+
+
+def c_path_search(X: np.ndarray, y: np.ndarray, *, purge: int, grid: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Путь регуляризации на временном holdout: обучение на [0, split - purge), оценка на [split, n).
+    Скейлер считается один раз, модели по C (по убыванию) обучаются с тёплым стартом от предыдущей.
+    Возвращает {"C", "logloss", "path": [{C, logloss, acc, n_iter}], "n_train", "n_test"} или None.
+    """
+    n = len(y)
+    holdout = min(0.5, max(0.05, float(getattr(Config, "LR_C_HOLDOUT", 0.2))))
+    split = int(n * (1.0 - holdout))
+    train_end = split - max(0, int(purge))
+    if train_end < int(getattr(Config, "WF_MIN_TRAIN", 200)) or n - split < 10:
+        return None
+    ytr, yte = y[:train_end], y[split:]
+    if len(np.unique(ytr)) < 2:
+        return None
+
+    scaler = StandardScaler()
+    Xtr = scaler.fit_transform(X[:train_end])
+    Xte = scaler.transform(X[split:])
+    labels = sorted(int(c) for c in np.unique(y))
+
+    clf = LogisticRegression(
+        max_iter=int(getattr(Config, "LR_MAX_ITER", 1000)),
+        class_weight=getattr(Config, "LR_CLASS_WEIGHT", None),
+        solver=str(getattr(Config, "LR_SOLVER", "lbfgs")),
+        warm_start=True,
+    )
+    path = []
+    for C in (grid or c_grid()):
+        clf.set_params(C=float(C))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            clf.fit(Xtr, ytr)
+        P = np.full((len(yte), len(labels)), 1e-12)
+        P_raw = clf.predict_proba(Xte)
+        for j, c in enumerate(clf.classes_):
+            P[:, labels.index(int(c))] = P_raw[:, j]
+        P /= P.sum(axis=1, keepdims=True)
+        path.append({
+            "C": float(C),
+            "logloss": float(log_loss(yte, P, labels=labels)),
+            "acc": float((np.asarray(labels)[P.argmax(axis=1)] == yte).mean()),
+            "n_iter": int(np.max(clf.n_iter_)),
+        })
+    best = min(path, key=lambda r: r["logloss"])
+    return {"C": best["C"], "logloss": best["logloss"], "path": path, "n_train": int(train_end), "n_test": int(n - split)}
+
+
+def _cache_key(symbol: str, timeframe: str) -> str:
+    return f"lr_c:{symbol}:{timeframe}"
+
+
+def select_c(db, symbol: str, timeframe: str, X: np.ndarray, y: np.ndarray, *, purge: int,
+             until: Optional[str] = None) -> Dict[str, Any]:
+    """
+    C для пары: LR_C, если поиск выключен; иначе из кэша app_settings (моложе LR_C_CACHE_DAYS,
+    та же сетка) или новый поиск по пути регуляризации. Возвращает {"C", "source", ...}.
+    until — время последней строки X (ISO): кэш годится, только если его поиск не видел строк позже
+    (иначе C «подсмотрел» бы тестовые блоки walk-forward).
+    """
+    default_c = float(getattr(Config, "LR_C", 1.0))
+    if not getattr(Config, "LR_C_SEARCH", False):
+        return {"C": default_c, "source": "config"}
+
+    grid = c_grid()
+    key = _cache_key(symbol, timeframe)
+    try:
+        cached = db.get_setting(key) or {}
+        at = pd.Timestamp(cached.get("at")) if cached.get("at") else None
+        ttl = pd.Timedelta(days=float(getattr(Config, "LR_C_CACHE_DAYS", 7)))
+        fresh = at is not None and datetime.utcnow() - at.to_pydatetime() <= ttl
+        seen_ok = until is None or (cached.get("until") is not None and str(cached["until"]) <= str(until))
+        if fresh and seen_ok and cached.get("grid") == grid:
+            return {**cached, "source": "cache"}
+    except Exception as e:
+        logger.warning("lr_c cache read failed %s %s: %s", symbol, timeframe, e)
+
+    try:
+        res = c_path_search(X, y, purge=purge, grid=grid)
+    except Exception as e:
+        logger.warning("lr_c search failed %s %s: %s", symbol, timeframe, e)
+        res = None
+    if res is None:
+        return {"C": default_c, "source": "config", "reason": "not_enough_data"}
+    res.update({"grid": grid, "at": datetime.utcnow().isoformat(), "until": until})
+    try:
+        db.set_setting(key, res)
+    except Exception as e:
+        logger.warning("lr_c cache write failed %s %s: %s", symbol, timeframe, e)
+    logger.info("lr_c %s %s: C=%.4g logloss=%.5f", symbol, timeframe, res["C"], res["logloss"])
+    return {**res, "source": "search"}
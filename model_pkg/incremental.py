@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from data_pkg.ccxt_manager import TF_TO_MS
+from .artifact import to_sklearn
+
+logger = logging.getLogger("train")
+
+
+def _ts(v) -> Optional[pd.Timestamp]:
+    if v is None or v == "":
+        return None
+    try:
+        t = pd.Timestamp(v)
+        if t.tzinfo is not None:
+            t = t.tz_convert(None)
+        return t
+    except Exception:
+        return None
+
+
+def rebase_scaler(scaler, clf, X_new: np.ndarray) -> None:
+    """
+    scaler.partial_fit на новых строках + пересчёт коэффициентов так,
+    чтобы решающая функция модели на «сырых» x не изменилась:
+      W' = W * s1/s0,  b' = b + W @ ((m1 - m0) / s0)
+    """
+    m0 = np.asarray(scaler.mean_, dtype=float).copy()
+    s0 = np.asarray(scaler.scale_, dtype=float).copy()
+    scaler.partial_fit(X_new)
+    m1 = np.asarray(scaler.mean_, dtype=float)
+    s1 = np.asarray(scaler.scale_, dtype=float)
+    W = np.asarray(clf.coef_, dtype=float)
+    b = np.asarray(clf.intercept_, dtype=float)
+    clf.intercept_ = b + W @ ((m1 - m0) / s0)
+    clf.coef_ = W * (s1 / s0)[None, :]
+
+
+def logistic_steps(clf, Xs: np.ndarray, y: np.ndarray, *, steps: int, lr: float, C: float, n_total: int) -> None:
+    """
+    Несколько шагов градиентного спуска по log-loss на новых строках (тёплый старт от текущих W, b).
+    L2-штраф масштабирован как в sklearn: ||W||^2 / (2 * C * n_total).
+    Бинарный случай (coef_.shape[0] == 1) — сигмоида, иначе — softmax.
+    """
+    classes = np.asarray(clf.classes_)
+    W = np.asarray(clf.coef_, dtype=float).copy()
+    b = np.asarray(clf.intercept_, dtype=float).copy()
+    n = max(1, len(y))
+    l2 = 1.0 / (max(C, 1e-12) * max(1, n_total))
+    if W.shape[0] == 1:
+        t = (y == classes[1]).astype(float)
+        for _ in range(max(0, steps)):
+            p = 1.0 / (1.0 + np.exp(-(Xs @ W[0] + b[0])))
+            g = (p - t) / n
+            W[0] -= lr * (g @ Xs + l2 * W[0])
+            b[0] -= lr * g.sum()
+    else:
+        Y = (y[:, None] == classes[None, :]).astype(float)
+        for _ in range(max(0, steps)):
+            Z = Xs @ W.T + b
+            Z -= Z.max(axis=1, keepdims=True)
+            P = np.exp(Z)
+            P /= P.sum(axis=1, keepdims=True)
+            G = (P - Y) / n
+            W -= lr * (G.T @ Xs + l2 * W)
+            b -= lr * G.sum(axis=0)
+    clf.coef_ = W
+    clf.intercept_ = b
+
+
+def train_incremental(trainer, symbol: str, timeframe: str, mode: str) -> Optional[Dict[str, Any]]:
+    """
+    Дообучение сохранённой модели на барах после последнего обучения.
+    Возвращает dict для TrainResult или None, если нужна полная переобучка
+    (нет модели, сменился набор признаков, auto и полная модель старше TRAIN_FULL_REFIT_DAYS).
+    """
+    db = trainer.db
+    rec = db.load_model(symbol, timeframe)
+    bundle = (rec or {}).get("model")
+    if not isinstance(bundle, dict):
+        return None
+    bundle = to_sklearn(bundle)  # компактный артефакт -> sklearn (partial_fit скейлера, запись coef_)
+    clf, scaler = bundle.get("model"), bundle.get("scaler")
+    if clf is None or scaler is None or not hasattr(clf, "coef_") or not hasattr(scaler, "partial_fit"):
+        return None
+
+    full_end = _ts(rec.get("last_full_train_end"))
+    if full_end is None:
+        return None
+    if mode == "auto":
+        refit_days = float(getattr(Config, "TRAIN_FULL_REFIT_DAYS", 7))
+        if datetime.utcnow() - full_end.to_pydatetime() > pd.Timedelta(days=refit_days):
+            logger.info("incremental skip %s %s: full refit due (%s days)", symbol, timeframe, refit_days)
+            return None
+
+    meta = dict(bundle.get("meta") or {})
+    fs = dict(bundle.get("features_settings") or {})
+    horizon = int(fs.get("label_horizon", 1))
+    prev_end = _ts(meta.get("label_end")) or _ts(rec.get("last_incremental_train_end")) or full_end
+
+    # только новые бары + разогрев для индикаторов
+    warmup = int(getattr(Config, "TRAIN_INCR_WARMUP_BARS", 500))
+    tf_ms = TF_TO_MS.get(timeframe, 3_600_000)
+    since = (prev_end - pd.Timedelta(milliseconds=tf_ms * warmup)).to_pydatetime()
+    df = db.load_ohlcv(symbol, timeframe, since=since, limit=None)
+    if df is None or len(df) <= horizon:
+        return None
+
+    feature_names = list(bundle.get("feature_names") or [])
+    up_to_date = {
+        "n_samples": 0, "n_features": len(feature_names), "classes": [int(c) for c in clf.classes_],
+        "acc": meta.get("acc_train"), "meta": {**meta, "mode": "incremental", "reason": "up_to_date"},
+    }
+    new_end = df.index[-1 - horizon]
+    if new_end <= prev_end:
+        return up_to_date
+
+    Xc, yc, reason = trainer._build_xy(symbol, df, timeframe, fs)
+    if reason or list(map(str, Xc.columns)) != feature_names:
+        return None
+    mask = (Xc.index > prev_end) & (Xc.index <= new_end) & np.isin(yc.values, clf.classes_)
+    Xn, yn = Xc.values[mask].astype(float), yc.values[mask].astype(int)
+    if len(yn) == 0:
+        return up_to_date
+
+    rebase_scaler(scaler, clf, Xn)
+    Xs = scaler.transform(Xn)
+    logistic_steps(
+        clf, Xs, yn,
+        steps=int(getattr(Config, "TRAIN_INCR_STEPS", 25)),
+        lr=float(getattr(Config, "TRAIN_INCR_LR", 0.1)),
+        C=float(getattr(clf, "C", getattr(Config, "LR_C", 1.0))),
+        n_total=int(np.sum(getattr(scaler, "n_samples_seen_", len(yn)))),
+    )
+    try:
+        acc = float((clf.predict(Xs) == yn).mean())
+    except Exception:
+        acc = None
+
+    meta.update({
+        "n_samples": int(meta.get("n_samples", 0)) + int(len(yn)),
+        "mode": "incremental",
+        "acc_incr": acc,
+        "incr_updates": int(meta.get("incr_updates", 0)) + 1,
+        "label_end": new_end.isoformat(),
+    })
+    bundle["meta"] = meta
+    trainer._save_bundle(
+        symbol, timeframe, bundle,
+        last_full_end=rec.get("last_full_train_end"),
+        last_incr_end=df.index.max().to_pydatetime(),
+        metrics=rec.get("metrics"),
+    )
+    logger.info("incremental %s %s: +%s rows up to %s", symbol, timeframe, len(yn), new_end)
+    return {
+        "n_samples": int(len(yn)),
+        "n_features": len(feature_names),
+        "classes": [int(c) for c in clf.classes_],
+        "acc": acc,
+        "meta": meta,
+    }
@@ -1,36 +1,67 @@
 from __future__ import annotations
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional
+import threading
 import pandas as pd
 
+from config import Config
 from .trainers import Trainer
 from .predict import get_model_bundle as _get_bundle
 from .predict import predict_proba_for_tf as _predict_tf
 from .predict import predict_hierarchical as _predict_h
+from .versions import ModelVersionJanitor
 
 
 class ModelManager:
     """
     Совместимый интерфейс:
       - train_symbol(symbol, timeframes, years, job_id=None, mode="auto")
-      - get_model_bundle(symbol, timeframe)
+      - get_model_bundle(symbol, timeframe, version=None)
       - predict_proba_for_tf(symbol, timeframe, df_window)
       - predict_hierarchical(symbol, timeframes, latest_windows)
+    Бандлы кэшируются по (symbol, timeframe, version): новая активная версия — новый ключ,
+    старые записи просто вытесняются LRU (MODEL_BUNDLE_CACHE), без сброса всего кэша.
     """
     def __init__(self, db):
         self.db = db
         self._trainer = Trainer(db)
+        self._bundles: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._janitor: Optional[ModelVersionJanitor] = None
 
     # Обучение
     def train_symbol(self, symbol: str, timeframes: List[str], years: int, job_id: Optional[int] = None, mode: str = "auto"):
         return self._trainer.train_symbol(symbol, timeframes, years, job_id=job_id, mode=mode)
 
     # Модель/бандл
-    def get_model_bundle(self, symbol: str, timeframe: str) -> Dict[str, Any]:
-        return _get_bundle(self.db, symbol, timeframe)
+    def get_model_bundle(self, symbol: str, timeframe: str, version: Optional[int] = None) -> Dict[str, Any]:
+        if version is None and hasattr(self.db, "get_active_model_version"):
+            version = self.db.get_active_model_version(symbol, timeframe)
+        if version is None:
+            # нет модели или старая запись без версии — без кэша
+            return _get_bundle(self.db, symbol, timeframe)
+        key = (symbol, timeframe, int(version))
+        with self._lock:
+            if key in self._bundles:
+                self._bundles.move_to_end(key)
+                return dict(self._bundles[key])
+        bundle = _get_bundle(self.db, symbol, timeframe, version=int(version))
+        if bundle.get("model") is not None:
+            with self._lock:
+                self._bundles[key] = bundle
+                while len(self._bundles) > max(1, int(getattr(Config, "MODEL_BUNDLE_CACHE", 64))):
+                    self._bundles.popitem(last=False)
+        return dict(bundle)
 
     # Предсказания
     def predict_proba_for_tf(self, symbol: str, timeframe: str, df_window: pd.DataFrame) -> Optional[Dict[str, Any]]:
-        return _predict_tf(self.db, symbol, timeframe, df_window)
+        return _predict_tf(self.db, symbol, timeframe, df_window, bundle=self.get_model_bundle(symbol, timeframe))
 
     def predict_hierarchical(self, symbol: str, timeframes: List[str], latest_windows: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
-        return _predict_h(self.db, symbol, timeframes, latest_windows)
\ No newline at end of file
+        return _predict_h(self.db, symbol, timeframes, latest_windows, get_bundle=self.get_model_bundle)
+
+    # Чистка вытесненных версий моделей
+    def start_janitor(self):
+        if self._janitor is None:
+            self._janitor = ModelVersionJanitor(self.db)
+        self._janitor.start()
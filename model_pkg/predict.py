@@ -3,25 +3,27 @@ from typing import Dict, Any, List, Optional
 import numpy as np
 import pandas as pd
 
-from features import build_features
+from features_pkg.cache import feature_frame
 from .utils import align_features_for_bundle, expected_n_features, tf_score_from_probs
 from config import Config
 
 
-def get_model_bundle(db, symbol: str, timeframe: str) -> Dict[str, Any]:
+def get_model_bundle(db, symbol: str, timeframe: str, version: Optional[int] = None) -> Dict[str, Any]:
     """
-    Совместимый загрузчик бандла.
-    - Если в models_store лежит bundle целиком в model_blob (dict), разворачиваем его в плоский словарь.
+    Совместимый загрузчик бандла (активная версия или конкретная, если version задан).
+    - Если load_model вернул bundle (dict: компактный артефакт или pickle целиком), разворачиваем его в плоский словарь.
     - Если лежит только модель, возвращаем минимум (модель, feature_names), scaler может отсутствовать.
+    В ответе "version" — id версии модели (None для старых записей без версии).
     """
-    m = db.load_model(symbol, timeframe) or {}
+    m = (db.load_model(symbol, timeframe, version=version) if version is not None else db.load_model(symbol, timeframe)) or {}
     blob = m.get("model")
-    # кейс: в model_blob сохранён весь bundle (dict)
+    # кейс: сохранён весь bundle (dict)
     if isinstance(blob, dict):
         out = dict(blob)  # копия
         # подстрахуем feature_names
         if "feature_names" not in out:
             out["feature_names"] = out.get("features") or m.get("features") or []
+        out["version"] = m.get("version")
         return out
     # кейс: сохранена только модель
     return {
@@ -30,34 +32,18 @@ def get_model_bundle(db, symbol: str, timeframe: str) -> Dict[str, Any]:
         "feature_names": m.get("features") or [],
         "features_settings": (m.get("meta") or {}).get("features_settings") if isinstance(m.get("meta"), dict) else {},
         "meta": m.get("meta") or {},
+        "version": m.get("version"),
     }
 
 
-def _build_news_features_safe(db, df: pd.DataFrame, timeframe: str) -> Optional[pd.DataFrame]:
-    try:
-        from news_features import aggregate_news_features
-    except Exception:
-        return None
-    try:
-        if not isinstance(df.index, pd.DatetimeIndex) or df.index.size == 0:
-            return None
-        feats = aggregate_news_features(db, df.index, timeframe)
-        if feats is None or feats.empty:
-            return None
-        feats = feats.reindex(df.index, method="pad").fillna(0.0)
-        feats = feats.replace([np.inf, -np.inf], 0.0).fillna(0.0)
-        return feats
-    except Exception:
-        return None
-
-
-def predict_proba_for_tf(db, symbol: str, timeframe: str, df_window: pd.DataFrame) -> Optional[Dict[str, Any]]:
+def predict_proba_for_tf(db, symbol: str, timeframe: str, df_window: pd.DataFrame, bundle: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
     """
     Вернёт вероятности на каждом баре df_window для классов {-1,0,1}.
+    bundle — уже загруженный бандл (например, из кэша ModelManager по версии), иначе читается из БД.
     Формат:
       { "idx": DatetimeIndex, "pb_buy": np.ndarray, "pb_hold": np.ndarray, "pb_sell": np.ndarray }
     """
-    bundle = get_model_bundle(db, symbol, timeframe)
+    bundle = bundle if bundle is not None else get_model_bundle(db, symbol, timeframe)
     clf = bundle.get("model")
     scaler = bundle.get("scaler")
     if clf is None or df_window is None or df_window.empty:
@@ -65,15 +51,8 @@ def predict_proba_for_tf(db, symbol: str, timeframe: str, df_window: pd.DataFram
 
     feats_settings = bundle.get("features_settings") or {}
 
-    # Совпадение фичей с обучением: тех + фундаментал
-    X_tech = build_features(df_window, feats_settings) or pd.DataFrame(index=df_window.index)
-    X_news = _build_news_features_safe(db, df_window, timeframe)
-    if X_news is not None and not X_news.empty:
-        X = X_tech.join(X_news, how="left")
-    else:
-        X = X_tech
-
-    X = X.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    # Совпадение фичей с обучением: тех + фундаментал (через кэш признаков)
+    X = feature_frame(db, symbol, timeframe, feats_settings, df_window)
 
     feature_names_saved = bundle.get("feature_names") or bundle.get("features") or []
     X_aligned, _ = align_features_for_bundle(X, feature_names_saved, scaler)
@@ -106,7 +85,8 @@ def predict_proba_for_tf(db, symbol: str, timeframe: str, df_window: pd.DataFram
             P = np.zeros((len(df_window), 3), dtype=float)
             P[:, 1] = 1.0
 
-    classes = getattr(clf, "classes_", None) or []
+    classes = getattr(clf, "classes_", None)
+    classes = [] if classes is None else list(classes)
     idx_map = {int(c): i for i, c in enumerate(classes)}
 
     n = len(df_window)
@@ -137,13 +117,14 @@ def predict_proba_for_tf(db, symbol: str, timeframe: str, df_window: pd.DataFram
     }
 
 
-def predict_hierarchical(db, symbol: str, timeframes: List[str], latest_windows: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+def predict_hierarchical(db, symbol: str, timeframes: List[str], latest_windows: Dict[str, pd.DataFrame], get_bundle=None) -> Dict[str, Any]:
+    # get_bundle(symbol, tf) — источник бандлов (кэш по версии в ModelManager), иначе чтение из БД
     by_tf: Dict[str, Dict[str, float]] = {}
     for tf in timeframes:
         dfw = latest_windows.get(tf)
         if dfw is None or dfw.empty:
             continue
-        res = predict_proba_for_tf(db, symbol, tf, dfw.tail(600))
+        res = predict_proba_for_tf(db, symbol, tf, dfw.tail(600), bundle=get_bundle(symbol, tf) if get_bundle else None)
         if not res:
             continue
         pb = {
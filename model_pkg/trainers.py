@@ -11,7 +11,11 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 
 from config import Config
-from features import build_features
+from features_pkg.cache import feature_frame
+from .cpath import select_c
+from .incremental import train_incremental
+from .validation import purged_walk_forward_splits, walk_forward_validate
+from utils.cpu_budget import cpu_budget
 
 
 @dataclass
@@ -32,45 +36,24 @@ def _make_labels(close: pd.Series, horizon: int = 1, eps: float = 0.0) -> pd.Ser
     return y
 
 
-def _build_news_features_safe(db, df: pd.DataFrame, timeframe: str) -> Optional[pd.DataFrame]:
-    try:
-        from news_features import aggregate_news_features
-    except Exception:
-        return None
-
-    try:
-        if not isinstance(df.index, pd.DatetimeIndex) or df.index.size == 0:
-            return None
-        feats = aggregate_news_features(db, df.index, timeframe)
-        if feats is None or feats.empty:
-            return None
-        feats = feats.reindex(df.index, method="pad").fillna(0.0)
-        feats = feats.replace([np.inf, -np.inf], 0.0).fillna(0.0)
-        return feats
-    except Exception:
-        return None
-
-
 class Trainer:
     """
-    - Тех.фичи: features.build_features
-    - Фундаментал: news_features.aggregate_news_features (если доступно)
-    - Классификатор: LogisticRegression + StandardScaler
-    - Сохранение: bundle целиком в model_blob (совместимо с db_pkg/models_store.py), с перезаписью
+    - Признаки: features_pkg.cache.feature_frame (тех. + новости, дисковый кэш)
+    - Классификатор: LogisticRegression + StandardScaler; C — LR_C или поиск по пути регуляризации (LR_C_SEARCH)
+    - Валидация: purged walk-forward в пуле процессов (model_pkg/validation.py), итоги в models.metrics
+    - Сохранение: db.save_model — новая версия (компактный артефакт npz + JSON, model_pkg/artifact.py) с атомарной активацией
+    - Режимы: full — полное переобучение; auto/incremental — дообучение на новых барах (model_pkg/incremental.py)
     - Параллель: обучение по таймфреймам в ThreadPoolExecutor (TRAIN_MAX_WORKERS)
     """
 
     def __init__(self, db):
         self.db = db
 
-    def _save_bundle(self, symbol: str, timeframe: str, bundle: Dict[str, Any], *, last_full_end=None):
-        # Удаляем прошлую запись, если поддерживается
-        try:
-            if hasattr(self.db, "delete_model"):
-                self.db.delete_model(symbol, timeframe)
-        except Exception:
-            pass
-
+    def _save_bundle(self, symbol: str, timeframe: str, bundle: Dict[str, Any], *, last_full_end=None, last_incr_end=None, metrics=None) -> Optional[int]:
+        """
+        Новая версия модели + атомарная активация в одной транзакции (db.save_model):
+        читатели видят либо прежнюю, либо новую версию — окна «модели нет» нет. Возвращает id версии.
+        """
         # Ретрай на случай SQLite busy/locked
         algo = "logreg_v1"
         classes = sorted({-1, 0, 1})
@@ -78,23 +61,40 @@ class Trainer:
         last_err: Optional[Exception] = None
         for attempt in range(5):
             try:
-                self.db.save_model(
+                return self.db.save_model(
                     symbol=symbol,
                     timeframe=timeframe,
                     algo=algo,
-                    model=bundle,                 # bundle целиком в blob
+                    model=bundle,                 # bundle целиком (компактный артефакт)
                     classes=classes,
                     features=feature_names,
                     last_full_end=last_full_end,
-                    last_incr_end=None,
-                    metrics={},
+                    last_incr_end=last_incr_end,
+                    metrics=metrics or {},
                 )
-                return
             except Exception as e:
                 last_err = e
                 time.sleep(0.1 * (attempt + 1))
         if last_err:
             raise last_err
+        return None
+
+    def _build_xy(self, symbol: str, df: pd.DataFrame, timeframe: str, feats_settings: Dict[str, Any]):
+        """Матрица признаков (тех. + новости, через кэш признаков) и метки; (Xc, yc, None) или (None, None, reason)."""
+        X = feature_frame(self.db, symbol, timeframe, feats_settings, df)
+        if X is None or X.empty or X.shape[1] == 0:
+            return None, None, "no_features"
+
+        # Метки
+        y = _make_labels(
+            df["close"].astype(float),
+            horizon=int(feats_settings.get("label_horizon", 1)),
+            eps=float(feats_settings.get("label_eps", 0.0)),
+        )
+        XY = X.join(y.rename("y"), how="inner").replace([np.inf, -np.inf], np.nan).dropna()
+        if XY.empty:
+            return None, None, "no_samples_after_clean"
+        return XY.drop(columns=["y"]), XY["y"].astype(int), None
 
     def _train_one_tf(
         self,
@@ -104,6 +104,11 @@ class Trainer:
         job_id: Optional[int],
         mode: str,
     ) -> TrainResult:
+        if mode != "full":
+            inc = train_incremental(self, symbol, timeframe, mode)
+            if inc is not None:
+                return TrainResult(timeframe, inc["n_samples"], inc["n_features"], inc["classes"], inc["acc"], inc["meta"])
+
         df = self.db.load_ohlcv(symbol, timeframe, since=None, limit=None)
         if df is None or df.empty:
             return TrainResult(timeframe, 0, 0, [], None, {"reason": "no_data"})
@@ -117,45 +122,36 @@ class Trainer:
         feats_settings: Dict[str, Any] = {}
         try:
             meta = self.db.load_model(symbol, timeframe) or {}
-            feats_settings = (meta.get("meta") or {}).get("features_settings") or {}
+            prev = meta.get("model") if isinstance(meta.get("model"), dict) else {}
+            feats_settings = dict(prev.get("features_settings") or {})
         except Exception:
             feats_settings = {}
         feats_settings.setdefault("label_horizon", 1)
         feats_settings.setdefault("label_eps", 0.0)
 
-        # Тех.фичи
-        X_tech = build_features(df, feats_settings)
-        if X_tech is None or X_tech.empty:
-            return TrainResult(timeframe, 0, 0, [], None, {"reason": "no_features"})
-
-        # Фундаментальные фичи
-        X_news = _build_news_features_safe(self.db, df, timeframe)
-        if X_news is not None and not X_news.empty:
-            X = X_tech.join(X_news, how="left")
-        else:
-            X = X_tech.copy()
-
-        X = X.replace([np.inf, -np.inf], np.nan).fillna(0.0)
-
-        # Метки
-        y = _make_labels(
-            df["close"].astype(float),
-            horizon=int(feats_settings.get("label_horizon", 1)),
-            eps=float(feats_settings.get("label_eps", 0.0)),
-        )
-        XY = X.join(y.rename("y"), how="inner").replace([np.inf, -np.inf], np.nan).dropna()
-        if XY.empty:
-            return TrainResult(timeframe, 0, 0, [], None, {"reason": "no_samples_after_clean"})
-
-        Xc = XY.drop(columns=["y"])
-        yc = XY["y"].astype(int)
+        Xc, yc, reason = self._build_xy(symbol, df, timeframe, feats_settings)
+        if reason:
+            return TrainResult(timeframe, 0, 0, [], None, {"reason": reason})
+
+        horizon = int(feats_settings.get("label_horizon", 1))
+        # строки с честной меткой (без последних horizon) и тестовые блоки walk-forward по ним
+        X_lab, y_lab = Xc.values[:-horizon or None], yc.values[:-horizon or None]
+        n_folds = int(getattr(Config, "WF_FOLDS", 5))
+        splits = purged_walk_forward_splits(len(y_lab), n_folds, horizon, int(getattr(Config, "WF_MIN_TRAIN", 200)))
+        # Регуляризация: путь C с тёплым стартом на holdout (кэш по паре) или LR_C.
+        # Поиск — только по строкам до первого тестового блока WF (train_end первого фолда, с purge),
+        # иначе wf_acc была бы смещена выбором C на тех же данных.
+        c_end = splits[0][0] if splits else len(y_lab)
+        c_sel = select_c(self.db, symbol, timeframe, X_lab[:c_end], y_lab[:c_end], purge=horizon,
+                         until=str(Xc.index[c_end - 1]) if c_end > 0 else None)
+        C = float(c_sel["C"])
 
         # Скейлер и Модель
         scaler = StandardScaler()
         Xs = scaler.fit_transform(Xc.values)
         clf = LogisticRegression(
             max_iter=int(getattr(Config, "LR_MAX_ITER", 1000)),
-            C=float(getattr(Config, "LR_C", 1.0)),
+            C=C,
             class_weight=getattr(Config, "LR_CLASS_WEIGHT", None),
             solver=str(getattr(Config, "LR_SOLVER", "lbfgs")),
         )
@@ -169,6 +165,17 @@ class Trainer:
 
         feature_names = list(map(str, Xc.columns))
         last_full_end = df.index.max().to_pydatetime() if isinstance(df.index, pd.DatetimeIndex) else None
+        label_end = df.index[-1 - horizon] if len(df) > horizon else None
+
+        # Out-of-sample: purged walk-forward по той же матрице (без последних horizon строк без честной метки)
+        metrics: Dict[str, Any] = {"acc_train": acc, "C": C, "C_source": c_sel.get("source"), "C_rows": int(c_end)}
+        if n_folds > 0 and len(Xc) > horizon:
+            try:
+                metrics.update(walk_forward_validate(X_lab, y_lab, n_folds=n_folds, purge=horizon, C=C))
+            except Exception as e:
+                metrics["wf_error"] = str(e)
+        if metrics.get("wf_acc") is not None:
+            metrics["accuracy"] = metrics["wf_acc"]
         bundle = {
             "model": clf,
             "scaler": scaler,
@@ -180,10 +187,16 @@ class Trainer:
                 "n_samples": int(len(Xc)),
                 "n_features": int(len(feature_names)),
                 "acc_train": acc,
+                "C": C,
+                "wf_acc": metrics.get("wf_acc"),
+                "wf_logloss": metrics.get("wf_logloss"),
+                "mode": "full",
+                # последний бар с честной меткой (t + horizon уже известен)
+                "label_end": label_end.isoformat() if label_end is not None else None,
             }
         }
 
-        self._save_bundle(symbol, timeframe, bundle, last_full_end=last_full_end)
+        self._save_bundle(symbol, timeframe, bundle, last_full_end=last_full_end, metrics=metrics)
 
         return TrainResult(
             timeframe=timeframe,
@@ -194,6 +207,11 @@ class Trainer:
             meta=bundle["meta"],
         )
 
+    def _train_one_tf_slot(self, symbol: str, timeframe: str, years: int, job_id: Optional[int], mode: str) -> TrainResult:
+        # обучение ТФ — листовая задача общего CPU-бюджета
+        with cpu_budget().slot():
+            return self._train_one_tf(symbol, timeframe, years, job_id, mode)
+
     def train_symbol(self, symbol: str, timeframes: List[str], years: int, job_id: Optional[int] = None, mode: str = "auto") -> Dict[str, Any]:
         # Параллель по ТФ
         max_workers = max(1, int(getattr(Config, "TRAIN_MAX_WORKERS", 2)))
@@ -204,7 +222,7 @@ class Trainer:
             # Последовательно
             for tf in tfs:
                 try:
-                    r = self._train_one_tf(symbol, tf, years, job_id=job_id, mode=mode)
+                    r = self._train_one_tf_slot(symbol, tf, years, job_id, mode)
                 except Exception as e:
                     r = TrainResult(tf, 0, 0, [], None, {"reason": f"exception:{e}"})
                 results.append(r)
@@ -213,7 +231,7 @@ class Trainer:
             futures = {}
             with ThreadPoolExecutor(max_workers=min(len(tfs), max_workers)) as pool:
                 for tf in tfs:
-                    futures[pool.submit(self._train_one_tf, symbol, tf, years, job_id, mode)] = tf
+                    futures[pool.submit(self._train_one_tf_slot, symbol, tf, years, job_id, mode)] = tf
                 for fut in as_completed(futures):
                     tf = futures[fut]
                     try:
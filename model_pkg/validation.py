@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from utils.cpu_budget import cpu_budget
+
+logger = logging.getLogger("train")
+
+
+def purged_walk_forward_splits(n: int, n_folds: int, purge: int, min_train: int = 200) -> List[Tuple[int, int, int]]:
+    """
+    Разбиения walk-forward с расширяющимся окном: [(train_end, test_start, test_end), ...].
+    Последние n_folds блоков — тестовые; обучение на [0, test_start - purge),
+    purge (= горизонт метки) убирает строки, чьи метки «заглядывают» в тест.
+    """
+    n_folds = int(n_folds)
+    purge = max(0, int(purge))
+    if n_folds <= 0 or n <= min_train + purge:
+        return []
+    test_size = (n - min_train) // (n_folds + 1)
+    if test_size < 10:
+        return []
+    out = []
+    for k in range(n_folds):
+        test_start = n - (n_folds - k) * test_size
+        test_end = test_start + test_size if k < n_folds - 1 else n
+        train_end = test_start - purge
+        if train_end >= min_train:
+            out.append((train_end, test_start, test_end))
+    return out
+
+
+def _fit_fold(path_X: str, path_y: str, train_end: int, test_start: int, test_end: int,
+              C: float, max_iter: int, solver: str, class_weight, classes_all: List[int]) -> Dict[str, Any]:
+    """Фолд в процессе-воркере: X/y читаются через memmap (один файл на все фолды пары)."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import log_loss
+    from sklearn.preprocessing import StandardScaler
+
+    X = np.load(path_X, mmap_mode="r")
+    y = np.load(path_y, mmap_mode="r")
+    Xtr, ytr = np.asarray(X[:train_end], dtype=float), np.asarray(y[:train_end])
+    Xte, yte = np.asarray(X[test_start:test_end], dtype=float), np.asarray(y[test_start:test_end])
+    if len(np.unique(ytr)) < 2 or len(yte) == 0:
+        return {"train_n": int(len(ytr)), "test_n": int(len(yte)), "logloss": None, "acc": None}
+
+    scaler = StandardScaler()
+    Xs = scaler.fit_transform(Xtr)
+    clf = LogisticRegression(max_iter=max_iter, C=C, solver=solver, class_weight=class_weight)
+    clf.fit(Xs, ytr)
+    P = clf.predict_proba(scaler.transform(Xte))
+    # колонки вероятностей под полный набор классов (класс, не встреченный в train, получает ~0)
+    P_full = np.full((len(yte), len(classes_all)), 1e-12)
+    for j, c in enumerate(clf.classes_):
+        P_full[:, classes_all.index(int(c))] = P[:, j]
+    P_full /= P_full.sum(axis=1, keepdims=True)
+    pred = np.asarray(classes_all)[P_full.argmax(axis=1)]
+    return {
+        "train_n": int(len(ytr)),
+        "test_n": int(len(yte)),
+        "logloss": float(log_loss(yte, P_full, labels=classes_all)),
+        "acc": float((pred == yte).mean()),
+    }
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(reset: bool = False) -> ProcessPoolExecutor:
+    """Общий пул процессов (spawn) на всё приложение — не создаётся заново для каждой пары; не больше CPU_BUDGET."""
+    global _POOL
+    with _POOL_LOCK:
+        if reset and _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+        if _POOL is None:
+            workers = max(1, min(int(getattr(Config, "WF_MAX_WORKERS", 2)), int(getattr(Config, "CPU_BUDGET", 4))))
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+        return _POOL
+
+
+def _run_folds(pool: ProcessPoolExecutor, args: List[tuple], limit: int) -> List[Dict[str, Any]]:
+    """Фолды в пуле, в полёте не больше limit (по числу слотов CPU-бюджета у вызывающего)."""
+    res: List[Optional[Dict[str, Any]]] = [None] * len(args)
+    pending: Dict[Any, int] = {}
+    nxt = 0
+    while nxt < len(args) or pending:
+        while nxt < len(args) and len(pending) < limit:
+            pending[pool.submit(_fit_fold, *args[nxt])] = nxt
+            nxt += 1
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            res[pending.pop(f)] = f.result()
+    return res
+
+
+def walk_forward_validate(X: np.ndarray, y: np.ndarray, *, n_folds: int, purge: int, C: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Purged walk-forward CV: фолды обучаются параллельно в пуле процессов.
+    Процессы считаются в CPU-бюджете: один фолд — на слоте вызывающего потока (он только ждёт),
+    остальные — на свободных слотах, взятых без ожидания; при занятом бюджете фолды идут по одному.
+    Матрица признаков пишется один раз во временный .npy и читается воркерами через memmap.
+    C — регуляризация модели пары (по умолчанию LR_C).
+    Возвращает {"wf_folds": [...], "wf_logloss": mean, "wf_acc": mean} (пусто, если данных мало).
+    """
+    splits = purged_walk_forward_splits(len(y), n_folds, purge, int(getattr(Config, "WF_MIN_TRAIN", 200)))
+    if not splits:
+        return {}
+    classes_all = sorted(int(c) for c in np.unique(y))
+    fit_args = (
+        float(C if C is not None else getattr(Config, "LR_C", 1.0)),
+        int(getattr(Config, "LR_MAX_ITER", 1000)),
+        str(getattr(Config, "LR_SOLVER", "lbfgs")),
+        getattr(Config, "LR_CLASS_WEIGHT", None),
+        classes_all,
+    )
+    tmp = tempfile.mkdtemp(prefix="wf_")
+    try:
+        path_X, path_y = os.path.join(tmp, "X.npy"), os.path.join(tmp, "y.npy")
+        np.save(path_X, np.ascontiguousarray(X, dtype=np.float32))
+        np.save(path_y, np.ascontiguousarray(y, dtype=np.int64))
+        args = [(path_X, path_y, *sp, *fit_args) for sp in splits]
+        budget = cpu_budget()
+        try:
+            with budget.slot():
+                extra = budget.try_acquire(len(args) - 1)
+                try:
+                    res = _run_folds(_get_pool(), args, 1 + extra)
+                finally:
+                    budget.release(extra)
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            # пул недоступен/сломан — пересоздаём на следующий раз, сейчас считаем в потоке
+            logger.warning("walk-forward process pool failed (%s), running folds in-thread", e)
+            _get_pool(reset=True)
+            res = [_fit_fold(*a) for a in args]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    folds = []
+    for k, ((tr_end, te_start, te_end), r) in enumerate(zip(splits, res)):
+        folds.append({"fold": k, "train_end": tr_end, "test_start": te_start, "test_end": te_end, **r})
+    ll = [f["logloss"] for f in folds if f["logloss"] is not None]
+    acc = [f["acc"] for f in folds if f["acc"] is not None]
+    return {
+        "wf_folds": folds,
+        "wf_logloss": float(np.mean(ll)) if ll else None,
+        "wf_acc": float(np.mean(acc)) if acc else None,
+    }
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+from config import Config
+
+logger = logging.getLogger("train")
+
+
+class ModelPins:
+    """
+    Реестр закреплённых версий моделей: пока читатель (precompute, бэктест) держит версию,
+    janitor её не удаляет, даже если активной уже стала более новая.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refs: Counter = Counter()
+
+    @contextmanager
+    def pin(self, version: Optional[int]):
+        if version is None:
+            yield None
+            return
+        v = int(version)
+        with self._lock:
+            self._refs[v] += 1
+        try:
+            yield v
+        finally:
+            with self._lock:
+                self._refs[v] -= 1
+                if self._refs[v] <= 0:
+                    del self._refs[v]
+
+    def pinned(self) -> set[int]:
+        with self._lock:
+            return set(self._refs)
+
+
+_PINS = ModelPins()
+
+
+def model_pins() -> ModelPins:
+    return _PINS
+
+
+class ModelVersionJanitor:
+    """Фоновая чистка вытесненных версий: раз в MODEL_JANITOR_SEC, кроме активных, закреплённых и MODEL_VERSIONS_KEEP последних."""
+    def __init__(self, db, pins: ModelPins | None = None):
+        self.db = db
+        self.pins = pins or model_pins()
+        self.interval = float(getattr(Config, "MODEL_JANITOR_SEC", 600))
+        self.keep = int(getattr(Config, "MODEL_VERSIONS_KEEP", 3))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        n = self.db.prune_model_versions(keep=self.keep, protected=self.pins.pinned())
+        if n:
+            logger.info("model janitor: pruned %s superseded version(s)", n)
+        return n
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning("model janitor failed: %s", e)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="model-janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
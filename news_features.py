@@ -22,6 +22,12 @@ def _windows_for_tf(timeframe: str) -> List[int]:
         return [10080, 43200]           # 1н, 30н
     return [60, 180, 720]
 
+def _empty_news_features(index: pd.DatetimeIndex, wins: List[int]) -> pd.DataFrame:
+    cols = []
+    for w in wins:
+        cols += [f"news_ct_{w}", f"news_sent_mean_{w}"]
+    return pd.DataFrame(0.0, index=index, columns=cols)
+
 def aggregate_news_features(
     db: DatabaseManager,
     ohlc_index: pd.DatetimeIndex,
@@ -33,6 +39,10 @@ def aggregate_news_features(
     Признаки на каждый бар: для каждого окна (в минутах):
       - news_ct_<win>: количество новостей в окне (t - win, t]
       - news_sent_mean_<win>: средний сентимент в окне
+    Время и сентимент считаются по минутам публикации (floor до минуты), как и раньше.
+    Реализация по событиям: отсортированные минуты публикаций + префиксные суммы
+    count/sentiment и searchsorted на границах окна каждого бара.
+    Память ~ O(новостей + баров), без минутной сетки.
     """
     if ohlc_index is None or len(ohlc_index) == 0:
         return pd.DataFrame(index=pd.DatetimeIndex([], name="open_time"))
@@ -43,51 +53,35 @@ def aggregate_news_features(
     start_time = pd.Timestamp(ohlc_index[0]).to_pydatetime() - timedelta(minutes=max_win + 60)
     end_time = pd.Timestamp(ohlc_index[-1]).to_pydatetime()
 
-    # Загружаем все новости с запасом (лимит большой, для локальной БД ок)
-    news_df = db.news_since(start_time, limit=100000)
+    # Все новости диапазона по возрастанию, без усечения лимитом
+    news_df = db.news_between(start_time, end_time, columns=("published_at", "sentiment"))
     if news_df is None or news_df.empty:
-        cols = []
-        for w in wins:
-            cols += [f"news_ct_{w}", f"news_sent_mean_{w}"]
-        return pd.DataFrame(0.0, index=ohlc_index, columns=cols)
-
-    news_df = news_df[news_df["published_at"] <= end_time]
-    if news_df.empty:
-        cols = []
-        for w in wins:
-            cols += [f"news_ct_{w}", f"news_sent_mean_{w}"]
-        return pd.DataFrame(0.0, index=ohlc_index, columns=cols)
+        return _empty_news_features(ohlc_index, wins)
 
-    # Приводим к минутной сетке
-    news_df = news_df.copy()
-    news_df["published_at"] = pd.to_datetime(news_df["published_at"])
-    # pandas: 'T' устарел, используем 'min'
-    news_df["minute"] = news_df["published_at"].dt.floor("min")
+    pub = pd.to_datetime(news_df["published_at"])
+    sent = pd.to_numeric(news_df["sentiment"], errors="coerce")
+    # новости без сентимента не учитываются ни в количестве, ни в сумме
+    mask = (pub <= end_time) & sent.notna() & pub.notna()
+    if not mask.any():
+        return _empty_news_features(ohlc_index, wins)
 
-    # Считаем по минутам количество и сумму сентимента
-    per_min = news_df.groupby("minute").agg(
-        news_ct=("sentiment", "count"),
-        sent_sum=("sentiment", "sum")
-    ).sort_index()
+    pub_min = pub[mask].dt.floor("min").to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    sent_v = sent[mask].to_numpy(dtype=np.float64)
+    order = np.argsort(pub_min, kind="stable")
+    pub_min = pub_min[order]
+    cs_sent = np.concatenate(([0.0], np.cumsum(sent_v[order])))
 
-    # Равномерная минутная шкала
-    minute_index = pd.date_range(
-        start=start_time.replace(second=0, microsecond=0),
-        end=end_time.replace(second=0, microsecond=0),
-        freq="min"
-    )
-    per_min = per_min.reindex(minute_index).fillna(0.0)
+    # значение на бар — на минуту open_time (floor), окно (t - win, t]
+    bar_t = pd.DatetimeIndex(ohlc_index).floor("min").to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    hi = np.searchsorted(pub_min, bar_t, side="right")
 
-    # Для каждого окна — роллинг по минутам
-    feats = pd.DataFrame(index=minute_index)
+    feats = pd.DataFrame(index=ohlc_index)
     for w in wins:
-        ct = per_min["news_ct"].rolling(window=w, min_periods=1).sum()
-        sent_sum = per_min["sent_sum"].rolling(window=w, min_periods=1).sum()
-        sent_mean = sent_sum / np.maximum(ct, 1.0)
+        lo = np.searchsorted(pub_min, bar_t - np.int64(w) * 60_000_000_000, side="right")
+        ct = (hi - lo).astype(np.float64)
+        sent_sum = cs_sent[hi] - cs_sent[lo]
         feats[f"news_ct_{w}"] = ct
-        feats[f"news_sent_mean_{w}"] = sent_mean
+        feats[f"news_sent_mean_{w}"] = np.where(ct > 0, sent_sum, 0.0) / np.maximum(ct, 1.0)
 
-    # Выровнять по индексам OHLC (open_time) — берём значения на момент open_time
-    feats = feats.reindex(ohlc_index, method="pad").fillna(0.0)
     feats = feats.replace([np.inf, -np.inf], 0.0).fillna(0.0)
-    return feats
\ No newline at end of file
+    return feats
@@ -1,5 +1,8 @@
 import asyncio
+import re
 import aiohttp
+from collections import OrderedDict
+from typing import Dict
 from datetime import datetime, timedelta, timezone
 from config import Config
 from database import DatabaseManager
@@ -20,11 +23,46 @@ def simple_sentiment(text: str):
         if w in t: score -= 1
     return float(max(-3, min(3, score))) / 3.0
 
+def _build_symbol_matcher(keywords_by_symbol):
+    """
+    Один скомпилированный regex на все ключевые слова (границы слов) + словарь слово -> тикеры.
+    Слова в нижнем регистре ищутся без учёта регистра, слова с заглавными — точно: тикер 'SOL'
+    не должен ловить испанское 'sol', 'ADA' — имя Ada. Длинные фразы идут первыми,
+    чтобы 'binance coin' не съедалось 'bnb'.
+    """
+    kw_map = {}
+    for sym, words in (keywords_by_symbol or {}).items():
+        for w in words:
+            key = w if w != w.lower() else w.lower()
+            kw_map.setdefault(key, set()).add(sym.upper())
+    if not kw_map:
+        return None, {}
+    alts = sorted(kw_map, key=len, reverse=True)
+    rx = re.compile(r"\b(" + "|".join(re.escape(w) if w != w.lower() else "(?i:" + re.escape(w) + ")" for w in alts) + r")\b")
+    return rx, kw_map
+
+_SYMBOL_RE, _KEYWORD_TO_SYMBOLS = _build_symbol_matcher(getattr(Config, "NEWS_SYMBOL_KEYWORDS", {}))
+
+def tag_symbols(text: str):
+    """Тикеры (base-валюты), упомянутые в тексте: ['BTC', 'ETH', ...]."""
+    if not text or _SYMBOL_RE is None:
+        return []
+    found = set()
+    for m in _SYMBOL_RE.finditer(text):
+        w = m.group(1)
+        found |= _KEYWORD_TO_SYMBOLS.get(w, set()) or _KEYWORD_TO_SYMBOLS.get(w.lower(), set())
+    return sorted(found)
+
 class NewsIngestor:
     def __init__(self, db: DatabaseManager):
         self.db = db
         self._stop = False
         self._task = None
+        # валидаторы для условных GET: url -> {"etag", "last_modified"}
+        self._validators: Dict[str, Dict[str, str]] = {}
+        # уже виденные ссылки по каждому фиду (ограниченный по размеру LRU-набор)
+        self._seen: Dict[str, OrderedDict] = {}
+        self._seen_max = int(getattr(Config, "NEWS_SEEN_MAX", 5000))
 
     async def start(self):
         self._stop = False
@@ -45,31 +83,77 @@ class NewsIngestor:
                     logger.warning("news loop error: %s", e)
                 await asyncio.sleep(600)
 
-    async def _fetch_feeds(self, session: aiohttp.ClientSession):
-        for url in Config.NEWS_FEEDS:
+    @staticmethod
+    def _parse_items(txt: str):
+        # примитивный RSS parse “по ключам”; для прод — используйте feedparser
+        items = []
+        for chunk in txt.split("<item>")[1:]:
             try:
-                async with session.get(url, timeout=20) as r:
-                    txt = await r.text()
-                # примитивный RSS parse “по ключам”; для прод — используйте feedparser
-                items = []
-                for chunk in txt.split("<item>")[1:]:
-                    try:
-                        title = chunk.split("<title>")[1].split("</title>")[0]
-                        link = chunk.split("<link>")[1].split("</link>")[0]
-                        pubstr = chunk.split("<pubDate>")[1].split("</pubDate>")[0]
-                        try:
-                            published = datetime.strptime(pubstr[:25], "%a, %d %b %Y %H:%M:%S")
-                        except:
-                            published = datetime.utcnow()
-                        desc = ""
-                        if "<description>" in chunk:
-                            desc = chunk.split("<description>")[1].split("</description>")[0]
-                        items.append((title, link, published, desc))
-                    except Exception:
-                        continue
-                for (title, link, published, desc) in items:
-                    sent = simple_sentiment(title + " " + desc)
-                    self.db.add_news(provider=url, title=title, url=link, published_at=published, summary=desc, sentiment=sent, symbols_csv="")
-                logger.info("news fetched %s items from %s", len(items), url)
-            except Exception as e:
-                logger.debug("news fetch error %s: %s", url, e)
\ No newline at end of file
+                title = chunk.split("<title>")[1].split("</title>")[0]
+                link = chunk.split("<link>")[1].split("</link>")[0]
+                pubstr = chunk.split("<pubDate>")[1].split("</pubDate>")[0]
+                try:
+                    published = datetime.strptime(pubstr[:25], "%a, %d %b %Y %H:%M:%S")
+                except:
+                    published = datetime.utcnow()
+                desc = ""
+                if "<description>" in chunk:
+                    desc = chunk.split("<description>")[1].split("</description>")[0]
+                items.append((title, link, published, desc))
+            except Exception:
+                continue
+        return items
+
+    def _mark_seen(self, url: str, links):
+        seen = self._seen.setdefault(url, OrderedDict())
+        for link in links:
+            seen[link] = None
+            seen.move_to_end(link)
+        while len(seen) > self._seen_max:
+            seen.popitem(last=False)
+
+    async def _fetch_feed(self, session: aiohttp.ClientSession, url: str) -> int:
+        headers = {}
+        v = self._validators.get(url) or {}
+        if v.get("etag"):
+            headers["If-None-Match"] = v["etag"]
+        if v.get("last_modified"):
+            headers["If-Modified-Since"] = v["last_modified"]
+        async with session.get(url, timeout=20, headers=headers) as r:
+            if r.status == 304:
+                logger.debug("news feed not modified: %s", url)
+                return 0
+            r.raise_for_status()
+            txt = await r.text()
+            validators = {
+                "etag": r.headers.get("ETag") or "",
+                "last_modified": r.headers.get("Last-Modified") or "",
+            }
+        items = self._parse_items(txt)
+        seen = self._seen.get(url) or {}
+        fresh = [it for it in items if it[1] not in seen]
+        rows = []
+        for (title, link, published, desc) in fresh:
+            text = title + " " + desc
+            rows.append((url, title, link, published, desc, simple_sentiment(text), ",".join(tag_symbols(text))))
+        inserted = 0
+        if rows:
+            # одна транзакция на фид; SQLite — в пуле потоков, чтобы не блокировать event loop
+            inserted = await asyncio.to_thread(self.db.add_news_many, rows)
+        if inserted is None:
+            # вставка откатилась: ни валидаторы, ни «виденные» не трогаем — следующий опрос
+            # получит полный ответ (не 304) и повторит вставку тех же новостей
+            logger.warning("news insert failed, will retry %s (%s new items)", url, len(rows))
+            return 0
+        # фиксируем состояние фида только после успешного commit
+        self._validators[url] = validators
+        self._mark_seen(url, [it[1] for it in items])
+        logger.info("news fetched %s items (%s new, %s inserted) from %s", len(items), len(rows), inserted, url)
+        return inserted
+
+    async def _fetch_feeds(self, session: aiohttp.ClientSession):
+        urls = list(Config.NEWS_FEEDS)
+        results = await asyncio.gather(*(self._fetch_feed(session, u) for u in urls), return_exceptions=True)
+        for url, res in zip(urls, results):
+            if isinstance(res, Exception):
+                logger.debug("news fetch error %s: %s", url, res)
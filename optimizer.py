@@ -7,13 +7,20 @@
 
 Перебор сетки выполняется параллельно в ThreadPoolExecutor
 с числом воркеров из Config.OPTIMIZE_MAX_WORKERS (по умолчанию 4).
+Какие комбинации считать, решает стратегия поиска (optimizer_pkg/strategies.py, Config.OPTIMIZE_STRATEGY):
+grid (полный перебор), random, halving, local.
+Цель ранжирования — любая метрика бэктеста (backtest_pkg/metrics.py, Config.OPTIMIZE_OBJECTIVE):
+winrate (по умолчанию), pnl_sum, expectancy, profit_factor, sharpe, sortino, return_pct, max_drawdown.
 """
 
 from __future__ import annotations
 from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple
-import itertools
+import random
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from optimizer_pkg.strategies import STRATEGIES, iter_grid, planned_evals
+from backtest_pkg.metrics import OBJECTIVES, objective_score
+
 try:
     from config import Config
 except Exception:
@@ -33,16 +40,32 @@ GridDefaults: Dict[str, List[Any]] = {
     "max_bars_in_trade": [100, 150, 200],
 }
 
-def grid_size(grid: Dict[str, List[Any]]) -> int:
-    total = 1
-    for arr in grid.values():
-        total *= max(1, len(arr))
-    return total
+def grid_size(grid: Dict[str, List[Any]], strategy: Optional[str] = None) -> int:
+    """Число бэктестов на ТФ: для grid — все комбинации, для остальных стратегий — плановая оценка."""
+    strategy = _strategy_name(strategy)
+    if strategy == "grid":
+        total = 1
+        for arr in grid.values():
+            total *= max(1, len(arr))
+        return total
+    return planned_evals(grid, strategy, _budget(), _eta())
+
+def _strategy_name(strategy: Optional[str]) -> str:
+    name = str(strategy or getattr(Config, "OPTIMIZE_STRATEGY", "grid")).lower()
+    return name if name in STRATEGIES else "grid"
+
+def _objective_name(objective: Optional[str]) -> str:
+    name = str(objective or getattr(Config, "OPTIMIZE_OBJECTIVE", "winrate")).lower()
+    return name if name in OBJECTIVES else "winrate"
+
+def _budget() -> int:
+    return max(1, int(getattr(Config, "OPTIMIZE_BUDGET", 60)))
+
+def _eta() -> int:
+    return max(2, int(getattr(Config, "OPTIMIZE_HALVING_ETA", 3)))
 
 def _iter_grid(grid: Dict[str, List[Any]]) -> Iterable[Dict[str, Any]]:
-    keys = list(grid.keys())
-    for combo in itertools.product(*[grid[k] for k in keys]):
-        yield {k: v for k, v in zip(keys, combo)}
+    return iter_grid(grid)
 
 
 # --------- Основная оптимизация (параллельно) ----------
@@ -55,11 +78,15 @@ def optimize_symbol_tf(
     on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
     grid: Optional[Dict[str, List[Any]]] = None,
     limit: Optional[int] = None,
+    store=None,
+    strategy: Optional[str] = None,
+    objective: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Перебирает сетку параметров параллельно и выбирает лучшую конфигурацию по метрике:
-      - максимальный winrate (stats['winrate'])
+      - максимум цели objective (по умолчанию Config.OPTIMIZE_OBJECTIVE; max_drawdown — минимум)
       - при равенстве — большее число сделок (stats['count'])
+    Без сделок комбинация оценивается только для winrate (как раньше).
 
     Итоги:
       - сохраняет best params в БД через db.save_model_params(symbol, timeframe, tuned)
@@ -67,16 +94,22 @@ def optimize_symbol_tf(
 
     Прогресс:
       - on_progress получает dict {tf, i, total, phase, best}, где i — число выполненных комбинаций.
+
+    store (ProbStore) — общий кэш вероятностей задания обучения: модели не скорятся заново.
+    strategy — стратегия поиска (по умолчанию Config.OPTIMIZE_STRATEGY); random/local стартуют
+    с сохранённых model_params, halving отсеивает кандидатов на коротких окнах бэктеста.
     """
     from backtest import run_backtest
+    from utils.cpu_budget import cpu_budget
     try:
         from precompute_cache import build_precompute
     except Exception:
         build_precompute = None
 
     grid = grid or GridDefaults
-    combos = list(_iter_grid(grid))
-    total = len(combos)
+    strategy = _strategy_name(strategy)
+    objective = _objective_name(objective)
+    total = grid_size(grid, strategy)
     if on_progress:
         on_progress({"tf": timeframe, "i": 0, "total": total, "phase": "start"})
 
@@ -84,7 +117,8 @@ def optimize_symbol_tf(
     precomp = None
     if build_precompute:
         try:
-            precomp = build_precompute(db, models, symbol, timeframe, limit=(limit or getattr(Config, "BACKTEST_OPTIM_LIMIT", 2000)))
+            with cpu_budget().slot():
+                precomp = build_precompute(db, models, symbol, timeframe, limit=(limit or getattr(Config, "BACKTEST_OPTIM_LIMIT", 2000)), store=store)
         except Exception:
             precomp = None
 
@@ -92,48 +126,80 @@ def optimize_symbol_tf(
     max_workers = max(1, int(getattr(Config, "OPTIMIZE_MAX_WORKERS", 4)))
 
     # Задача для пула
-    def _eval(params: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-        bt = run_backtest(
-            db, models, symbol, timeframe,
-            bt_limit,
-            float(params.get("signal_threshold", getattr(Config, "SIGNAL_THRESHOLD", 0.6))),
-            float(params.get("hold_margin", 0.05)),
-            int(params.get("min_confirmed_higher", 0)),
-            float(params.get("sl_atr_mult", 1.0)),
-            float(params.get("tp_atr_mult", 2.0)),
-            int(params.get("max_bars_in_trade", 200)),
-            precomp,
-        )
+    def _eval(params: Dict[str, Any], win: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        # каждая комбинация — листовая задача общего CPU-бюджета (utils/cpu_budget.py)
+        with cpu_budget().slot():
+            bt = run_backtest(
+                db, models, symbol, timeframe,
+                win,
+                float(params.get("signal_threshold", getattr(Config, "SIGNAL_THRESHOLD", 0.6))),
+                float(params.get("hold_margin", 0.05)),
+                int(params.get("min_confirmed_higher", 0)),
+                float(params.get("sl_atr_mult", 1.0)),
+                float(params.get("tp_atr_mult", 2.0)),
+                int(params.get("max_bars_in_trade", 200)),
+                precomp,
+            )
         stats = (bt or {}).get("stats", {}) if bt else {}
         return params, stats
 
     best = {"score": None, "params": None, "stats": None}
 
     def _score(stats: Dict[str, Any]) -> Optional[Tuple[float, int]]:
-        wr = stats.get("winrate")
-        if wr is None:
+        # (значение цели, число сделок): при равной цели лучше больше сделок
+        v = objective_score(stats, objective)
+        if v is None:
             return None
-        return float(wr), int(stats.get("count") or 0)
+        return v, int(stats.get("count") or 0)
 
     done = 0
-    # Пул потоков: параллельно считаем бэктесты для разных комбинаций
-    with ThreadPoolExecutor(max_workers=min(max_workers, total)) as pool:
-        futures = {pool.submit(_eval, p): p for p in combos}
-        for fut in as_completed(futures):
-            params = futures[fut]
-            try:
-                p, stats = fut.result()
-                sc = _score(stats)
-                if sc is not None:
-                    if (best["score"] is None) or (sc > best["score"]):
-                        best = {"score": sc, "params": dict(p), "stats": dict(stats)}
-            except Exception:
-                # игнорируем отдельные ошибки комбинаций
-                pass
-            finally:
-                done += 1
-                if on_progress:
-                    on_progress({"tf": timeframe, "i": done, "total": total, "phase": "step", "best": best})
+    seen: Dict[tuple, Optional[Tuple[float, int]]] = {}
+
+    def evaluate(cands: List[Dict[str, Any]], limit: Optional[int] = None, final: bool = True):
+        """Параллельный бэктест кандидатов на окне limit; в лучший результат идут только final-окна."""
+        nonlocal best, done
+        win = int(limit or bt_limit)
+        out, todo = [], []
+        for p in cands:
+            key = (tuple(sorted(p.items())), win)
+            if key in seen:
+                out.append((p, seen[key]))
+            else:
+                seen[key] = None
+                todo.append(p)
+        if not todo:
+            return out
+        # Пул потоков: параллельно считаем бэктесты для разных комбинаций
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(todo))) as pool:
+            futures = {pool.submit(_eval, p, win): p for p in todo}
+            for fut in as_completed(futures):
+                params = futures[fut]
+                sc = None
+                try:
+                    p, stats = fut.result()
+                    sc = _score(stats)
+                    if final and sc is not None:
+                        if (best["score"] is None) or (sc > best["score"]):
+                            best = {"score": sc, "params": dict(p), "stats": dict(stats)}
+                except Exception:
+                    # игнорируем отдельные ошибки комбинаций
+                    pass
+                finally:
+                    seen[(tuple(sorted(params.items())), win)] = sc
+                    out.append((params, sc))
+                    done += 1
+                    if on_progress:
+                        on_progress({"tf": timeframe, "i": done, "total": total, "phase": "step", "best": best})
+        return out
+
+    seed = None
+    if strategy in ("random", "local", "halving"):
+        try:
+            seed = db.load_model_params(symbol, timeframe)
+        except Exception:
+            seed = None
+    STRATEGIES[strategy](evaluate, grid, limit=bt_limit, budget=_budget(), seed=seed,
+                         rng=random.Random(f"{symbol}:{timeframe}"), eta=_eta())
 
     tuned = best["params"] or {
         "signal_threshold": float(getattr(Config, "SIGNAL_THRESHOLD", 0.6)),
@@ -152,4 +218,4 @@ def optimize_symbol_tf(
     if on_progress:
         on_progress({"tf": timeframe, "i": total, "total": total, "phase": "final", "best": best})
 
-    return {"ok": True, "best": best, "tuned": tuned}
+    return {"ok": True, "best": best, "tuned": tuned, "strategy": strategy, "objective": objective, "evaluated": done}
@@ -0,0 +1 @@
+from .strategies import STRATEGIES, iter_grid, planned_evals
@@ -0,0 +1,153 @@
+"""
+Стратегии поиска параметров для optimizer.optimize_symbol_tf.
+Стратегия получает evaluate(cands, limit=None, final=True) -> [(params, score)] (параллельный бэктест,
+общий прогресс и скоринг winrate/count) и решает, какие комбинации сетки считать:
+  - grid    — полный перебор (как раньше);
+  - random  — случайная выборка из сетки в пределах бюджета;
+  - halving — successive halving: budget кандидатов на коротком окне, лучшие 1/eta — на окне в eta раз длиннее;
+  - local   — покоординатный спуск от сохранённых model_params (или центра сетки).
+"""
+from __future__ import annotations
+import itertools
+import math
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Params = Dict[str, Any]
+Score = Optional[Tuple[float, int]]
+Evaluate = Callable[..., List[Tuple[Params, Score]]]
+
+
+def iter_grid(grid: Dict[str, List[Any]]):
+    keys = list(grid.keys())
+    for combo in itertools.product(*[grid[k] for k in keys]):
+        yield {k: v for k, v in zip(keys, combo)}
+
+
+def _grid_total(grid: Dict[str, List[Any]]) -> int:
+    return math.prod(max(1, len(v)) for v in grid.values())
+
+
+def _snap(grid: Dict[str, List[Any]], seed: Optional[Params]) -> Params:
+    """Ближайшая точка сетки к seed (по каждой оси); без seed — центр сетки."""
+    out = {}
+    for k, vals in grid.items():
+        v = (seed or {}).get(k)
+        if v is None or not vals:
+            out[k] = vals[len(vals) // 2] if vals else None
+            continue
+        try:
+            out[k] = min(vals, key=lambda x: abs(float(x) - float(v)))
+        except (TypeError, ValueError):
+            out[k] = v if v in vals else vals[len(vals) // 2]
+    return out
+
+
+def _sample(grid: Dict[str, List[Any]], n: int, rng: random.Random, first: Optional[Params] = None) -> List[Params]:
+    """n различных точек сетки (seed — первой); для маленькой сетки — вся сетка."""
+    total = _grid_total(grid)
+    if n >= total:
+        return list(iter_grid(grid))
+    keys = list(grid.keys())
+    seen, out = set(), []
+    if first is not None:
+        seen.add(tuple(first[k] for k in keys))
+        out.append(dict(first))
+    for i in rng.sample(range(total), total):
+        if len(out) >= n:
+            break
+        combo, rest = [], i
+        for k in reversed(keys):
+            combo.append(grid[k][rest % len(grid[k])])
+            rest //= len(grid[k])
+        t = tuple(reversed(combo))
+        if t not in seen:
+            seen.add(t)
+            out.append(dict(zip(keys, t)))
+    return out
+
+
+def _rounds(budget: int, eta: int) -> int:
+    """Число раундов halving — наибольшее r с eta**r <= budget (не меньше 1); целочисленно: log(243, 3) = 4.999…"""
+    r = 0
+    while eta ** (r + 1) <= budget:
+        r += 1
+    return max(1, r)
+
+
+def _ranked(results: List[Tuple[Params, Score]]) -> List[Params]:
+    scored = [(s, p) for p, s in results if s is not None]
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [p for _s, p in scored]
+
+
+# -------- стратегии --------
+
+def grid_search(evaluate: Evaluate, grid, *, limit: int, budget: int, seed, rng, eta: int) -> None:
+    evaluate(list(iter_grid(grid)))
+
+
+def random_search(evaluate: Evaluate, grid, *, limit: int, budget: int, seed, rng, eta: int) -> None:
+    evaluate(_sample(grid, budget, rng, _snap(grid, seed) if seed else None))
+
+
+def halving_search(evaluate: Evaluate, grid, *, limit: int, budget: int, seed, rng, eta: int) -> None:
+    eta = max(2, int(eta))
+    rounds = _rounds(budget, eta)
+    # первый раунд: budget кандидатов на окне limit / eta^(rounds-1); в каждом следующем — 1/eta лучших на окне ×eta
+    cands = _sample(grid, max(1, budget), rng, _snap(grid, seed) if seed else None)
+    for r in range(rounds):
+        last = r == rounds - 1 or len(cands) <= 1
+        win = limit if last else max(200, int(limit / eta ** (rounds - 1 - r)))
+        results = evaluate(cands, limit=win, final=last)
+        if last:
+            return
+        ranked = _ranked(results) or cands
+        cands = ranked[:max(1, len(cands) // eta)]
+
+
+def local_search(evaluate: Evaluate, grid, *, limit: int, budget: int, seed, rng, eta: int) -> None:
+    best = _snap(grid, seed)
+    best_score = (evaluate([best]) or [(best, None)])[0][1]
+    spent = 1
+    for _pass in range(3):
+        improved = False
+        for k, vals in grid.items():
+            cands = [{**best, k: v} for v in vals if v != best[k]]
+            if not cands or spent + len(cands) > budget:
+                continue
+            spent += len(cands)
+            for p, s in evaluate(cands):
+                if s is not None and (best_score is None or s > best_score):
+                    best, best_score, improved = p, s, True
+        if not improved:
+            return
+
+
+STRATEGIES: Dict[str, Callable[..., None]] = {
+    "grid": grid_search,
+    "random": random_search,
+    "halving": halving_search,
+    "local": local_search,
+}
+
+
+def planned_evals(grid: Dict[str, List[Any]], strategy: str, budget: int, eta: int = 3) -> int:
+    """Оценка числа бэктестов (для прогресса); фактическое число может быть меньше."""
+    total = _grid_total(grid)
+    if strategy == "random":
+        return min(total, budget)
+    if strategy == "halving":
+        eta = max(2, int(eta))
+        rounds = _rounds(budget, eta)
+        n = min(total, max(1, budget))
+        evals = 0
+        for _r in range(rounds):
+            evals += n
+            if n <= 1:
+                break
+            n = max(1, n // eta)
+        return evals
+    if strategy == "local":
+        return min(budget, 1 + 3 * sum(max(0, len(v) - 1) for v in grid.values()))
+    return total
@@ -3,4 +3,5 @@ Proxy-слой для обратной совместимости.
 Оставляем импорт как был: from precompute_cache import build_precompute
 Реальная логика вынесена в пакет precompute_pkg.
 """
-from precompute_pkg.core import build_precompute  # noqa: F401
\ No newline at end of file
+from precompute_pkg.core import build_precompute  # noqa: F401
+from precompute_pkg.prob_store import ProbStore  # noqa: F401
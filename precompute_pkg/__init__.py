@@ -1 +1,3 @@
-from .core import build_precompute
\ No newline at end of file
+from .core import build_precompute
+from .prob_store import ProbStore
+from .point import point_probs, get_point_cache
@@ -0,0 +1,80 @@
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_pkg.ccxt_manager import TF_TO_MS
+
+
+def tf_delta(tf: str) -> pd.Timedelta:
+    """Длительность бара ТФ (метки в индексах — время открытия бара)."""
+    return pd.Timedelta(milliseconds=TF_TO_MS.get(tf, 0))
+
+
+def asof_positions(base_idx: pd.DatetimeIndex, base_tf: str, higher_idx: pd.DatetimeIndex, higher_tf: str) -> np.ndarray:
+    """
+    Для каждого базового бара — позиция последнего бара другого ТФ, закрывшегося не позже закрытия базового
+    (open_h + dur_h <= open_b + dur_b); -1 — такого ещё нет. Один векторный searchsorted на ТФ.
+    Выравнивание по открытию заглядывало бы в будущее: бар 4h с меткой 00:00 закрывается только в 04:00.
+    """
+    if len(base_idx) == 0:
+        return np.empty(0, dtype=np.int64)
+    shifted = base_idx + (tf_delta(base_tf) - tf_delta(higher_tf))
+    return higher_idx.searchsorted(shifted, side="right").astype(np.int64) - 1
+
+
+def build_alignment(precomp: Dict[str, Any], base_tf: str, start: int = 0) -> Dict[str, Any]:
+    """Матрица выравнивания: pos[i, j] — строка ТФ tfs[j] для базового бара start + i."""
+    X_idx = precomp["X_idx"]
+    higher = precomp.get("higher") or {}
+    tfs = list(higher)
+    pos = np.full((len(X_idx) - start, len(tfs)), -1, dtype=np.int64)
+    for j, tf in enumerate(tfs):
+        pos[:, j] = asof_positions(X_idx[start:], base_tf, higher[tf]["idx"], tf)
+    return {"base_tf": base_tf, "tfs": tfs, "pos": pos}
+
+
+def ensure_alignment(precomp: Dict[str, Any], base_tf: str) -> Dict[str, Any]:
+    """
+    precomp["align"], построенная один раз; если базовый индекс дорос новыми барами (а набор ТФ тот же),
+    досчитываются только новые строки.
+    """
+    al: Optional[Dict[str, Any]] = precomp.get("align")
+    n = len(precomp["X_idx"])
+    if al is None or al.get("base_tf") != base_tf or al.get("tfs") != list(precomp.get("higher") or {}) or len(al["pos"]) > n:
+        al = build_alignment(precomp, base_tf)
+    elif len(al["pos"]) < n:
+        tail = build_alignment(precomp, base_tf, start=len(al["pos"]))
+        al = {**al, "pos": np.vstack([al["pos"], tail["pos"]])}
+    precomp["align"] = al
+    return al
+
+
+def gather_probs(precomp: Dict[str, Any], base_tf: str, rows=None):
+    """
+    (tfs, buy, hold, sell) формы (len(rows), 1 + n_higher) по строкам базового индекса; столбец 0 — базовый ТФ,
+    NaN — у ТФ на этом баре ещё нет закрытого бара. Чтение — gather по матрице выравнивания, без поиска.
+    """
+    al = ensure_alignment(precomp, base_tf)
+    rows = np.arange(len(precomp["X_idx"])) if rows is None else np.asarray(rows, dtype=np.int64)
+    tfs: List[str] = [base_tf] + al["tfs"]
+    out = []
+    for key in ("pb_buy", "pb_hold", "pb_sell"):
+        m = np.full((len(rows), len(tfs)), np.nan)
+        m[:, 0] = np.asarray(precomp["base"][key], dtype=float)[rows]
+        for j, tf in enumerate(al["tfs"], start=1):
+            p = al["pos"][rows, j - 1]
+            have = p >= 0
+            m[have, j] = np.asarray(precomp["higher"][tf][key], dtype=float)[p[have]]
+        out.append(m)
+    return tfs, out[0], out[1], out[2]
+
+
+def probs_at_row(precomp: Dict[str, Any], base_tf: str, i: int) -> Dict[str, Dict[str, float]]:
+    """Вероятности всех ТФ на базовом баре i в виде {tf: {buy, hold, sell}} (для скалярных потребителей)."""
+    i = int(i) % len(precomp["X_idx"])
+    tfs, buy, hold, sell = gather_probs(precomp, base_tf, [i])
+    return {
+        tf: {"buy": float(buy[0, j]), "hold": float(hold[0, j]), "sell": float(sell[0, j])}
+        for j, tf in enumerate(tfs) if not np.isnan(buy[0, j])
+    }
@@ -0,0 +1,131 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from features_pkg.cache import feature_frame
+from model_pkg.versions import model_pins
+from .align import tf_delta
+from .core import _extract_model_bundle, predict_features
+
+
+class PointProbCache:
+    """
+    LRU вероятностей отдельных баров для explain: ключ — (symbol, TF, версия модели, бар, его OHLCV).
+    Новая активная версия или изменившаяся свеча — другой ключ, устаревшие записи вытесняются сами.
+    """
+    def __init__(self, max_items: int | None = None):
+        self.max_items = int(max_items if max_items is not None else getattr(Config, "EXPLAIN_CACHE_SIZE", 4096))
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[tuple, Dict[str, float]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(symbol: str, timeframe: str, version: Optional[int], df: pd.DataFrame) -> Optional[tuple]:
+        if version is None or df is None or df.empty:
+            return None
+        last = df.iloc[-1]
+        ohlcv = tuple(float(last[c]) for c in ("open", "high", "low", "close", "volume"))
+        return (symbol, timeframe, int(version), int(df.index[-1].value), ohlcv)
+
+    def get(self, key) -> Optional[Dict[str, float]]:
+        if key is None:
+            return None
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is None:
+                self._stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            return dict(hit)
+
+    def put(self, key, probs: Dict[str, float]) -> None:
+        if key is None or self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = dict(probs)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._items), "max_items": self.max_items}
+
+
+_DEFAULT: Optional[PointProbCache] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_point_cache() -> PointProbCache:
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = PointProbCache()
+        return _DEFAULT
+
+
+def _bar_probs(db, symbol: str, timeframe: str, bundle: Dict[str, Any], win: pd.DataFrame) -> Tuple[Optional[Dict[str, float]], bool]:
+    """
+    Вероятности последнего бара окна win: из LRU или по признакам окна (разогрев — само окно). -> (probs, из кэша).
+    probs = None — признаков для этого бара нет (ТФ пропускается).
+    """
+    cache = get_point_cache()
+    key = PointProbCache.make_key(symbol, timeframe, bundle.get("version"), win)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit, True
+    X = feature_frame(db, symbol, timeframe, bundle.get("features_settings") or {}, win)
+    # строго строка последнего бара окна: хвост X без неё дал бы вероятности чужого бара
+    X = X[X.index == win.index[-1]]
+    if X.empty:
+        return None, False
+    res = predict_features(bundle, X)
+    probs = {"buy": float(res["pb_buy"][-1]), "hold": float(res["pb_hold"][-1]), "sell": float(res["pb_sell"][-1])}
+    cache.put(key, probs)
+    return probs, False
+
+
+def point_probs(db, models, symbol: str, base_tf: str, t, window: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Вероятности всех ТФ на одном баре без полного precompute: базовый бар — последний с open_time <= t,
+    старший ТФ — последний бар, закрытый к закрытию базового (как в align.py). По каждому ТФ из БД читается
+    только окно разогрева (EXPLAIN_WARMUP_BARS); с кэшем признаков значения совпадают с build_precompute.
+    Возвращает {"ts", "df" (окно базового ТФ), "probs": {tf: {buy, hold, sell}}, "versions", "cached"} или None.
+    """
+    n = max(int(window or getattr(Config, "EXPLAIN_WARMUP_BARS", 500)), 2)
+    t = pd.Timestamp(t)
+    if t.tzinfo is not None:
+        t = t.tz_convert(None)
+    out: Dict[str, Any] = {"probs": {}, "versions": {}, "cached": 0}
+    with ExitStack() as pins:
+        for tf in dict.fromkeys([base_tf, *Config.TIMEFRAMES]):
+            bundle = _extract_model_bundle(db, models, symbol, tf)
+            if bundle.get("model") is None:
+                if tf == base_tf:
+                    return None
+                continue
+            pins.enter_context(model_pins().pin(bundle.get("version")))
+            if tf == base_tf:
+                win = db.load_ohlcv_window(symbol, tf, t.to_pydatetime(), n)
+                if win is None or win.empty:
+                    return None
+                out["ts"], out["df"] = win.index[-1], win
+            else:
+                until = out["ts"] + tf_delta(base_tf) - tf_delta(tf)
+                win = db.load_ohlcv_window(symbol, tf, until.to_pydatetime(), n)
+                if win is None or win.empty:
+                    continue
+            probs, cached = _bar_probs(db, symbol, tf, bundle, win)
+            if probs is None or not all(np.isfinite(v) for v in probs.values()):
+                continue
+            out["probs"][tf] = probs
+            out["versions"][tf] = bundle.get("version")
+            out["cached"] += int(cached)
+    return out
@@ -0,0 +1,117 @@
+import logging
+import threading
+from contextlib import ExitStack
+from typing import Dict, Any, Optional, Tuple
+
+import pandas as pd
+
+from config import Config
+from model_pkg.versions import model_pins
+from .align import build_alignment
+from .core import _calc_bundle_proba, _extract_model_bundle
+
+logger = logging.getLogger("train")
+
+
+class ProbStore:
+    """
+    Общий на задание кэш вероятностей по (symbol, tf): каждая модель скорится ровно один раз
+    на окне `limit` баров, а все виды «база + старшие ТФ» для оптимизатора и пост-бэктеста
+    нарезаются из него (view). Версии моделей закреплены до close() — janitor их не удалит,
+    а все стадии задания видят одни и те же модели.
+    """
+    def __init__(self, db, models, symbol: str, limit: int = 5000):
+        self.db = db
+        self.models = models
+        self.symbol = symbol
+        self.limit = int(limit)
+        self._lock = threading.Lock()
+        self._tf_locks: Dict[str, threading.Lock] = {}
+        self._data: Dict[str, Tuple[Dict[str, Any], pd.DataFrame]] = {}
+        self._versions: Dict[str, Optional[int]] = {}
+        self._align: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+        self._pins = ExitStack()
+        self._stats = {"scored": 0, "views": 0, "fallbacks": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._pins.close()
+            self._data.clear()
+            self._align.clear()
+
+    def _tf_lock(self, tf: str) -> threading.Lock:
+        with self._lock:
+            return self._tf_locks.setdefault(tf, threading.Lock())
+
+    def get(self, tf: str) -> Tuple[Dict[str, Any], pd.DataFrame]:
+        """(res, df) для ТФ: считается один раз, параллельные запросы того же ТФ ждут первый расчёт."""
+        with self._tf_lock(tf):
+            hit = self._data.get(tf)
+            if hit is not None:
+                return hit
+            bundle = _extract_model_bundle(self.db, self.models, self.symbol, tf)
+            with self._lock:
+                self._pins.enter_context(model_pins().pin(bundle.get("version")))
+                self._versions[tf] = bundle.get("version")
+            _idx, res, df = _calc_bundle_proba(self.db, self.models, self.symbol, tf, self.limit, bundle=bundle)
+            with self._lock:
+                self._data[tf] = (res, df)
+                self._stats["scored"] += 1
+            return res, df
+
+    def view(self, timeframe: str, limit: int = 5000) -> Optional[Dict[str, Any]]:
+        """Структура как у build_precompute(symbol, timeframe, limit), без повторного скоринга."""
+        if int(limit) > self.limit:
+            # окна не хватает — честно пересчитываем напрямую
+            with self._lock:
+                self._stats["fallbacks"] += 1
+            from .core import build_precompute
+            return build_precompute(self.db, self.models, self.symbol, timeframe, limit=limit)
+
+        res, df = self.get(timeframe)
+        if df is None or df.empty:
+            return None
+        n = min(len(df), max(1000, int(limit)))
+        base = {k: res[k][-n:] for k in ("pb_buy", "pb_hold", "pb_sell", "idx")}
+
+        higher: Dict[str, Dict[str, Any]] = {}
+        for tf in Config.TIMEFRAMES:
+            if tf == timeframe:
+                continue
+            try:
+                res_h, _dfh = self.get(tf)
+            except Exception:
+                continue
+            if len(res_h.get("pb_buy", [])) > 0:
+                higher[tf] = {k: res_h[k] for k in ("pb_buy", "pb_hold", "pb_sell", "idx")}
+
+        # выравнивание считается один раз на полном окне базового ТФ, виды берут его хвост
+        key = (timeframe, tuple(higher))
+        with self._lock:
+            al = self._align.get(key)
+        if al is None:
+            al = build_alignment({"X_idx": res["idx"], "higher": higher}, timeframe)
+            with self._lock:
+                self._align[key] = al
+
+        with self._lock:
+            self._stats["views"] += 1
+            versions = {tf: self._versions.get(tf) for tf in [timeframe, *higher]}
+        return {
+            "df_use": df.tail(n),
+            "X_idx": base["idx"],
+            "base": base,
+            "higher": higher,
+            "versions": versions,
+            "align": {**al, "pos": al["pos"][-n:]},
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "tfs": sorted(self._data), "limit": self.limit}
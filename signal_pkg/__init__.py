@@ -1,2 +1,3 @@
 from .agg import aggregate_signal, _tf_score_from_pb
-from .decisions import decide_entry, decide_exit
\ No newline at end of file
+from .decisions import decide_entry, decide_exit
+from .batch import aggregate_signal_batch, entry_mask_batch, exit_mask_batch, probs_matrix, weights_vector
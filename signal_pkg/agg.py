@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import Dict, List
 import numpy as np
 from config import Config
+from .batch import aggregate_signal_batch, weights_vector
 
 # Тип pb: {"buy": float, "hold": float, "sell": float}
 
@@ -23,14 +24,6 @@ def _tf_score_from_pb(pb: Dict[str, float]) -> float:
     return float(np.clip(score, -1.0, 1.0))
 
 
-def _normalize_weights(weights: Dict[str, float]) -> Dict[str, float]:
-    s = sum(max(0.0, float(v)) for v in weights.values())
-    if s <= 0:
-        n = max(1, len(weights))
-        return {k: 1.0 / n for k in weights}
-    return {k: float(max(0.0, float(v)) / s) for k, v in weights.items()}
-
-
 def aggregate_signal(
     probs_by_tf: Dict[str, Dict[str, float]],
     base_tf: str,
@@ -38,43 +31,22 @@ def aggregate_signal(
     lookback_scores: List[float] | None = None,
 ) -> Dict:
     """
-    Агрегирует сигналы из нескольких ТФ в один общий.
+    Агрегирует сигналы из нескольких ТФ в один общий (обёртка над aggregate_signal_batch для одного бара).
     Возвращает: {score [-1..1], dir {-1,0,1}, confidence [0..1], support [0..1], per_tf: {tf: score_tf}}
     """
-    weights_cfg = weights_cfg or Config.HIERARCHY_WEIGHTS
-    usable = {tf: probs_by_tf[tf] for tf in probs_by_tf if tf in weights_cfg}
-    if not usable:
-        usable = probs_by_tf
-        weights = _normalize_weights({tf: 1.0 for tf in usable})
-    else:
-        weights = _normalize_weights({tf: weights_cfg[tf] for tf in usable})
-
-    per_tf_scores: Dict[str, float] = {tf: _tf_score_from_pb(pb) for tf, pb in usable.items()}
-    agg = float(sum(per_tf_scores[tf] * weights.get(tf, 0.0) for tf in per_tf_scores))
-
-    if lookback_scores:
-        lk = list(lookback_scores)[-Config.SIG_LOOKBACK:]
-        if lk:
-            agg = float(np.mean(lk + [agg]))
-
-    dir_sign = 0
-    if agg > 1e-9:
-        dir_sign = 1
-    elif agg < -1e-9:
-        dir_sign = -1
-
-    if dir_sign == 0:
-        support = 0.0
-    else:
-        total_w = sum(weights.values()) or 1.0
-        agree_w = sum(weights.get(tf, 0.0) for tf, s in per_tf_scores.items() if np.sign(s) == dir_sign and abs(s) > 0)
-        support = float(agree_w / total_w)
-
-    confidence = abs(agg)
+    tfs = list(probs_by_tf)
+    m = {k: np.array([[float(probs_by_tf[tf].get(k, 0.0)) for tf in tfs]]) for k in ("buy", "hold", "sell")}
+    # SIG_LOOKBACK=0 с переданной историей — среднее по всей истории (как прежний срез [-0:])
+    lookback = (int(Config.SIG_LOOKBACK) or len(lookback_scores)) if lookback_scores else 0
+    out = aggregate_signal_batch(
+        m["buy"], m["hold"], m["sell"], weights_vector(tfs, weights_cfg),
+        lookback=lookback, history=lookback_scores,
+    )
+    per_tf = out["per_tf"][0]
     return {
-        "score": float(np.clip(agg, -1.0, 1.0)),
-        "dir": int(dir_sign),
-        "confidence": float(np.clip(confidence, 0.0, 1.0)),
-        "support": float(np.clip(support, 0.0, 1.0)),
-        "per_tf": per_tf_scores,
-    }
\ No newline at end of file
+        "score": float(out["score"][0]),
+        "dir": int(out["dir"][0]),
+        "confidence": float(out["confidence"][0]),
+        "support": float(out["support"][0]),
+        "per_tf": {tf: float(per_tf[j]) for j, tf in enumerate(tfs) if not np.isnan(per_tf[j])},
+    }
@@ -0,0 +1,145 @@
+from __future__ import annotations
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from config import Config
+
+# Матрицы вероятностей: buy/hold/sell формы (n_bars, n_tfs); NaN — у ТФ на этом баре ещё нет данных.
+# Столбец 0 — базовый ТФ, остальные — старшие.
+
+
+def weights_vector(tfs: Sequence[str], weights_cfg: Dict[str, float] | None = None) -> np.ndarray:
+    """Вектор весов по столбцам; NaN — ТФ не указан в HIERARCHY_WEIGHTS (как «неиспользуемый» в aggregate_signal)."""
+    weights_cfg = weights_cfg or Config.HIERARCHY_WEIGHTS
+    return np.array([float(weights_cfg[tf]) if tf in weights_cfg else np.nan for tf in tfs], dtype=float)
+
+
+def probs_matrix(precomp: Dict, base_tf: str, idx=None) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Матрицы (tfs, buy, hold, sell) из precompute для баров idx (по умолчанию — весь X_idx):
+    старшие ТФ берутся gather'ом по матрице выравнивания precompute (бар, закрытый к закрытию базового).
+    """
+    from precompute_pkg.align import gather_probs
+
+    X_idx = precomp["X_idx"]
+    rows = None if idx is None or idx is X_idx else X_idx.get_indexer(idx)
+    return gather_probs(precomp, base_tf, rows)
+
+
+def tf_scores_batch(buy: np.ndarray, hold: np.ndarray, sell: np.ndarray) -> np.ndarray:
+    """Скор каждого ТФ на каждом баре (см. _tf_score_from_pb); NaN сохраняется."""
+    s_hold = np.maximum(np.maximum(buy, sell) - hold, 0.0)
+    return np.clip((buy - sell) * s_hold, -1.0, 1.0)
+
+
+def _smooth(raw: np.ndarray, lookback: int, history: Sequence[float] | None = None) -> np.ndarray:
+    """
+    Скользящее среднее как в панели сигналов: score_i = mean(последние lookback сглаженных + raw_i).
+    Окно — по уже сглаженным значениям (рекурсия), поэтому не cumsum по raw; цикл по float, без словарей.
+    Сумма окна считается заново в том же порядке, что np.mean — значения совпадают побитово.
+    """
+    out = np.empty_like(raw)
+    win = [float(v) for v in (history or [])][-lookback:] if lookback > 0 else []
+    for i, r in enumerate(raw.tolist()):
+        v = (sum(win) + r) / (len(win) + 1) if win else r
+        out[i] = v
+        if lookback > 0:
+            win.append(v)
+            if len(win) > lookback:
+                del win[0]
+    return out
+
+
+def aggregate_signal_batch(
+    buy: np.ndarray,
+    hold: np.ndarray,
+    sell: np.ndarray,
+    weights: np.ndarray,
+    lookback: int = 0,
+    history: Sequence[float] | None = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Пакетный aggregate_signal: для n баров сразу.
+    weights — сырые веса по столбцам (NaN — ТФ вне конфигурации; если на баре таких нет — равные веса).
+    lookback > 0 — сглаживание скора (SIG_LOOKBACK), history — уже сглаженные скоры до первого бара.
+    Возвращает массивы: score, dir, confidence, support (n,) и per_tf (n, k).
+    """
+    per_tf = tf_scores_batch(buy, hold, sell)
+    avail = ~np.isnan(per_tf)
+    in_cfg = ~np.isnan(weights)
+    usable = avail & in_cfg
+    no_cfg = ~usable.any(axis=1)
+    usable[no_cfg] = avail[no_cfg]
+    w = np.where(usable, np.where(in_cfg, np.maximum(np.nan_to_num(weights), 0.0), 0.0), 0.0)
+    w[no_cfg] = usable[no_cfg].astype(float)
+    w_sum = w.sum(axis=1, keepdims=True)
+    # все веса нулевые — равные среди используемых
+    w = np.where(w_sum > 0, w / np.where(w_sum > 0, w_sum, 1.0), usable / np.maximum(usable.sum(axis=1, keepdims=True), 1))
+
+    s = np.where(usable, per_tf, 0.0)
+    agg = (s * w).sum(axis=1)
+    if lookback > 0:
+        agg = _smooth(agg, int(lookback), history)
+
+    dir_sign = np.where(agg > 1e-9, 1, np.where(agg < -1e-9, -1, 0))
+    agree = usable & (np.sign(s) == dir_sign[:, None]) & (np.abs(s) > 0)
+    total_w = w.sum(axis=1)
+    support = np.where(dir_sign != 0, (w * agree).sum(axis=1) / np.where(total_w > 0, total_w, 1.0), 0.0)
+    return {
+        "score": np.clip(agg, -1.0, 1.0),
+        "dir": dir_sign.astype(int),
+        "confidence": np.clip(np.abs(agg), 0.0, 1.0),
+        "support": np.clip(support, 0.0, 1.0),
+        "per_tf": np.where(usable, per_tf, np.nan),
+    }
+
+
+def _hold_margin(buy, hold, sell) -> np.ndarray:
+    return np.maximum(np.nan_to_num(buy), np.nan_to_num(sell)) - np.nan_to_num(hold)
+
+
+def entry_mask_batch(
+    agg: Dict[str, np.ndarray],
+    base_buy: np.ndarray,
+    base_hold: np.ndarray,
+    base_sell: np.ndarray,
+    entry_threshold: float | None = None,
+    min_support: float | None = None,
+    hold_margin_min: float | None = None,
+) -> np.ndarray:
+    """Пакетный decide_entry: булева маска ok по барам (направление — agg["dir"])."""
+    entry_threshold = float(entry_threshold if entry_threshold is not None else Config.SIG_ENTRY_THRESHOLD)
+    min_support = float(min_support if min_support is not None else Config.SIG_MIN_SUPPORT)
+    hold_margin_min = float(hold_margin_min if hold_margin_min is not None else Config.SIG_HOLD_MARGIN_MIN)
+    return ((np.abs(agg["score"]) >= entry_threshold) & (agg["support"] >= min_support)
+            & (_hold_margin(base_buy, base_hold, base_sell) >= hold_margin_min))
+
+
+def exit_mask_batch(
+    agg: Dict[str, np.ndarray],
+    open_dir,
+    base_buy: np.ndarray,
+    base_hold: np.ndarray,
+    base_sell: np.ndarray,
+    exit_threshold: float | None = None,
+    min_support: float | None = None,
+    hold_margin_min: float | None = None,
+    exit_on_flip: bool | None = None,
+) -> np.ndarray:
+    """Пакетный decide_exit: open_dir — число или массив направлений открытой позиции по барам."""
+    exit_threshold = float(exit_threshold if exit_threshold is not None else Config.SIG_EXIT_THRESHOLD)
+    min_support = float(min_support if min_support is not None else Config.SIG_MIN_SUPPORT)
+    hold_margin_min = float(hold_margin_min if hold_margin_min is not None else Config.SIG_HOLD_MARGIN_MIN)
+    exit_on_flip = bool(Config.EXIT_ON_FLIP if exit_on_flip is None else exit_on_flip)
+
+    open_dir = np.asarray(open_dir)
+    flip = (np.sign(agg["score"]) != np.sign(open_dir)) & (open_dir != 0)
+    weak = ((np.abs(agg["score"]) < exit_threshold) | (agg["support"] < min_support)
+            | (_hold_margin(base_buy, base_hold, base_sell) < hold_margin_min))
+    return (flip | weak) if exit_on_flip else weak
+
+
+def confirmed_higher_batch(buy: np.ndarray, sell: np.ndarray, base_dir: np.ndarray) -> np.ndarray:
+    """Пакетный consistent_support_count: сколько старших ТФ (столбцы 1..) согласны с направлением."""
+    s = np.sign(buy[:, 1:] - sell[:, 1:])
+    base_dir = np.asarray(base_dir)[:, None]
+    return ((s == base_dir) & (base_dir != 0)).sum(axis=1)
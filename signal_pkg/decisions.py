@@ -1,7 +1,15 @@
 from __future__ import annotations
 from typing import Dict, Tuple
 import numpy as np
-from config import Config
+from .batch import entry_mask_batch, exit_mask_batch
+
+
+def _agg1(agg: Dict) -> Dict[str, np.ndarray]:
+    return {"score": np.array([float(agg["score"])]), "support": np.array([float(agg["support"])])}
+
+
+def _pb1(base_pb: Dict[str, float]):
+    return tuple(np.array([float(base_pb.get(k, 0.0))]) for k in ("buy", "hold", "sell"))
 
 
 def decide_entry(
@@ -12,14 +20,9 @@ def decide_entry(
     hold_margin_min: float | None = None,
 ) -> Tuple[bool, int, float]:
     """
-    Правило входа. Возвращает (ok, dir, strength).
+    Правило входа (обёртка над entry_mask_batch). Возвращает (ok, dir, strength).
     """
-    entry_threshold = float(entry_threshold if entry_threshold is not None else Config.SIG_ENTRY_THRESHOLD)
-    min_support = float(min_support if min_support is not None else Config.SIG_MIN_SUPPORT)
-    hold_margin_min = float(hold_margin_min if hold_margin_min is not None else Config.SIG_HOLD_MARGIN_MIN)
-
-    margin_hold = max(float(base_pb.get("buy", 0.0)), float(base_pb.get("sell", 0.0))) - float(base_pb.get("hold", 0.0))
-    ok = (abs(agg["score"]) >= entry_threshold) and (agg["support"] >= min_support) and (margin_hold >= hold_margin_min)
+    ok = entry_mask_batch(_agg1(agg), *_pb1(base_pb), entry_threshold, min_support, hold_margin_min)[0]
     return bool(ok), int(agg["dir"]), float(abs(agg["score"]))
 
 
@@ -33,19 +36,6 @@ def decide_exit(
     exit_on_flip: bool | None = None,
 ) -> bool:
     """
-    Правило выхода.
+    Правило выхода (обёртка над exit_mask_batch).
     """
-    exit_threshold = float(exit_threshold if exit_threshold is not None else Config.SIG_EXIT_THRESHOLD)
-    min_support = float(min_support if min_support is not None else Config.SIG_MIN_SUPPORT)
-    hold_margin_min = float(hold_margin_min if hold_margin_min is not None else Config.SIG_HOLD_MARGIN_MIN)
-    exit_on_flip = bool(Config.EXIT_ON_FLIP if exit_on_flip is None else exit_on_flip)
-
-    margin_hold = max(float(base_pb.get("buy", 0.0)), float(base_pb.get("sell", 0.0))) - float(base_pb.get("hold", 0.0))
-    flip = (np.sign(agg["score"]) != np.sign(open_dir)) and (open_dir != 0)
-    weak = abs(agg["score"]) < exit_threshold
-    weak_sup = agg["support"] < min_support
-    hold_weak = margin_hold < hold_margin_min
-
-    if exit_on_flip and flip:
-        return True
-    return bool(weak or weak_sup or hold_weak)
\ No newline at end of file
+    return bool(exit_mask_batch(_agg1(agg), open_dir, *_pb1(base_pb), exit_threshold, min_support, hold_margin_min, exit_on_flip)[0])
@@ -3,6 +3,13 @@
   var AP = window.AnalysisPanels || (window.AnalysisPanels = {});
   if (!AP.makeChart) return;
 
+  // Колоночный формат панели ({format: 'columnar', time: [...], score: [...]}) -> массивы точек {time, value}
+  function normalizeSignalPanel(sp) {
+    if (!sp || sp.format !== 'columnar' || !Array.isArray(sp.time)) return sp;
+    const pts = key => (sp[key] || []).map((v, i) => ({ time: sp.time[i], value: v }));
+    return { score: pts('score'), support: pts('support'), dir: pts('dir'), entry: pts('entry'), thresholds: sp.thresholds };
+  }
+
   function buildActiveScoreSegments(sp) {
     const thr = (sp.thresholds && typeof sp.thresholds.entry === 'number') ? sp.thresholds.entry : 0.6;
     const minSup = (sp.thresholds && typeof sp.thresholds.min_support === 'number') ? sp.thresholds.min_support : 0.3;
@@ -20,6 +27,7 @@
   }
 
   function renderSignalPanel(wrap, sp, ctx, rootId = 'chart-root') {
+    sp = normalizeSignalPanel(sp);
     if (!sp || (!sp.score?.length && !sp.support?.length) || !AP.hasLC()) return;
     const section = AP.addPanel(wrap, 'AI Signal (score/support/entries)');
     const chart = AP.makeChart(section.div, 160);
@@ -61,6 +69,7 @@
   }
 
   // Экспорт
+  AP.normalizeSignalPanel = normalizeSignalPanel;
   AP.buildActiveScoreSegments = buildActiveScoreSegments;
   AP.renderSignalPanel = renderSignalPanel;
 })();
\ No newline at end of file
@@ -27,23 +27,27 @@ async function loadAccount(network, prefix) {
   }
 }
 
+function renderTrainingStatusSmall(job) {
+  const badge = document.getElementById("train_job_status");
+  const progressText = document.getElementById("train_job_progress");
+  if (!badge || !progressText) return;
+  if (job) {
+    const pct = Math.round((job.progress ?? 0) * 1000) / 10;
+    badge.className = "badge bg-warning text-dark";
+    badge.textContent = job.status === "queued" ? "в очереди" : `идёт: ${pct}%`;
+    progressText.textContent = `${pct}%`;
+  } else {
+    badge.className = "badge bg-secondary";
+    badge.textContent = "нет задачи";
+    progressText.textContent = "0%";
+  }
+}
+
 async function loadTrainingStatusSmall() {
+  if (TRAIN_SSE_OK) return;  // статус приходит по SSE (main.js)
   try {
     const js = await fetchJson("/api/training/active");
-    const job = js.data;
-    const badge = document.getElementById("train_job_status");
-    const progressText = document.getElementById("train_job_progress");
-    if (!badge || !progressText) return;
-    if (job) {
-      const pct = Math.round((job.progress ?? 0) * 1000) / 10;
-      badge.className = "badge bg-warning text-dark";
-      badge.textContent = job.status === "queued" ? "в очереди" : `идёт: ${pct}%`;
-      progressText.textContent = `${pct}%`;
-    } else {
-      badge.className = "badge bg-secondary";
-      badge.textContent = "нет задачи";
-      progressText.textContent = "0%";
-    }
+    renderTrainingStatusSmall(js.data);
   } catch (e) {
     // ignore
   }
@@ -183,6 +187,7 @@ function wireEvents() {
 
 async function initialLoad() {
   wireEvents();
+  if (typeof TRAIN_EVENTS !== "undefined") TRAIN_EVENTS.addEventListener("jobs", ev => renderTrainingStatusSmall(ev.detail));
   await Promise.all([
     loadAccount("mainnet", "mainnet"),
     loadAccount("testnet", "testnet"),
@@ -82,23 +82,63 @@ async function refreshProfilesMenu() {
   }
 }
 
+// ---- События обучения: один SSE-поток на страницу, страницы подписываются на TRAIN_EVENTS ----
+// "jobs" (detail: активное задание или null), "log" (detail: строка журнала), "reset" (пропуск событий — дочитать через REST)
+const TRAIN_EVENTS = new EventTarget();
+const TRAIN_JOBS = new Map();
+let TRAIN_SSE_OK = false;
+
+function activeTrainingJob() {
+  // как /api/training/active: сначала running, затем queued
+  const jobs = Array.from(TRAIN_JOBS.values());
+  const pick = st => jobs.filter(j => j.status === st).sort((a, b) => b.id - a.id)[0];
+  return pick("running") || pick("queued") || null;
+}
+
+function applyTrainingJobs(list) {
+  for (const j of list || []) TRAIN_JOBS.set(j.id, j);
+  TRAIN_EVENTS.dispatchEvent(new CustomEvent("jobs", { detail: activeTrainingJob() }));
+}
+
+function connectTrainingEvents() {
+  if (!window.EventSource) return;
+  const es = new EventSource("/api/training/active/stream");
+  const onSnapshot = ev => {
+    const d = JSON.parse(ev.data);
+    TRAIN_JOBS.clear();
+    applyTrainingJobs(d.jobs);
+    if (ev.type === "reset") TRAIN_EVENTS.dispatchEvent(new Event("reset"));
+  };
+  es.addEventListener("snapshot", onSnapshot);
+  es.addEventListener("reset", onSnapshot);
+  es.addEventListener("status", ev => applyTrainingJobs([JSON.parse(ev.data)]));
+  es.addEventListener("log", ev => TRAIN_EVENTS.dispatchEvent(new CustomEvent("log", { detail: JSON.parse(ev.data) })));
+  es.onopen = () => { TRAIN_SSE_OK = true; };
+  // при обрыве EventSource переподключается сам (с Last-Event-ID); CLOSED — поток недоступен, работаем опросом
+  es.onerror = () => { if (es.readyState === EventSource.CLOSED) TRAIN_SSE_OK = false; };
+}
+
+function renderTrainingStatus(job) {
+  const el = document.getElementById("train_job_status");
+  if (!el) return;
+  if (job) {
+    const pct = Math.round((job.progress ?? 0) * 100);
+    el.className = "badge bg-warning text-dark";
+    el.textContent = job.status === "queued" ? "в очереди" : `идёт: ${pct}%`;
+    const tfs = (job.timeframes || []).join(", ");
+    el.title = `${job.symbol || ""} [${tfs}] ${job.message || ""}`;
+  } else {
+    el.className = "badge bg-secondary";
+    el.textContent = "нет задачи";
+    el.title = "";
+  }
+}
+
 async function loadTrainingStatus() {
+  if (TRAIN_SSE_OK) return;  // статус приходит по SSE
   try {
     const js = await fetchJson("/api/training/active");
-    const job = js.data;
-    const el = document.getElementById("train_job_status");
-    if (!el) return;
-    if (job) {
-      const pct = Math.round((job.progress ?? 0) * 100);
-      el.className = "badge bg-warning text-dark";
-      el.textContent = job.status === "queued" ? "в очереди" : `идёт: ${pct}%`;
-      const tfs = (job.timeframes || []).join(", ");
-      el.title = `${job.symbol} [${tfs}] ${job.message || ""}`;
-    } else {
-      el.className = "badge bg-secondary";
-      el.textContent = "нет задачи";
-      el.title = "";
-    }
+    renderTrainingStatus(js.data);
   } catch (e) {
     console.error("loadTrainingStatus", e);
   }
@@ -106,6 +146,8 @@ async function loadTrainingStatus() {
 
 window.addEventListener("load", () => {
   refreshProfilesMenu();
+  TRAIN_EVENTS.addEventListener("jobs", ev => renderTrainingStatus(ev.detail));
+  connectTrainingEvents();
   loadTrainingStatus();
   setInterval(loadTrainingStatus, 10000);
 });
\ No newline at end of file
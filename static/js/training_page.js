@@ -37,6 +37,46 @@ let ACTIVE_JOB_ID = null;
 let LAST_LOG_ID = null;
 let POLL_TIMER = null;
 let LAST_LOG_TS = 0;
+// строки журнала из SSE по заданиям (буфер шины переигрывается при подключении)
+const SSE_LOGS = new Map();
+
+function logLine(r) {
+  return `[${r.ts}] ${r.level} ${r.phase}: ${r.message}`;
+}
+
+function appendLogText(text) {
+  const pre = document.getElementById("train_logs");
+  if (!pre) return;
+  pre.textContent += text;
+  LAST_LOG_TS = Date.now();
+  pre.scrollTop = pre.scrollHeight;
+}
+
+function showJob(job) {
+  setJobBadge(job);
+  if (!job) return;
+  setProgress(job.progress || 0);
+  if (job.id !== ACTIVE_JOB_ID) {
+    // сменилось активное задание — показываем его журнал из буфера SSE
+    ACTIVE_JOB_ID = job.id;
+    const pre = document.getElementById("train_logs");
+    if (pre) pre.textContent = "";
+    const rows = SSE_LOGS.get(job.id) || [];
+    if (rows.length) appendLogText(rows.map(logLine).join("\n") + "\n");
+  }
+}
+
+function watchdog() {
+  // если 30 сек не приходят новые логи
+  const now = Date.now();
+  if (ACTIVE_JOB_ID && now - LAST_LOG_TS > 30000) {
+    const pre = document.getElementById("train_logs");
+    if (pre && !pre.textContent.endsWith("\n[watchdog] нет новых логов >30s\n")) {
+      pre.textContent += "\n[watchdog] нет новых логов >30s\n";
+      pre.scrollTop = pre.scrollHeight;
+    }
+  }
+}
 
 async function refreshActive() {
   try {
@@ -48,15 +88,6 @@ async function refreshActive() {
       setProgress(job.progress || 0);
       await pullLogs(job.id);
     }
-    // watchdog: если 30 сек не приходят новые логи
-    const now = Date.now();
-    if (ACTIVE_JOB_ID && now - LAST_LOG_TS > 30000) {
-      const pre = document.getElementById("train_logs");
-      if (pre && !pre.textContent.endsWith("\n[watchdog] нет новых логов >30s\n")) {
-        pre.textContent += "\n[watchdog] нет новых логов >30s\n";
-        pre.scrollTop = pre.scrollHeight;
-      }
-    }
   } catch (e) { /* noop */ }
 }
 
@@ -66,16 +97,40 @@ async function pullLogs(jobId) {
     const js = await fetchJson(q);
     const rows = js.data || [];
     if (rows.length) {
-      const pre = document.getElementById("train_logs");
-      const buf = rows.map(r => `[${r.ts}] ${r.level} ${r.phase}: ${r.message}`).join("\n") + "\n";
-      pre.textContent += buf;
+      appendLogText(rows.map(logLine).join("\n") + "\n");
       LAST_LOG_ID = rows[rows.length - 1].id;
-      LAST_LOG_TS = Date.now();
-      pre.scrollTop = pre.scrollHeight;
     }
   } catch (e) { /* noop */ }
 }
 
+function onPollTick() {
+  // опрос REST — только если SSE-поток недоступен
+  if (typeof TRAIN_SSE_OK === "undefined" || !TRAIN_SSE_OK) refreshActive();
+  watchdog();
+}
+
+function wireTrainingEvents() {
+  if (typeof TRAIN_EVENTS === "undefined") return;
+  TRAIN_EVENTS.addEventListener("jobs", ev => showJob(ev.detail));
+  TRAIN_EVENTS.addEventListener("log", ev => {
+    const r = ev.detail;
+    const rows = SSE_LOGS.get(r.job_id) || [];
+    rows.push(r);
+    if (rows.length > 2000) rows.shift();
+    SSE_LOGS.set(r.job_id, rows);
+    if (ACTIVE_JOB_ID === null) ACTIVE_JOB_ID = r.job_id;
+    if (r.job_id === ACTIVE_JOB_ID) appendLogText(logLine(r) + "\n");
+  });
+  TRAIN_EVENTS.addEventListener("reset", () => {
+    // часть событий пропущена — перечитываем журнал активного задания через REST
+    SSE_LOGS.clear();
+    LAST_LOG_ID = null;
+    const pre = document.getElementById("train_logs");
+    if (pre) pre.textContent = "";
+    if (ACTIVE_JOB_ID) pullLogs(ACTIVE_JOB_ID);
+  });
+}
+
 async function startTrain() {
   const symbol = document.getElementById("tr_symbol").value.trim();
   const mode = document.getElementById("tr_mode").value;
@@ -94,9 +149,11 @@ async function startTrain() {
     LAST_LOG_TS = 0;
     const pre = document.getElementById("train_logs");
     if (pre) pre.textContent = "";
-    await refreshActive();
+    const rows = SSE_LOGS.get(ACTIVE_JOB_ID) || [];
+    if (rows.length) appendLogText(rows.map(logLine).join("\n") + "\n");
+    if (typeof TRAIN_SSE_OK === "undefined" || !TRAIN_SSE_OK) await refreshActive();
     if (POLL_TIMER) clearInterval(POLL_TIMER);
-    POLL_TIMER = setInterval(refreshActive, 2000);
+    POLL_TIMER = setInterval(onPollTick, 2000);
   } catch (e) {
     alert("Ошибка запуска: " + e.message);
   }
@@ -105,6 +162,7 @@ async function startTrain() {
 window.addEventListener("load", () => {
   document.getElementById("btn_train_start")?.addEventListener("click", startTrain);
   document.getElementById("btn_train_refresh")?.addEventListener("click", refreshActive);
-  refreshActive();
-  POLL_TIMER = setInterval(refreshActive, 4000);
+  wireTrainingEvents();
+  if (typeof TRAIN_EVENTS === "undefined") refreshActive();
+  POLL_TIMER = setInterval(onPollTick, 4000);
 });
\ No newline at end of file
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# модули проекта импортируются из корня репозитория (как при запуске app.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def ohlcv():
+    """Фабрика синтетических свечей: ohlcv(n, freq="1h", seed=0) -> DataFrame с индексом open_time."""
+    def make(n: int, freq: str = "1h", seed: int = 0, end: str = "2026-10-19") -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        idx = pd.date_range(end=pd.Timestamp(end), periods=n, freq=freq, name="open_time")
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+        return pd.DataFrame({"open": close * (1 + rng.normal(0, 0.002, n)), "high": close * 1.01, "low": close * 0.99,
+                             "close": close, "volume": rng.uniform(1, 10, n)}, index=idx)
+    return make
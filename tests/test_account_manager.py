@@ -0,0 +1,68 @@
+"""AccountManager: список опрашиваемых сетей ограничен, внеочередной опрос во время прохода не теряется."""
+import threading
+import time
+from types import SimpleNamespace
+
+from flask import Blueprint, Flask
+
+from account_manager import AccountManager
+from api_pkg.routes import common
+
+
+class _Pool:
+    def get(self, network, api_key=None, api_secret=None, with_markets=True):
+        return SimpleNamespace(fetch_balance=lambda: {"total": {"USDT": 1.0}})
+
+
+class _DB:
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+
+    def load_api_keys(self, network):
+        self.calls.append(network)
+        if len(self.calls) == 1:
+            self.gate.wait(5)  # первый проход «висит», пока тест не запросит refresh
+        return {"api_key": "k", "api_secret": "s"}
+
+    def get_trades_summary(self, network):
+        return {"open_count": 0, "closed_count": 0, "total_pnl_percent": 0.0}
+
+
+def test_unknown_network_is_not_polled():
+    am = AccountManager(_DB(), pool=_Pool())
+    before = list(am.networks)
+    assert am.request_refresh("evil") is False
+    assert am.get_balance_snapshot("x" * 50)["error"] == "unknown_network"
+    assert am.networks == before
+
+
+def test_refresh_during_poll_pass_is_not_lost():
+    db = _DB()
+    am = AccountManager(db, pool=_Pool())
+    am.networks, am.poll_sec = ["testnet"], 60.0
+    am.start_poller()
+    try:
+        deadline = time.time() + 5
+        while not db.calls and time.time() < deadline:
+            time.sleep(0.01)
+        am.request_refresh("testnet")  # приходит посреди прохода
+        db.gate.set()
+        while len(db.calls) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(db.calls) >= 2
+    finally:
+        am.stop_poller()
+
+
+def test_account_route_rejects_unknown_network():
+    app = Flask(__name__)
+    bp = Blueprint("api", __name__)
+    common.register(bp)
+    app.register_blueprint(bp, url_prefix="/api")
+    am = AccountManager(_DB(), pool=_Pool())
+    app.extensions["services"] = SimpleNamespace(accounts=am, db=_DB())
+    client = app.test_client()
+    assert client.get("/api/account?network=foo").status_code == 400
+    assert client.get("/api/account?network=testnet").status_code == 200
+    assert "foo" not in am.networks
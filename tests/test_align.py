@@ -0,0 +1,48 @@
+"""Выравнивание ТФ по закрытию бара (precompute_pkg.align): без заглядывания в будущее, дозапись хвоста."""
+import numpy as np
+import pandas as pd
+
+from precompute_pkg.align import asof_positions, build_alignment, ensure_alignment
+
+
+def _idx(start, n, freq):
+    return pd.date_range(pd.Timestamp(start), periods=n, freq=freq)
+
+
+def test_higher_bar_visible_only_after_its_close():
+    base = _idx("2026-01-01 00:00", 10, "1h")
+    h4 = _idx("2026-01-01 00:00", 3, "4h")
+    pos = asof_positions(base, "1h", h4, "4h")
+    # бар 4h 00:00 закрывается в 04:00 — его видит только базовый бар 03:00 (закрытие 04:00) и позже
+    assert pos.tolist() == [-1, -1, -1, 0, 0, 0, 0, 1, 1, 1]
+
+
+def test_lower_tf_maps_to_bar_closing_with_base():
+    base = _idx("2026-01-01 00:00", 3, "4h")
+    h1 = _idx("2026-01-01 00:00", 12, "1h")
+    pos = asof_positions(base, "4h", h1, "1h")
+    assert [h1[p] for p in pos] == [pd.Timestamp("2026-01-01 03:00"), pd.Timestamp("2026-01-01 07:00"),
+                                    pd.Timestamp("2026-01-01 11:00")]
+
+
+def _precomp(n_base):
+    return {"X_idx": _idx("2026-01-01 00:00", n_base, "1h"),
+            "higher": {"4h": {"idx": _idx("2026-01-01 00:00", 60, "4h")}, "1d": {"idx": _idx("2026-01-01", 12, "1D")}}}
+
+
+def test_ensure_alignment_extends_tail_like_full_rebuild():
+    pre = _precomp(100)
+    first = ensure_alignment(pre, "1h")["pos"]
+    pre["X_idx"] = _idx("2026-01-01 00:00", 180, "1h")
+    grown = ensure_alignment(pre, "1h")
+    np.testing.assert_array_equal(grown["pos"][:100], first)
+    np.testing.assert_array_equal(grown["pos"], build_alignment(_precomp(180), "1h")["pos"])
+
+
+def test_ensure_alignment_rebuilds_when_index_shrinks():
+    pre = _precomp(180)
+    ensure_alignment(pre, "1h")
+    pre["X_idx"] = pre["X_idx"][:50]
+    al = ensure_alignment(pre, "1h")
+    assert len(al["pos"]) == 50
+    np.testing.assert_array_equal(al["pos"], build_alignment(_precomp(50), "1h")["pos"])
@@ -0,0 +1,92 @@
+"""Компактный артефакт модели: round-trip без pickle, фолбэк на pickle, обратное преобразование в sklearn."""
+import io
+import json
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from database import DatabaseManager
+from db_pkg import models_store
+from model_pkg.artifact import CompactLogReg, CompactScaler, pack_bundle, to_sklearn, unpack_bundle
+
+RNG = np.random.default_rng(0)
+X0, X1 = RNG.normal(0, 1, (400, 5)), RNG.normal(0.5, 2, (150, 5))
+
+
+def _bundle(classes=(-1, 0, 1)):
+    y = RNG.choice(classes, len(X0))
+    scaler = StandardScaler().fit(X0)
+    clf = LogisticRegression(C=0.3, max_iter=500).fit(scaler.transform(X0), y)
+    return {"model": clf, "scaler": scaler, "feature_names": [f"f{i}" for i in range(5)],
+            "features_settings": {"label_horizon": 2}, "meta": {"n_samples": 400}}
+
+
+@pytest.mark.parametrize("classes", [(-1, 0, 1), (-1, 1)])
+def test_round_trip_matches_sklearn(classes):
+    b = _bundle(classes)
+    blob = pack_bundle(b, extra={"classes_saved": [-1, 0, 1]})
+    with np.load(io.BytesIO(blob), allow_pickle=False) as z:  # без pickle внутри
+        assert sorted(z.files) == ["classes", "linear", "meta_json", "scaler"]
+    got = unpack_bundle(blob)
+    assert isinstance(got["model"], CompactLogReg) and isinstance(got["scaler"], CompactScaler)
+    probe = RNG.normal(0, 1.5, (50, 5))
+    want = b["model"].predict_proba(b["scaler"].transform(probe))
+    np.testing.assert_allclose(got["model"].predict_proba(got["scaler"].transform(probe)), want, rtol=1e-12, atol=1e-12)
+    assert list(got["model"].classes_) == list(classes) and got["model"].C == 0.3
+    assert got["feature_names"] == b["feature_names"] and got["features_settings"] == {"label_horizon": 2}
+    assert got["meta"] == {"n_samples": 400} and got["artifact"] == {"version": 1, "kind": "logreg", "classes_saved": [-1, 0, 1]}
+    with pytest.raises(ValueError):
+        got["scaler"].transform(probe[:, :4])
+
+
+def test_newer_artifact_version_is_rejected():
+    blob = pack_bundle(_bundle())
+    with np.load(io.BytesIO(blob)) as z:
+        arrays = {k: z[k] for k in z.files}
+    meta = json.loads(bytes(arrays["meta_json"]).decode("utf-8"))
+    arrays["meta_json"] = np.frombuffer(json.dumps({**meta, "version": 99}).encode("utf-8"), dtype=np.uint8)
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    with pytest.raises(ValueError):
+        unpack_bundle(buf.getvalue())
+
+
+def test_pickle_fallback(tmp_path, monkeypatch):
+    db = DatabaseManager(str(tmp_path / "a.db"))
+    rf = RandomForestClassifier(n_estimators=5, random_state=0).fit(X0, RNG.integers(-1, 2, len(X0)))
+    assert pack_bundle({"model": rf, "scaler": None}) is None
+    forest = db.save_model("BTC/USDT", "1h", "rf", {"model": rf, "scaler": None}, [-1, 0, 1], [])
+    got = db.load_model("BTC/USDT", "1h")
+    assert isinstance(got["model"]["model"], RandomForestClassifier) and got["classes"] == [-1, 0, 1]
+    np.testing.assert_array_equal(got["model"]["model"].predict(X1), rf.predict(X1))
+    # MODEL_STORE_PICKLE — рядом с артефактом ещё и pickle (для старых версий приложения); читается артефакт
+    monkeypatch.setattr(models_store.Config, "MODEL_STORE_PICKLE", True, raising=False)
+    with_pickle = db.save_model("BTC/USDT", "4h", "logreg_v1", _bundle(), [-1, 0, 1], [])
+    monkeypatch.setattr(models_store.Config, "MODEL_STORE_PICKLE", False, raising=False)
+    compact = db.save_model("BTC/USDT", "4h", "logreg_v1", _bundle(), [-1, 0, 1], [])
+    conn = db._conn()
+    blobs = dict(conn.execute("SELECT id, model_blob IS NOT NULL FROM model_versions").fetchall())
+    conn.close()
+    assert blobs == {forest: 1, with_pickle: 1, compact: 0}
+    for v in (with_pickle, compact):
+        assert isinstance(db.load_model("BTC/USDT", "4h", version=v)["model"]["model"], CompactLogReg)
+
+
+def test_to_sklearn_continues_scaler_and_model():
+    b = _bundle()
+    back = to_sklearn(unpack_bundle(pack_bundle(b)))
+    clf, scaler = back["model"], back["scaler"]
+    assert isinstance(clf, LogisticRegression) and isinstance(scaler, StandardScaler)
+    probe = RNG.normal(0, 1, (30, 5))
+    np.testing.assert_allclose(clf.predict_proba(scaler.transform(probe)),
+                               b["model"].predict_proba(b["scaler"].transform(probe)), rtol=1e-12, atol=1e-12)
+    np.testing.assert_array_equal(clf.predict(scaler.transform(probe)), b["model"].predict(b["scaler"].transform(probe)))
+    # partial_fit продолжает статистику скейлера так же, как обучение на всех строках сразу
+    scaler.partial_fit(X1)
+    full = StandardScaler().fit(np.vstack([X0, X1]))
+    np.testing.assert_allclose(scaler.mean_, full.mean_, rtol=1e-10)
+    np.testing.assert_allclose(scaler.var_, full.var_, rtol=1e-10)
+    assert to_sklearn(b) is b  # sklearn-объекты — как есть
@@ -0,0 +1,63 @@
+"""backtest_metrics: позиция через разностный массив и доходность бара выхода против побарового эталона."""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_pkg.metrics import _PF_CAP, backtest_metrics, objective_score
+
+_BARS = pd.date_range("2026-01-01", periods=6, freq="1h")
+_CLOSE = np.array([100.0, 102.0, 101.0, 105.0, 104.0, 110.0])
+
+
+def _reference(bars, close, trades):
+    """Побаровый эталон: позиция на (entry, exit], на баре выхода — до цены выхода."""
+    n = len(bars)
+    r, pos = np.zeros(n), np.zeros(n)
+    for ent, ext, s, px in trades:
+        for i in range(ent + 1, ext + 1):
+            pos[i] += s
+            r[i] = s * ((px if i == ext else close[i]) / close[i - 1] - 1.0)
+    return r, pos
+
+
+def test_back_to_back_trades_and_exit_outside_window():
+    # BUY 0->2 (выход 101.5 по SL/TP), SELL 2->4 (вход на баре выхода предыдущей), BUY 4->за окном (n-1)
+    entry = np.array([_BARS[0], _BARS[2], _BARS[4]], dtype="datetime64[ns]")
+    exit_ = np.array([_BARS[2], _BARS[4], pd.Timestamp("2026-02-01")], dtype="datetime64[ns]")
+    side = np.array(["BUY", "SELL", "BUY"])
+    px = np.array([101.5, 103.0, 110.0])
+    pnl = np.array([1.5, (105.0 / 103.0 - 1) * 100, (110.0 / 104.0 - 1) * 100])
+    stats, equity = backtest_metrics(_BARS, _CLOSE, entry, exit_, side, px, pnl, "1h")
+
+    r, pos = _reference(_BARS, _CLOSE, [(0, 2, 1.0, 101.5), (2, 4, -1.0, 103.0), (4, 5, 1.0, 110.0)])
+    np.testing.assert_allclose(equity, np.cumprod(1.0 + r))
+    assert stats["return_pct"] == pytest.approx((np.prod(1.0 + r) - 1.0) * 100.0)
+    assert stats["exposure"] == pytest.approx(np.count_nonzero(pos) / 6 * 100.0)
+    eq = np.cumprod(1.0 + r)
+    assert stats["max_drawdown"] == pytest.approx(np.max(1.0 - eq / np.maximum.accumulate(eq)) * 100.0)
+    ann = math.sqrt(365 * 24)
+    assert stats["sharpe"] == pytest.approx(r.mean() / r.std(ddof=1) * ann)
+    assert stats["sortino"] == pytest.approx(r.mean() / math.sqrt(np.mean(np.minimum(r, 0.0) ** 2)) * ann)
+    assert stats["count"] == 3 and stats["winrate"] == 100.0 and stats["profit_factor"] == _PF_CAP
+
+
+def test_profit_factor_without_losses_is_capped():
+    t = np.array([_BARS[0]], dtype="datetime64[ns]")
+    e = np.array([_BARS[1]], dtype="datetime64[ns]")
+    stats, _ = backtest_metrics(_BARS, _CLOSE, t, e, np.array(["BUY"]), np.array([102.0]), np.array([2.0]), "1h")
+    assert stats["profit_factor"] == _PF_CAP
+    empty = np.array([], dtype="datetime64[ns]")
+    stats0, eq0 = backtest_metrics(_BARS, _CLOSE, empty, empty, np.array([]), np.array([]), np.array([]), "1h")
+    assert stats0["count"] == 0 and stats0["profit_factor"] == 0.0 and stats0["return_pct"] == 0.0
+    np.testing.assert_allclose(eq0, np.ones(6))
+
+
+def test_objective_score_zero_trades():
+    stats0 = {"count": 0, "winrate": 0.0, "sharpe": 0.0, "max_drawdown": 0.0}
+    assert objective_score(stats0, "sharpe") is None
+    assert objective_score(stats0, "max_drawdown") is None  # нулевая просадка без сделок — не «лучшая»
+    assert objective_score(stats0, "winrate") == 0.0
+    assert objective_score({"count": 3, "max_drawdown": 5.0}, "max_drawdown") == -5.0
+    assert objective_score({"count": 3}, "unknown") is None
@@ -0,0 +1,44 @@
+"""run_backtest: кэш результатов по последнему бару предрасчёта."""
+import numpy as np
+
+from backtest_pkg import runner
+from backtest_pkg.cache import BacktestCache
+
+
+class _DB:
+    def __init__(self, df):
+        self.df = df
+
+    def load_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        return self.df
+
+
+def _precomp(df):
+    n = len(df)
+    # уверенный BUY на всех барах: сделка открывается сразу и (без SL/TP) висит до конца окна
+    return {"X_idx": df.index, "df_use": df, "versions": {"1h": 1}, "higher": {},
+            "base": {"pb_buy": np.full(n, 0.9), "pb_hold": np.full(n, 0.05), "pb_sell": np.full(n, 0.05)}}
+
+
+def _run(db, pre):
+    return runner.run_backtest(db, None, "BTC/USDT", "1h", 300, 0.5, 0.0, 0, 1000.0, 1000.0, 100000, precompute=pre)
+
+
+def test_precompute_behind_db_is_cut_to_its_last_bar(ohlcv, monkeypatch):
+    df = ohlcv(700)
+    newer = df.copy()
+    newer.iloc[-1, newer.columns.get_loc("close")] *= 1.5  # бар, которого предрасчёт ещё не видел
+    pre = _precomp(df.iloc[:-1])
+
+    monkeypatch.setattr(runner.Config, "BACKTEST_CACHE_ENABLED", False, raising=False)
+    ref = _run(_DB(df.iloc[:-1]), pre)
+    got = _run(_DB(newer), pre)
+    assert got["trades"] == ref["trades"]
+    assert got["trades"][-1]["exit_time"] == df.index[-2].isoformat()
+
+    cache = BacktestCache()
+    monkeypatch.setattr(runner.Config, "BACKTEST_CACHE_ENABLED", True, raising=False)
+    monkeypatch.setattr(runner, "get_backtest_cache", lambda: cache)
+    assert _run(_DB(newer), pre)["trades"] == ref["trades"]
+    assert _run(_DB(df.iloc[:-1]), pre)["trades"] == ref["trades"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["puts"] == 1
@@ -0,0 +1,61 @@
+"""Потоковый бэктест чанками совпадает с одним окном simulate_trades (сделки переживают границы чанков)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_pkg import streaming
+from backtest_pkg.trader import simulate_trades
+from database import DatabaseManager
+
+N = 3000
+PARAMS = dict(signal_threshold=0.3, hold_margin=0.0, min_confirmed_higher=0, sl_atr_mult=3.0, tp_atr_mult=6.0,
+              max_bars_in_trade=400)
+
+
+def _probs(df):
+    # детерминированные «вероятности» по свече, без зависимости от окна (как модель с закэшированными признаками)
+    p = 0.5 + 0.5 * np.tanh((df["close"].to_numpy() / df["open"].to_numpy() - 1.0) * 1000.0)
+    buy, sell = 0.05 + 0.9 * p, 0.95 - 0.9 * p
+    hold = np.full(len(df), 0.05)
+    s = buy + sell + hold
+    return {"pb_buy": buy / s, "pb_hold": hold / s, "pb_sell": sell / s, "idx": df.index}
+
+
+@pytest.fixture
+def db(tmp_path, ohlcv, monkeypatch):
+    d = DatabaseManager(str(tmp_path / "s.db"))
+    d.upsert_ohlcv("BTC/USDT", "1h", ohlcv(N, "1h", seed=1))
+    d.upsert_ohlcv("BTC/USDT", "4h", ohlcv(N // 4 + 10, "4h", seed=2))
+    monkeypatch.setattr(streaming.Config, "TIMEFRAMES", ["1h", "4h"], raising=False)
+    monkeypatch.setattr(streaming, "_extract_model_bundle", lambda db, models, s, tf: {"model": "stub", "version": 1})
+    monkeypatch.setattr(streaming, "score_frame", lambda db, s, tf, bundle, df: _probs(df))
+    return d
+
+
+def _reference(db):
+    df = db.load_ohlcv("BTC/USDT", "1h", since=None, limit=None)
+    h4 = db.load_ohlcv("BTC/USDT", "4h", since=None, limit=None)
+    base = _probs(df)
+    precomp = {"X_idx": df.index, "base": base, "higher": {"4h": _probs(h4)}}
+    trades, _m, stats, _eq = simulate_trades(
+        df=df, precomp=precomp, symbol="BTC/USDT", timeframe="1h", limit=len(df), entry_threshold=PARAMS["signal_threshold"],
+        min_support=float(getattr(streaming.Config, "SIG_MIN_SUPPORT", 0.3)), hold_margin_min=PARAMS["hold_margin"],
+        min_confirmed_higher=0, sl_atr_mult=PARAMS["sl_atr_mult"], tp_atr_mult=PARAMS["tp_atr_mult"],
+        max_bars_in_trade=PARAMS["max_bars_in_trade"])
+    return df, trades
+
+
+@pytest.mark.parametrize("chunk", [777, 1000, N])
+def test_chunks_equal_single_window(db, chunk):
+    df, ref = _reference(db)
+    assert len(ref) > 5
+    res = streaming.run_backtest_streaming(db, None, "BTC/USDT", "1h", **PARAMS, chunk=chunk, keep_trades=100000)
+    assert res["ok"] and res["bars"] == N and res["chunks"] == -(-N // chunk)
+    assert res["trades"] == ref
+    assert res["stats"]["count"] == len(ref)
+    assert res["stats"]["pnl_sum"] == pytest.approx(sum(t["pnl_percent"] for t in ref))
+    # хотя бы одна сделка открыта до границы чанка и закрыта после неё
+    bounds = [df.index[k] for k in range(chunk, N, chunk)]
+    crossing = [t for t in ref for b in bounds
+                if pd.Timestamp(t["entry_time"]) < b <= pd.Timestamp(t["exit_time"])]
+    assert crossing or chunk == N
@@ -0,0 +1,59 @@
+"""Поиск C: только по строкам до первого тестового блока walk-forward; кэш, видевший более поздние строки, не годится."""
+import numpy as np
+
+import features_pkg.cache as fcache
+from database import DatabaseManager
+from model_pkg import cpath, trainers
+from model_pkg.validation import purged_walk_forward_splits
+
+
+def test_c_searched_before_first_wf_block(tmp_path, ohlcv, monkeypatch):
+    monkeypatch.setattr(fcache, "_DEFAULT", fcache.FeatureCache(str(tmp_path / "fc")))
+    for k, v in {"LR_C_SEARCH": True, "LR_C_GRID": [10.0, 1.0, 0.1], "WF_FOLDS": 3, "WF_MIN_TRAIN": 200}.items():
+        monkeypatch.setattr(cpath.Config, k, v, raising=False)
+    db = DatabaseManager(str(tmp_path / "c.db"))
+    db.upsert_ohlcv("BTC/USDT", "1h", ohlcv(1500, "1h", seed=8))
+    seen = {}
+    real_search = cpath.c_path_search
+
+    def spy_search(X, y, **kw):
+        seen["search_rows"] = len(y)
+        return real_search(X, y, **kw)
+
+    def spy_wf(X, y, **kw):
+        seen["wf"] = (X, y, kw)
+        return {}
+
+    monkeypatch.setattr(cpath, "c_path_search", spy_search)
+    monkeypatch.setattr(trainers, "walk_forward_validate", spy_wf)
+    trainer = trainers.Trainer(db)
+    res = trainer._train_one_tf("BTC/USDT", "1h", 0, None, "full")
+
+    X_lab, y_lab, kw = seen["wf"]
+    splits = purged_walk_forward_splits(len(y_lab), 3, kw["purge"], 200)
+    c_end = splits[0][0]
+    assert seen["search_rows"] == c_end and res.meta["C"] in (10.0, 1.0, 0.1)
+    metrics = db.load_model("BTC/USDT", "1h")["metrics"]
+    assert metrics["C_rows"] == c_end and metrics["C_source"] == "search" and kw["C"] == res.meta["C"]
+    Xc, _y, _r = trainer._build_xy("BTC/USDT", db.load_ohlcv("BTC/USDT", "1h"), "1h", {"label_horizon": 1})
+    cached = db.get_setting("lr_c:BTC/USDT:1h")
+    assert cached["until"] == str(Xc.index[c_end - 1]) and Xc.index[c_end - 1] < Xc.index[splits[0][1]]
+    # тот же срез — C из кэша, без нового поиска
+    seen.clear()
+    trainer._train_one_tf("BTC/USDT", "1h", 0, None, "full")
+    assert "search_rows" not in seen and db.load_model("BTC/USDT", "1h")["metrics"]["C_source"] == "cache"
+
+
+def test_cache_that_saw_later_rows_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(cpath.Config, "LR_C_SEARCH", True, raising=False)
+    monkeypatch.setattr(cpath.Config, "LR_C_GRID", [1.0, 0.1], raising=False)
+    db = DatabaseManager(str(tmp_path / "c.db"))
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(600, 3)), rng.integers(-1, 2, 600)
+    first = cpath.select_c(db, "BTC/USDT", "1h", X, y, purge=1, until="2026-05-01 00:00:00")
+    assert first["source"] == "search"
+    assert cpath.select_c(db, "BTC/USDT", "1h", X, y, purge=1, until="2026-06-01 00:00:00")["source"] == "cache"
+    # более ранний срез (например, меньше лет истории) — кэш видел его тестовые строки
+    assert cpath.select_c(db, "BTC/USDT", "1h", X[:500], y[:500], purge=1, until="2026-04-01 00:00:00")["source"] == "search"
+    monkeypatch.setattr(cpath.Config, "LR_C_GRID", [1.0, 0.01], raising=False)
+    assert cpath.select_c(db, "BTC/USDT", "1h", X, y, purge=1, until="2026-06-01 00:00:00")["source"] == "search"
@@ -0,0 +1,110 @@
+"""ExchangePool/MarketsCache со стабом ccxt-биржи: ленивое создание, рынки из кэша, истечение TTL."""
+import os
+import time
+
+import ccxt
+
+from account_manager import AccountManager
+from data_pkg.exchange_pool import ExchangePool, MarketsCache
+
+_MARKETS = {"BTC/USDT": {"id": "BTCUSDT", "symbol": "BTC/USDT", "base": "BTC", "quote": "USDT"}}
+
+
+class _StubExchange:
+    """Стаб ccxt-биржи: считает создания и загрузки рынков, сети не трогает."""
+    created = []
+
+    def __init__(self, params):
+        self.params = params
+        self.sandbox = False
+        self.markets = None
+        self.currencies = None
+        self.load_calls = 0
+        self.set_calls = 0
+        _StubExchange.created.append(self)
+
+    def set_sandbox_mode(self, on):
+        self.sandbox = bool(on)
+
+    def load_markets(self):
+        self.load_calls += 1
+        self.markets, self.currencies = dict(_MARKETS), {"USDT": {"id": "USDT"}}
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.set_calls += 1
+        self.markets, self.currencies = markets, currencies
+
+    def fetch_balance(self):
+        return {"total": {"USDT": 12.5}, "free": {}}
+
+
+def _pool(monkeypatch, tmp_path, ttl=3600.0):
+    monkeypatch.setattr(ccxt, "stubex", _StubExchange, raising=False)
+    _StubExchange.created = []
+    return ExchangePool("stubex", MarketsCache(str(tmp_path), ttl_sec=ttl))
+
+
+def test_lazy_construction(monkeypatch, tmp_path):
+    pool = _pool(monkeypatch, tmp_path)
+    assert _StubExchange.created == []
+    ex = pool.get("testnet", with_markets=False)
+    assert len(_StubExchange.created) == 1 and ex.sandbox and ex.load_calls == 0
+    assert pool.get("testnet") is ex and ex.load_calls == 1
+    assert pool.get("testnet") is ex and ex.load_calls == 1
+    # новый ключ той же сети вытесняет старый экземпляр
+    ex2 = pool.get("testnet", "k2", "s2", with_markets=False)
+    assert ex2 is not ex and ex2.params["apiKey"] == "k2"
+    assert pool.get("testnet", "k2", "s2", with_markets=False) is ex2
+
+
+def test_markets_from_disk_cache(monkeypatch, tmp_path):
+    first = _pool(monkeypatch, tmp_path).get("mainnet")
+    assert first.load_calls == 1
+    assert os.path.exists(os.path.join(str(tmp_path), "markets_stubex_mainnet.json"))
+    # «рестарт»: новый пул с тем же каталогом — рынки с диска, без load_markets
+    again = _pool(monkeypatch, tmp_path).get("mainnet")
+    assert again.load_calls == 0 and again.set_calls == 1
+    assert again.markets == _MARKETS
+
+
+def test_expired_cache_reloads(monkeypatch, tmp_path):
+    cache_file = os.path.join(str(tmp_path), "markets_stubex_mainnet.json")
+    _pool(monkeypatch, tmp_path, ttl=60.0).get("mainnet")
+    old = time.time() - 120
+    os.utime(cache_file, (old, old))
+    ex = _pool(monkeypatch, tmp_path, ttl=60.0).get("mainnet")
+    assert ex.load_calls == 1 and ex.set_calls == 0
+    assert os.path.getmtime(cache_file) > old + 60
+
+
+class _KeysDB:
+    def load_api_keys(self, network):
+        return {"api_key": "k", "api_secret": "s"}
+
+
+def test_account_manager_reuses_pool(monkeypatch, tmp_path):
+    pool = _pool(monkeypatch, tmp_path)
+    am = AccountManager(_KeysDB(), pool=pool)
+    for _ in range(3):
+        snap = am.get_balance_usdt("testnet")
+        assert snap["connected"] and snap["balance_usdt"] == 12.5
+    assert len(_StubExchange.created) == 1 and _StubExchange.created[0].load_calls == 1
+
+
+def test_load_failure_falls_back_to_expired_cache(monkeypatch, tmp_path):
+    cache_file = os.path.join(str(tmp_path), "markets_stubex_mainnet.json")
+    _pool(monkeypatch, tmp_path, ttl=60.0).get("mainnet")
+    old = time.time() - 120
+    os.utime(cache_file, (old, old))
+
+    def _down(self):
+        self.load_calls += 1
+        raise ccxt.NetworkError("exchange unreachable")
+
+    monkeypatch.setattr(_StubExchange, "load_markets", _down)
+    pool = _pool(monkeypatch, tmp_path, ttl=60.0)
+    ex = pool.get("mainnet")
+    assert ex.markets == _MARKETS and ex.set_calls == 1 and ex.load_calls == 1
+    pool.get("mainnet")  # готовность не выставлена — загрузка повторяется
+    assert ex.load_calls == 2
@@ -0,0 +1,40 @@
+"""FeatureCache: новости, пришедшие после расчёта бара, доходят до его новостных колонок."""
+import numpy as np
+import pandas as pd
+
+from database import DatabaseManager
+from features_pkg.cache import FeatureCache
+from features_pkg.matrix import build_feature_matrix
+
+
+def _db(tmp_path, n=800):
+    db = DatabaseManager(str(tmp_path / "t.db"))
+    rng = np.random.default_rng(0)
+    idx = pd.date_range(end=pd.Timestamp("2026-10-19"), periods=n, freq="1h", name="open_time")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    df = pd.DataFrame({"open": close, "high": close * 1.01, "low": close * 0.99, "close": close,
+                       "volume": rng.uniform(1, 10, n)}, index=idx)
+    db.upsert_ohlcv("BTC/USDT", "1h", df)
+    return db, idx
+
+
+def _news(db, ts, k):
+    db.add_news_many([("stub", f"t{k}", f"https://x/{k}", str(ts), "", 0.5, "BTC")])
+
+
+def test_late_news_patches_cached_rows(tmp_path):
+    db, idx = _db(tmp_path)
+    _news(db, idx[100], 0)
+    cache = FeatureCache(str(tmp_path / "fc"))
+    cached = cache.frame(db, "BTC/USDT", "1h", {}, idx)
+    assert cached["news_ct_180"].sum() > 0
+
+    # новости задним числом — в середину уже закэшированной истории
+    _news(db, idx[400] - pd.Timedelta(minutes=30), 1)
+    _news(db, idx[401], 2)
+    got = cache.frame(db, "BTC/USDT", "1h", {}, idx)
+    want = build_feature_matrix(db, db.load_ohlcv("BTC/USDT", "1h", since=None, limit=None), "1h", {})
+    news_cols = [c for c in want.columns if c.startswith("news_")]
+    assert not np.allclose(cached[news_cols].to_numpy(), want[news_cols].to_numpy())
+    np.testing.assert_allclose(got.to_numpy(), want.to_numpy(dtype=np.float32), rtol=1e-6, atol=1e-6)
+    assert cache._read_meta(cache.key("BTC/USDT", "1h", {}))["news_id"] == 3
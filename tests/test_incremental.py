@@ -0,0 +1,61 @@
+"""Дообучение: только новые бары, классы модели целиком, решающая функция не меняется от пересчёта скейлера."""
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+import features_pkg.cache as fcache
+from database import DatabaseManager
+from model_pkg.incremental import rebase_scaler, train_incremental
+from model_pkg.trainers import Trainer
+
+FS = {"label_horizon": 1, "label_eps": 0.003}
+
+
+def test_incremental_update(tmp_path, ohlcv, monkeypatch):
+    monkeypatch.setattr(fcache, "_DEFAULT", fcache.FeatureCache(str(tmp_path / "fc")))
+    df = ohlcv(1200, "1h", seed=5)
+    # хвост — ровный рост: все новые метки BUY, а модель знает три класса
+    tail = df["close"].iloc[899] * 1.01 ** np.arange(1, 301)
+    df.iloc[900:, df.columns.get_loc("close")] = tail
+    df.iloc[900:, df.columns.get_loc("open")] = tail / 1.01
+    df.iloc[900:, df.columns.get_loc("high")] = tail * 1.001
+    df.iloc[900:, df.columns.get_loc("low")] = tail / 1.011
+    db = DatabaseManager(str(tmp_path / "i.db"))
+    db.upsert_ohlcv("BTC/USDT", "1h", df)
+    trainer = Trainer(db)
+
+    Xc, yc, reason = trainer._build_xy("BTC/USDT", df.iloc[:900], "1h", FS)
+    assert reason is None and set(yc) == {-1, 0, 1}
+    scaler = StandardScaler().fit(Xc.values)
+    clf = LogisticRegression(max_iter=500).fit(scaler.transform(Xc.values), yc.values)
+    label_end = Xc.index[-1]
+    bundle = {"model": clf, "scaler": scaler, "feature_names": list(map(str, Xc.columns)), "features_settings": FS,
+              "meta": {"n_samples": len(yc), "label_end": label_end.isoformat()}}
+    v1 = trainer._save_bundle("BTC/USDT", "1h", bundle, last_full_end=df.index[899].to_pydatetime())
+
+    out = train_incremental(trainer, "BTC/USDT", "1h", "incremental")
+    new_end = df.index[-2]
+    assert out["classes"] == [-1, 0, 1]
+    assert out["n_samples"] == ((df.index > label_end) & (df.index <= new_end)).sum() == 299
+    rec = db.load_model("BTC/USDT", "1h")
+    assert rec["version"] != v1
+    meta = rec["model"]["meta"]
+    assert meta["incr_updates"] == 1 and pd.Timestamp(meta["label_end"]) == new_end
+    assert meta["n_samples"] == len(yc) + out["n_samples"]
+    # повторный вызов без новых баров — ничего не дообучает
+    again = train_incremental(trainer, "BTC/USDT", "1h", "incremental")
+    assert again["n_samples"] == 0 and again["classes"] == [-1, 0, 1]
+    assert db.load_model("BTC/USDT", "1h")["version"] == rec["version"]
+
+
+def test_rebase_scaler_keeps_decision_function():
+    rng = np.random.default_rng(0)
+    X0, X1 = rng.normal(0, 1, (300, 4)), rng.normal(2, 3, (100, 4))
+    y0 = rng.integers(-1, 2, 300)
+    scaler = StandardScaler().fit(X0)
+    clf = LogisticRegression(max_iter=500).fit(scaler.transform(X0), y0)
+    probe = rng.normal(1, 2, (20, 4))
+    before = clf.decision_function(scaler.transform(probe))
+    rebase_scaler(scaler, clf, X1)
+    np.testing.assert_allclose(clf.decision_function(scaler.transform(probe)), before, rtol=1e-9, atol=1e-9)
@@ -0,0 +1,59 @@
+"""Версии моделей: атомарная активация, метрики бэктеста в свою версию, чистка с учётом закреплённых."""
+import pytest
+
+from database import DatabaseManager
+from model_pkg.versions import ModelPins, ModelVersionJanitor
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / "m.db"))
+
+
+def _save(db, tag, tf="1h", activate=True):
+    return db.save_model("BTC/USDT", tf, "stub", {"model": None, "tag": tag}, [-1, 0, 1], ["f"],
+                         metrics={"tag": tag}, activate=activate)
+
+
+def test_activation_and_rollback(db):
+    v1 = _save(db, 1)
+    v2 = _save(db, 2, activate=False)
+    assert db.get_active_model_version("BTC/USDT", "1h") == v1
+    assert db.load_model("BTC/USDT", "1h")["model"]["tag"] == 1
+    assert db.activate_model_version("BTC/USDT", "1h", v2)
+    got = db.load_model("BTC/USDT", "1h")
+    assert got["version"] == v2 and got["model"]["tag"] == 2 and got["metrics"] == {"tag": 2}
+    assert db.load_model("BTC/USDT", "1h", version=v1)["model"]["tag"] == 1
+    # чужая пара не активирует версию
+    assert not db.activate_model_version("BTC/USDT", "4h", v1)
+    assert db.activate_model_version("BTC/USDT", "1h", v1)
+    assert [v["active"] for v in db.list_model_versions("BTC/USDT", "1h")] == [False, True]
+
+
+def test_backtest_metrics_go_to_backtested_version(db):
+    v1 = _save(db, 1)
+    v2 = _save(db, 2)  # новая версия активирована, пока бэктест v1 ещё шёл
+    db.update_model_metrics("BTC/USDT", "1h", {"bt_winrate": 55.0}, version=v1)
+    assert db.load_model("BTC/USDT", "1h")["metrics"] == {"tag": 2}
+    assert db.load_model("BTC/USDT", "1h", version=v1)["metrics"] == {"tag": 1, "bt_winrate": 55.0}
+    db.update_model_metrics("BTC/USDT", "1h", {"bt_winrate": 60.0}, version=v2)
+    assert db.load_model("BTC/USDT", "1h")["metrics"] == {"tag": 2, "bt_winrate": 60.0}
+    assert db.load_model("BTC/USDT", "1h", version=v2)["metrics"] == {"tag": 2, "bt_winrate": 60.0}
+    db.update_model_metrics("BTC/USDT", "1h", {"bt_trades_count": 7})  # без версии — активная
+    assert db.load_model("BTC/USDT", "1h", version=v2)["metrics"]["bt_trades_count"] == 7
+
+
+def test_prune_keeps_active_pinned_and_newest(db):
+    ids = [_save(db, k, activate=(k == 0)) for k in range(6)]  # активна самая старая
+    other = [_save(db, k, tf="4h") for k in range(2)]
+    pins = ModelPins()
+    janitor = ModelVersionJanitor(db, pins)
+    janitor.keep = 2
+    with pins.pin(ids[1]):
+        assert janitor.run_once() == 2
+        left = [v["version"] for v in db.list_model_versions("BTC/USDT", "1h")]
+        assert left == [ids[5], ids[4], ids[1], ids[0]]
+    assert janitor.run_once() == 1  # закрепление снято — версия удаляется
+    assert [v["version"] for v in db.list_model_versions("BTC/USDT", "1h")] == [ids[5], ids[4], ids[0]]
+    assert [v["version"] for v in db.list_model_versions("BTC/USDT", "4h")] == other[::-1]
+    assert db.load_model("BTC/USDT", "1h")["version"] == ids[0]
@@ -0,0 +1,112 @@
+"""Стратегии поиска оптимизатора с поддельным evaluate: окна halving, бюджеты, выбор лучшего только по final."""
+import random
+
+import pytest
+
+import backtest
+import optimizer
+import precompute_cache
+from optimizer_pkg.strategies import (_rounds, _sample, _grid_total, halving_search, iter_grid, local_search,
+                                      planned_evals, random_search)
+
+GRID = dict(optimizer.GridDefaults)  # 3^6 = 729 точек
+
+
+def _fake(score=lambda p, limit: sum(GRID[k].index(v) for k, v in p.items())):
+    calls = []
+
+    def evaluate(cands, limit=None, final=True):
+        calls.append((len(cands), limit, final))
+        return [(p, (float(score(p, limit)), 1)) for p in cands]
+    return evaluate, calls
+
+
+def test_rounds_integer():
+    assert _rounds(243, 3) == 5 and _rounds(242, 3) == 4
+    assert _rounds(60, 3) == 3 and _rounds(1, 3) == 1 and _rounds(8, 2) == 3
+
+
+def test_halving_windows_and_counts():
+    evaluate, calls = _fake()
+    halving_search(evaluate, GRID, limit=2000, budget=60, seed=None, rng=random.Random(0), eta=3)
+    assert calls == [(60, 222, False), (20, 666, False), (6, 2000, True)]
+    assert planned_evals(GRID, "halving", 60, 3) == sum(c[0] for c in calls)
+
+    evaluate, calls = _fake()
+    halving_search(evaluate, GRID, limit=2000, budget=243, seed=None, rng=random.Random(0), eta=3)
+    assert [c[0] for c in calls] == [243, 81, 27, 9, 3]
+    assert [c[2] for c in calls] == [False] * 4 + [True]
+    assert planned_evals(GRID, "halving", 243, 3) == 363
+
+
+def test_planned_evals_match_calls():
+    evaluate, calls = _fake()
+    random_search(evaluate, GRID, limit=2000, budget=60, seed={"hold_margin": 0.05}, rng=random.Random(1), eta=3)
+    assert sum(c[0] for c in calls) == planned_evals(GRID, "random", 60) == 60
+
+    # каждый новый кандидат лучше предыдущих — локальный спуск делает все 3 прохода
+    seq = iter(range(10_000))
+    evaluate, calls = _fake(lambda p, limit: next(seq))
+    local_search(evaluate, GRID, limit=2000, budget=1000, seed=None, rng=random.Random(0), eta=3)
+    assert sum(c[0] for c in calls) == planned_evals(GRID, "local", 1000) == 1 + 3 * 6 * 2
+    assert sum(c[0] for c in _run_local(budget=10)) <= planned_evals(GRID, "local", 10) == 10
+
+
+def _run_local(budget):
+    evaluate, calls = _fake()
+    local_search(evaluate, GRID, limit=2000, budget=budget, seed=None, rng=random.Random(0), eta=3)
+    return calls
+
+
+def test_local_search_reaches_separable_optimum():
+    target = {k: v[-1] for k, v in GRID.items()}
+    seen = []
+    evaluate, _ = _fake()
+
+    def tracking(cands, limit=None, final=True):
+        res = evaluate(cands, limit, final)
+        seen.extend(res)
+        return res
+    local_search(tracking, GRID, limit=2000, budget=1000, seed=None, rng=random.Random(0), eta=3)
+    assert max(seen, key=lambda r: r[1])[0] == target
+
+
+def test_sample_distinct_seed_first_and_small_grid():
+    seed = {k: v[0] for k, v in GRID.items()}
+    pts = _sample(GRID, 50, random.Random(3), seed)
+    assert pts[0] == seed and len(pts) == 50
+    assert len({tuple(sorted(p.items())) for p in pts}) == 50
+    assert all(p[k] in GRID[k] for p in pts for k in GRID)
+    small = {"a": [1, 2], "b": [3]}
+    assert _sample(small, 10, random.Random(0)) == list(iter_grid(small)) and _grid_total(small) == 2
+
+
+def test_only_final_windows_feed_best(monkeypatch):
+    calls = []
+
+    def fake_backtest(db, models, symbol, tf, win, thr, hm, mch, sl, tp, mb, precomp):
+        p = {"signal_threshold": thr, "hold_margin": hm, "min_confirmed_higher": mch,
+             "sl_atr_mult": sl, "tp_atr_mult": tp, "max_bars_in_trade": mb}
+        short = sum(GRID[k].index(v) for k, v in p.items())
+        # на коротких окнах winrate до 99, на полном — не выше 50: лучший должен прийти только из final
+        wr = 99.0 - short if win < 2000 else 50.0 - short / 10.0
+        calls.append((win, wr))
+        return {"stats": {"winrate": wr, "count": 5}}
+
+    class _DB:
+        def load_model_params(self, *a):
+            return None
+
+        def save_model_params(self, *a):
+            self.saved = a
+
+    monkeypatch.setattr(backtest, "run_backtest", fake_backtest)
+    monkeypatch.setattr(precompute_cache, "build_precompute", lambda *a, **k: None)
+    monkeypatch.setattr(optimizer.Config, "OPTIMIZE_BUDGET", 60, raising=False)
+    monkeypatch.setattr(optimizer.Config, "OPTIMIZE_HALVING_ETA", 3, raising=False)
+    res = optimizer.optimize_symbol_tf(_DB(), None, "BTC/USDT", "1h", grid=GRID, limit=2000,
+                                       strategy="halving", objective="winrate")
+    final = [wr for win, wr in calls if win == 2000]
+    assert len(final) == 6 and res["evaluated"] == len(calls) == 86
+    assert res["best"]["stats"]["winrate"] == pytest.approx(max(final))
+    assert max(wr for win, wr in calls if win < 2000) > max(final)
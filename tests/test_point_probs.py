@@ -0,0 +1,75 @@
+"""point_probs: вероятности одного бара совпадают с build_precompute + probs_at_row; новая версия — промах LRU."""
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+import features_pkg.cache as fcache
+from database import DatabaseManager
+from precompute_pkg import point
+from precompute_pkg.align import probs_at_row
+from precompute_pkg.core import build_precompute
+
+
+class _Models:
+    def __init__(self, bundles):
+        self.bundles = bundles
+
+    def get_model_bundle(self, symbol, timeframe):
+        return self.bundles.get(timeframe)
+
+
+def _bundle(db, tf, seed):
+    df = db.load_ohlcv("BTC/USDT", tf)
+    X = fcache.feature_frame(db, "BTC/USDT", tf, {}, df)
+    y = np.random.default_rng(seed).integers(-1, 2, len(X))
+    scaler = StandardScaler().fit(np.nan_to_num(X.to_numpy(dtype=float)))
+    clf = LogisticRegression(max_iter=500).fit(scaler.transform(np.nan_to_num(X.to_numpy(dtype=float))), y)
+    return {"model": clf, "scaler": scaler, "feature_names": list(X.columns), "features_settings": {}, "version": 1}
+
+
+@pytest.fixture
+def env(tmp_path, ohlcv, monkeypatch):
+    monkeypatch.setattr(point.Config, "TIMEFRAMES", ["1h", "4h"], raising=False)
+    monkeypatch.setattr(point.Config, "FEATURE_CACHE_ENABLED", True, raising=False)
+    monkeypatch.setattr(fcache, "_DEFAULT", fcache.FeatureCache(str(tmp_path / "fc")))
+    monkeypatch.setattr(point, "_DEFAULT", point.PointProbCache())
+    db = DatabaseManager(str(tmp_path / "p.db"))
+    db.upsert_ohlcv("BTC/USDT", "1h", ohlcv(1600, "1h", seed=3))
+    db.upsert_ohlcv("BTC/USDT", "4h", ohlcv(500, "4h", seed=4))
+    return db, _Models({"1h": _bundle(db, "1h", 0), "4h": _bundle(db, "4h", 1)})
+
+
+def test_point_equals_precompute_row(env):
+    db, models = env
+    pre = build_precompute(db, models, "BTC/USDT", "1h", limit=1000)
+    for i in (-1, -2, -37, -400):
+        t = pre["X_idx"][i]
+        got = point.point_probs(db, models, "BTC/USDT", "1h", t)
+        assert got["ts"] == t
+        want = probs_at_row(pre, "1h", i)
+        assert set(got["probs"]) == set(want) == {"1h", "4h"}
+        for tf in want:
+            for k in ("buy", "hold", "sell"):
+                assert got["probs"][tf][k] == pytest.approx(want[tf][k], rel=1e-6, abs=1e-9)
+
+
+def test_new_version_misses_point_cache(env):
+    db, models = env
+    t = db.load_ohlcv("BTC/USDT", "1h").index[-5]
+    assert point.point_probs(db, models, "BTC/USDT", "1h", t)["cached"] == 0
+    assert point.point_probs(db, models, "BTC/USDT", "1h", t)["cached"] == 2
+    models.bundles["1h"] = {**models.bundles["1h"], "version": 2}
+    again = point.point_probs(db, models, "BTC/USDT", "1h", t)
+    assert again["cached"] == 1 and again["versions"] == {"1h": 2, "4h": 1}
+
+
+def test_bar_without_features_is_skipped(env, monkeypatch):
+    db, models = env
+    t = db.load_ohlcv("BTC/USDT", "1h").index[-5]
+    real = point.feature_frame
+    # у кэша признаков нет строки последнего бара 4h — ТФ пропускается, а не берётся чужая строка
+    monkeypatch.setattr(point, "feature_frame", lambda db, s, tf, st, win: real(db, s, tf, st, win).iloc[:-1]
+                        if tf == "4h" else real(db, s, tf, st, win))
+    got = point.point_probs(db, models, "BTC/USDT", "1h", t)
+    assert set(got["probs"]) == {"1h"}
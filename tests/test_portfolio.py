@@ -0,0 +1,47 @@
+"""Портфельный бэктест: общий капитал, лимит позиций, комиссии и переоценка по барам (ручной расчёт)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_pkg import portfolio
+
+
+def _arrays(symbol, closes, ok, direction, max_bars):
+    n = len(closes)
+    c = np.asarray(closes, dtype=float)
+    return {
+        "symbol": symbol,
+        "params": {"sl_atr_mult": 1000.0, "tp_atr_mult": 1000.0, "max_bars_in_trade": max_bars},
+        "bars": pd.date_range("2026-01-01", periods=n, freq="1h"),
+        "in_df": np.ones(n, dtype=bool),
+        "ok": np.asarray(ok, dtype=bool),
+        "dir": np.full(n, direction),
+        "close": c, "high": c, "low": c, "atr": np.ones(n),
+    }
+
+
+def test_shared_capital_one_position(monkeypatch):
+    arrays = {
+        # A: BUY на t0 по 100, выход по max_bars на t2 по 121
+        "A": _arrays("A", [100, 110, 121, 121, 121], [1, 0, 0, 0, 0], 1, 2),
+        # B: SELL-сигнал на каждом баре; до t2 место занято A, вход на t2 по 40, закрытие в конце по 36
+        "B": _arrays("B", [50, 50, 40, 36, 36], [1, 1, 1, 1, 1], -1, 100),
+    }
+    monkeypatch.setattr(portfolio, "symbol_arrays", lambda db, models, s, tf, limit, pre=None: arrays[s])
+    monkeypatch.setattr(portfolio.Config, "EXIT_ON_FLIP", False, raising=False)
+    res = portfolio.run_portfolio_backtest(None, None, "1h", symbols=["A", "B"], limit=5, capital=1000.0,
+                                           max_positions=1, position_pct=0.5, fee_pct=0.1)
+
+    fee = 0.001
+    cash_a = 1000.0 + 500.0 * 0.21 - 500.0 * fee * 2          # 1104
+    size_b = cash_a * 0.5                                      # 552 — от реализованного капитала
+    pnl_b = size_b * (40.0 / 36.0 - 1.0) - size_b * fee * 2
+    st = res["stats"]
+    assert st["skipped_signals"] == 2                           # B на t0 и t1
+    assert st["count"] == 2
+    assert st["final_equity"] == pytest.approx(cash_a + pnl_b)
+    expected = [1000.0, 1000.0 + 500.0 * 0.1, cash_a, cash_a + size_b * (40.0 / 36.0 - 1.0), cash_a + pnl_b]
+    np.testing.assert_allclose(res["equity"]["equity"], expected)
+    assert res["equity"]["time"][0] == "2026-01-01T00:00:00"
+    assert [t["symbol"] for t in res["trades"]] == ["A", "B"]
+    assert [t["size"] for t in res["trades"]] == pytest.approx([500.0, size_b])
@@ -0,0 +1,59 @@
+"""ProbStore: виды совпадают с build_precompute, каждая модель скорится один раз на задание."""
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+import features_pkg.cache as fcache
+from database import DatabaseManager
+from precompute_pkg import core
+from precompute_pkg.align import gather_probs
+from precompute_pkg.prob_store import ProbStore
+
+
+class _Models:
+    def __init__(self, bundles):
+        self.bundles = bundles
+
+    def get_model_bundle(self, symbol, timeframe):
+        return self.bundles.get(timeframe)
+
+
+def _bundle(db, tf, seed, version):
+    X = fcache.feature_frame(db, "BTC/USDT", tf, {}, db.load_ohlcv("BTC/USDT", tf))
+    Xv = np.nan_to_num(X.to_numpy(dtype=float))
+    scaler = StandardScaler().fit(Xv)
+    clf = LogisticRegression(max_iter=500).fit(scaler.transform(Xv), np.random.default_rng(seed).integers(-1, 2, len(X)))
+    return {"model": clf, "scaler": scaler, "feature_names": list(X.columns), "features_settings": {}, "version": version}
+
+
+@pytest.fixture
+def env(tmp_path, ohlcv, monkeypatch):
+    monkeypatch.setattr(core.Config, "TIMEFRAMES", ["1h", "4h"], raising=False)
+    monkeypatch.setattr(core.Config, "FEATURE_CACHE_ENABLED", True, raising=False)
+    monkeypatch.setattr(fcache, "_DEFAULT", fcache.FeatureCache(str(tmp_path / "fc")))
+    db = DatabaseManager(str(tmp_path / "s.db"))
+    db.upsert_ohlcv("BTC/USDT", "1h", ohlcv(3000, "1h", seed=11))
+    db.upsert_ohlcv("BTC/USDT", "4h", ohlcv(1200, "4h", seed=12))
+    return db, _Models({"1h": _bundle(db, "1h", 0, 7), "4h": _bundle(db, "4h", 1, 9)})
+
+
+def test_view_equals_build_precompute(env):
+    db, models = env
+    with ProbStore(db, models, "BTC/USDT", limit=3000) as store:
+        for limit in (1000, 1500, 3000):
+            view = store.view("1h", limit)
+            want = core.build_precompute(db, models, "BTC/USDT", "1h", limit=limit)
+            assert view["X_idx"].equals(want["X_idx"]) and view["df_use"].equals(want["df_use"])
+            assert view["versions"] == want["versions"] == {"1h": 7, "4h": 9}
+            for k in ("pb_buy", "pb_hold", "pb_sell"):
+                np.testing.assert_array_equal(view["base"][k], want["base"][k])
+            got_m, want_m = gather_probs(view, "1h"), gather_probs(want, "1h")
+            assert got_m[0] == want_m[0] == ["1h", "4h"]
+            for a, b in zip(got_m[1:], want_m[1:]):
+                np.testing.assert_allclose(a, b, rtol=1e-12, atol=1e-12, equal_nan=True)
+            assert not np.isnan(got_m[1][:, 1]).all()
+        assert store.view("4h", 1000)["versions"] == {"4h": 9, "1h": 7}
+        assert store.stats()["scored"] == 2 and store.stats()["views"] == 4
+        # окно больше общего — честный пересчёт напрямую
+        assert len(store.view("1h", 4000)["X_idx"]) == 3000 and store.stats()["fallbacks"] == 1
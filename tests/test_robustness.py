@@ -0,0 +1,43 @@
+"""trade_robustness: инварианты перестановок, вырожденные случаи и независимость от размера блока."""
+import numpy as np
+import pytest
+
+from backtest_pkg import robustness
+from backtest_pkg.robustness import trade_robustness
+
+PNL = [2.0, -1.0, 3.5, -2.5, 0.5, -0.7, 4.0, -3.0, 1.2, 0.0, -1.5, 2.2]
+
+
+def test_permute_keeps_return_and_winrate():
+    out = trade_robustness(PNL, n_paths=500, method="permute", ci=90)
+    want = (np.prod(1.0 + np.array(PNL) / 100.0) - 1.0) * 100.0
+    for k in ("lo", "median", "hi", "mean"):
+        assert out["return_pct"][k] == pytest.approx(want, rel=1e-9)
+        assert out["winrate"][k] == pytest.approx(100.0 * 6 / 12)
+    assert out["prob_loss"] in (0.0, 1.0)
+    assert out["max_drawdown"]["hi"] > out["max_drawdown"]["lo"]  # порядок сделок влияет только на просадку
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "permute"])
+def test_single_trade_has_zero_width(method):
+    out = trade_robustness([-3.0], n_paths=200, method=method)
+    for key, want in (("return_pct", -3.0), ("max_drawdown", 3.0), ("winrate", 0.0)):
+        s = out[key]
+        assert s["lo"] == s["median"] == s["hi"]
+        assert s["median"] == pytest.approx(want)
+    assert out["prob_loss"] == 1.0
+
+
+def test_total_loss_is_clipped_not_nan():
+    out = trade_robustness([-100.0, 5.0, -120.0], n_paths=300)
+    vals = [v for key in ("return_pct", "max_drawdown", "winrate") for v in out[key].values()]
+    assert np.all(np.isfinite(vals))
+    assert out["return_pct"]["lo"] >= -100.0 and out["max_drawdown"]["hi"] <= 100.0
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "permute"])
+def test_chunking_equals_one_block(monkeypatch, method):
+    whole = trade_robustness(PNL, n_paths=1000, method=method, seed=7)
+    monkeypatch.setattr(robustness, "_CHUNK_CELLS", len(PNL) * 37)  # 37 путей на блок, последний — неполный
+    chunked = trade_robustness(PNL, n_paths=1000, method=method, seed=7)
+    assert chunked == whole
@@ -0,0 +1,80 @@
+"""Пакетная агрегация сигналов совпадает с прежним скалярным aggregate_signal (бар за баром)."""
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from signal_pkg import agg as agg_mod
+from signal_pkg.agg import _tf_score_from_pb, aggregate_signal
+from signal_pkg.batch import aggregate_signal_batch, weights_vector
+
+TFS = ["15m", "1h", "4h", "1d"]
+
+
+def _reference(probs_by_tf: Dict[str, Dict[str, float]], weights_cfg: Dict[str, float], lookback_scores: List[float] | None,
+               sig_lookback: int) -> Dict:
+    # прежняя скалярная реализация (до пакетного API) — эталон
+    def norm(w):
+        s = sum(max(0.0, float(v)) for v in w.values())
+        if s <= 0:
+            return {k: 1.0 / max(1, len(w)) for k in w}
+        return {k: max(0.0, float(v)) / s for k, v in w.items()}
+
+    usable = {tf: probs_by_tf[tf] for tf in probs_by_tf if tf in weights_cfg}
+    if not usable:
+        usable = probs_by_tf
+        weights = norm({tf: 1.0 for tf in usable})
+    else:
+        weights = norm({tf: weights_cfg[tf] for tf in usable})
+    per_tf = {tf: _tf_score_from_pb(pb) for tf, pb in usable.items()}
+    agg = float(sum(per_tf[tf] * weights.get(tf, 0.0) for tf in per_tf))
+    if lookback_scores:
+        lk = list(lookback_scores)[-sig_lookback:]
+        if lk:
+            agg = float(np.mean(lk + [agg]))
+    d = 1 if agg > 1e-9 else (-1 if agg < -1e-9 else 0)
+    support = 0.0
+    if d != 0:
+        total_w = sum(weights.values()) or 1.0
+        support = sum(weights.get(tf, 0.0) for tf, s in per_tf.items() if np.sign(s) == d and abs(s) > 0) / total_w
+    return {"score": float(np.clip(agg, -1, 1)), "dir": d, "support": float(np.clip(support, 0, 1)), "per_tf": per_tf}
+
+
+def _probs(rng, n):
+    raw = rng.dirichlet([1.0, 1.0, 1.0], size=(n, len(TFS)))
+    return raw[..., 0], raw[..., 1], raw[..., 2]
+
+
+WEIGHTS = [{"15m": 0.1, "1h": 0.3, "4h": 0.4, "1d": 0.2}, {"1h": 1.0, "4h": 2.0}, {"1h": 0.0, "4h": 0.0}, {"1w": 1.0}]
+
+
+@pytest.mark.parametrize("weights_cfg", WEIGHTS)
+@pytest.mark.parametrize("sig_lookback", [0, 1, 2, 5])
+def test_scalar_matches_reference(monkeypatch, weights_cfg, sig_lookback):
+    monkeypatch.setattr(agg_mod.Config, "SIG_LOOKBACK", sig_lookback, raising=False)
+    rng = np.random.default_rng(sig_lookback)
+    buy, hold, sell = _probs(rng, 40)
+    for i in range(40):
+        pbt = {tf: {"buy": buy[i, j], "hold": hold[i, j], "sell": sell[i, j]} for j, tf in enumerate(TFS)}
+        hist = list(rng.uniform(-0.5, 0.5, i % 7)) or None
+        got, want = aggregate_signal(pbt, "1h", weights_cfg, hist), _reference(pbt, weights_cfg, hist, sig_lookback)
+        assert got["score"] == pytest.approx(want["score"], abs=1e-12)
+        assert got["dir"] == want["dir"] and got["support"] == pytest.approx(want["support"], abs=1e-12)
+        assert got["per_tf"] == pytest.approx(want["per_tf"], abs=1e-15)
+
+
+@pytest.mark.parametrize("lookback", [0, 1, 3])
+def test_batch_matches_bar_by_bar(lookback):
+    rng = np.random.default_rng(lookback)
+    buy, hold, sell = _probs(rng, 300)
+    buy[::7, 2] = hold[::7, 2] = sell[::7, 2] = np.nan  # у старшего ТФ ещё нет закрытого бара
+    weights_cfg = WEIGHTS[0]
+    out = aggregate_signal_batch(buy, hold, sell, weights_vector(TFS, weights_cfg), lookback=lookback)
+    hist: List[float] = []
+    for i in range(300):
+        pbt = {tf: {"buy": buy[i, j], "hold": hold[i, j], "sell": sell[i, j]}
+               for j, tf in enumerate(TFS) if not np.isnan(buy[i, j])}
+        want = _reference(pbt, weights_cfg, hist[-lookback:] if lookback else None, lookback)
+        assert out["score"][i] == pytest.approx(want["score"], abs=1e-12)
+        assert out["dir"][i] == want["dir"] and out["support"][i] == pytest.approx(want["support"], abs=1e-12)
+        hist.append(want["score"])
@@ -0,0 +1,66 @@
+"""Панель сигнала: колоночный вывод побитово совпадает с прежним циклом по барам (aggregate_signal + decide_entry)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from panels_pkg import signal_panel
+from precompute_pkg.align import asof_positions, tf_delta
+from signal_pkg.agg import aggregate_signal
+from signal_pkg.decisions import decide_entry
+
+HIGHER = {"4h": 400, "1d": 80}
+
+
+def _precomp(n=1500, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def probs(idx):
+        p = rng.dirichlet([1.0, 1.0, 1.0], size=len(idx))
+        return {"pb_buy": p[:, 0], "pb_hold": p[:, 1], "pb_sell": p[:, 2], "idx": idx}
+
+    base_idx = pd.date_range(end="2026-10-19", periods=n, freq="1h", name="open_time")
+    higher = {tf: probs(pd.date_range(end="2026-10-19", periods=m, freq=tf_delta(tf), name="open_time")) for tf, m in HIGHER.items()}
+    return {"X_idx": base_idx, "base": probs(base_idx), "higher": higher}
+
+
+def _old_loop(precomp, limit, thr):
+    # прежняя реализация панели (бар за баром), с выравниванием старших ТФ по закрытию бара
+    take = precomp["X_idx"][-limit:]
+    base = {k: precomp["base"][k][-len(take):] for k in ("pb_buy", "pb_hold", "pb_sell")}
+    pos = {tf: asof_positions(take, "1h", h["idx"], tf) for tf, h in precomp["higher"].items()}
+    out = {"time": [], "score": [], "support": [], "dir": [], "entry": []}
+    lookbacks = []
+    for i, ts in enumerate(take):
+        pbt = {"1h": {"buy": float(base["pb_buy"][i]), "hold": float(base["pb_hold"][i]), "sell": float(base["pb_sell"][i])}}
+        for tf, h in precomp["higher"].items():
+            p = pos[tf][i]
+            if p >= 0:
+                pbt[tf] = {"buy": float(h["pb_buy"][p]), "hold": float(h["pb_hold"][p]), "sell": float(h["pb_sell"][p])}
+        agg = aggregate_signal(pbt, "1h", signal_panel.Config.HIERARCHY_WEIGHTS, lookback_scores=lookbacks)
+        lookbacks.append(agg["score"])
+        if len(lookbacks) > max(1, signal_panel.Config.SIG_LOOKBACK * 3):
+            lookbacks.pop(0)
+        ok, d, _ = decide_entry(agg, pbt["1h"], entry_threshold=thr[0], min_support=thr[1], hold_margin_min=thr[2])
+        out["time"].append(ts.isoformat())
+        out["score"].append(float(agg["score"]))
+        out["support"].append(float(agg["support"]))
+        out["dir"].append(int(np.sign(agg["score"])))
+        out["entry"].append(1.0 if (ok and d != 0) else 0.0)
+    return out
+
+
+@pytest.mark.parametrize("sig_lookback", [0, 2, 5])
+def test_columnar_panel_equals_old_loop(monkeypatch, sig_lookback):
+    monkeypatch.setattr(signal_panel.Config, "SIG_LOOKBACK", sig_lookback, raising=False)
+    monkeypatch.setattr(signal_panel.Config, "HIERARCHY_WEIGHTS", {"1h": 0.5, "4h": 0.3, "1d": 0.2}, raising=False)
+    precomp = _precomp(seed=sig_lookback)
+    monkeypatch.setattr(signal_panel, "build_precompute", lambda db, models, s, tf, limit: precomp)
+    thr = (0.05, 0.5, -0.2)
+    got = signal_panel.build_signal_panel(None, None, "BTC/USDT", "1h", 1000, *thr)
+    want = _old_loop(precomp, 1000, thr)
+    assert got["format"] == "columnar" and got["thresholds"] == {"entry": 0.05, "min_support": 0.5, "hold_margin_min": -0.2}
+    for k in ("time", "dir", "entry"):
+        assert got[k] == want[k]
+    for k in ("score", "support"):
+        np.testing.assert_array_equal(np.array(got[k]), np.array(want[k]))  # побитово
+    assert 0 < sum(got["entry"]) < len(got["entry"])
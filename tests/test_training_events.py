@@ -0,0 +1,75 @@
+"""Шина событий обучения: gap после рестарта сервера и вытеснения, прореживание status-событий, время записей журнала."""
+import threading
+import time
+
+import pandas as pd
+
+from api_pkg.jobs.events import TrainingEventBus
+from api_pkg.jobs.log_sink import TrainingLogSink
+from database import DatabaseManager
+
+
+def test_last_id_from_previous_process_is_gap():
+    bus = TrainingEventBus()
+    bus.publish("log", 1, {"message": "x"})
+    events, gap = bus.wait(5000, timeout=0.1)
+    assert gap and events == []
+    assert bus.wait(1, timeout=0.01) == ([], False)
+
+
+def test_status_events_are_coalesced():
+    bus = TrainingEventBus()
+    sink = TrainingLogSink(None, flush_sec=3600, bus=bus)
+    n = 3645
+    for i in range(n + 1):
+        sink.status(7, "running", 0.80 + 0.17 * i / n, f"optimizing 1h {i}/{n}")
+    sink.status(7, "running", 0.97, "backtesting 1h")
+    sink.status(7, "finished", 1.0, "done")
+    events, _ = bus.wait(0, timeout=0.01)
+    assert len(events) < 100
+    assert [e[3]["message"] for e in events[-2:]] == ["backtesting 1h", "done"]
+    assert sink.get_status(7)["status"] == "finished"
+
+
+def test_flushed_logs_keep_capture_time(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # файлы журналов заданий пишутся в ./logs
+    db = DatabaseManager(str(tmp_path / "t.db"))
+    sink = TrainingLogSink(db, flush_sec=3600)
+    sink.log(3, "INFO", "train", "first")
+    captured = sink._rows[-1][5]
+    time.sleep(1.1)
+    assert sink.flush()
+    rows = db.get_training_logs(3)
+    assert [r["message"] for r in rows] == ["first"]
+    assert rows[0]["ts"] == pd.Timestamp(captured)
+
+
+def test_job_reconnect_ignores_other_jobs_eviction():
+    bus = TrainingEventBus(max_events=100)
+    first = bus.publish("log", 1, {"message": "a"})
+    seen = bus.publish("log", 1, {"message": "b"})
+    for i in range(300):
+        bus.publish("log", 2, {"message": str(i)})
+    # события задания 1 вытеснены чужими, но все уже доставлены — переподключение без reset
+    assert bus.wait(seen, job_id=1, timeout=0.01) == ([], False)
+    # недоставленное событие задания 1 вытеснено — gap только для него
+    assert bus.wait(first, job_id=1, timeout=0.01) == ([], True)
+    assert bus.wait(first, timeout=0.01)[1]
+    eid = bus.publish("log", 1, {"message": "c"})
+    events, gap = bus.wait(seen, job_id=1, timeout=0.01)
+    assert not gap and [e[0] for e in events] == [eid]
+
+
+def test_job_waiter_returns_only_its_events():
+    bus = TrainingEventBus()
+    start = bus.last_id()
+    got = {}
+    t = threading.Thread(target=lambda: got.setdefault("r", bus.wait(start, job_id=5, timeout=5.0)))
+    t.start()
+    for i in range(50):
+        bus.publish("log", 6, {"message": str(i)})
+    eid = bus.publish("status", 5, {"status": "running"})
+    t.join(5.0)
+    events, gap = got["r"]
+    assert not gap and [(e[0], e[2]) for e in events] == [(eid, 5)]
+    assert bus._job_conds == {}
@@ -0,0 +1,85 @@
+"""Очередь обучения: слияние дублей по тикеру, восстановление после рестарта, один тикер — один воркер."""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from api_pkg.jobs import queue as tq
+from api_pkg.jobs import training_runner
+from api_pkg.jobs.events import TrainingEventBus
+from database import DatabaseManager
+
+
+@pytest.fixture
+def sv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # кэш статусов заданий пишется в ./logs
+    monkeypatch.setattr(tq.Config, "TIMEFRAMES", ["15m", "1h", "4h"], raising=False)
+    return SimpleNamespace(db=DatabaseManager(str(tmp_path / "q.db")), train_events=TrainingEventBus())
+
+
+def test_duplicates_coalesce(sv):
+    q = tq.TrainingQueue(sv, workers=1)
+    a, merged = q.submit("BTC/USDT", ["4h"], 1, "auto", False)
+    assert not merged
+    b, merged = q.submit("BTC/USDT", ["1h", "4h"], 3, "full", True, priority=5)
+    assert merged and b == a
+    assert q.submit("BTC/USDT", ["15m"], 2, "auto", False, priority=1) == (a, True)
+    e, merged = q.submit("ETH/USDT", ["1h"], 1, "auto", True, priority=2)
+    assert not merged and e != a
+    want = {"years": 3, "mode": "full", "optimize": True}
+    assert [(j["id"], j["timeframes"], j["priority"]) for j in q.pending()] == [(a, ["15m", "1h", "4h"], 5), (e, ["1h"], 2)]
+    assert q.pending()[0]["params"] == want
+    row = next(j for j in sv.db.list_training_jobs() if j["id"] == a)
+    assert (row["timeframes"], row["priority"], row["params"]) == (["15m", "1h", "4h"], 5, want)
+    assert sv.train_events.job_state(a)["timeframes"] == ["15m", "1h", "4h"]
+
+
+def test_restart_requeues_orphans(sv):
+    done = sv.db.create_training_job("SOL/USDT", ["1h"])
+    sv.db.update_training_job(done, status="finished")
+    orphan = sv.db.create_training_job("BTC/USDT", ["1h"], priority=1, params={"years": 2, "mode": "full", "optimize": False})
+    sv.db.update_training_job(orphan, status="running", progress=0.4)
+    waiting = sv.db.create_training_job("ETH/USDT", ["4h"], priority=3, params={"years": 1, "mode": "auto", "optimize": True})
+    q = tq.TrainingQueue(sv, workers=1)
+    q._recover()
+    assert [(j["id"], j["params"]["mode"]) for j in q.pending()] == [(waiting, "auto"), (orphan, "full")]
+    assert {j["id"]: j["status"] for j in sv.db.list_training_jobs()} == {orphan: "queued", waiting: "queued"}
+    assert sv.train_events.job_state(orphan)["message"] == "requeued after restart"
+    # восстановленное задание сливает дубли так же, как поставленное в этом процессе
+    assert q.submit("BTC/USDT", ["4h"], 1, "auto", True) == (orphan, True)
+
+
+def test_one_symbol_never_runs_twice(sv, monkeypatch):
+    runs, lock = [], threading.Lock()
+    release = threading.Event()
+
+    def fake_run(_sv, job_id, symbol, tfs, years, mode, do_opt):
+        with lock:
+            runs.append(("start", job_id, symbol))
+        release.wait(5.0)
+        with lock:
+            runs.append(("end", job_id, symbol))
+
+    monkeypatch.setattr(training_runner, "run_training_job", fake_run)
+    q = tq.TrainingQueue(sv, workers=2)
+    q.start()
+    try:
+        first, _ = q.submit("BTC/USDT", ["1h"], 1, "auto", False)
+        while not runs:
+            time.sleep(0.01)
+        # первое BTC уже обучается — новое не сливается с ним и ждёт, ETH идёт во второй воркер
+        second, merged = q.submit("BTC/USDT", ["4h"], 1, "auto", False, priority=9)
+        other, _ = q.submit("ETH/USDT", ["1h"], 1, "auto", False)
+        assert not merged and second != first
+        deadline = time.time() + 5
+        while len(runs) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert runs == [("start", first, "BTC/USDT"), ("start", other, "ETH/USDT")]
+        release.set()
+        while len(runs) < 6 and time.time() < deadline:
+            time.sleep(0.01)
+        assert runs.index(("start", second, "BTC/USDT")) > runs.index(("end", first, "BTC/USDT"))
+    finally:
+        release.set()
+        q.stop()
@@ -0,0 +1,44 @@
+"""Walk-forward: фолды в пуле не выходят за CPU-бюджет вызывающего."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from model_pkg import validation
+from utils.cpu_budget import CpuBudget
+
+
+def _run(monkeypatch, budget, busy):
+    state = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def fake_fold(*_a):
+        with lock:
+            state["now"] += 1
+            state["max"] = max(state["max"], state["now"])
+        time.sleep(0.05)
+        with lock:
+            state["now"] -= 1
+        return {"train_n": 1, "test_n": 1, "logloss": 0.5, "acc": 0.5}
+
+    pool = ThreadPoolExecutor(max_workers=8)
+    monkeypatch.setattr(validation, "_fit_fold", fake_fold)
+    monkeypatch.setattr(validation, "_get_pool", lambda reset=False: pool)
+    monkeypatch.setattr(validation, "cpu_budget", lambda: budget)
+    taken = budget.try_acquire(busy)
+    rng = np.random.default_rng(0)
+    with budget.slot():
+        out = validation.walk_forward_validate(rng.normal(size=(1200, 3)), rng.integers(0, 3, 1200), n_folds=5, purge=1)
+    budget.release(taken)
+    pool.shutdown()
+    return out, state["max"]
+
+
+def test_folds_limited_by_free_slots(monkeypatch):
+    budget = CpuBudget(4)
+    out, peak = _run(monkeypatch, budget, busy=3)  # занято всё, кроме слота вызывающего
+    assert len(out["wf_folds"]) == 5 and peak == 1
+    out, peak = _run(monkeypatch, budget, busy=1)
+    assert peak == 3
+    assert budget.in_use() == 0
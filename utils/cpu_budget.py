@@ -0,0 +1,65 @@
+from __future__ import annotations
+import threading
+from contextlib import contextmanager
+
+from config import Config
+
+
+class CpuBudget:
+    """
+    Глобальный бюджет CPU для «листовых» задач (обучение ТФ, precompute, бэктест комбинации).
+    Вложенные пулы потоков могут быть любого размера: одновременно считают не более `total` задач.
+    Повторный захват в том же потоке не требует нового слота (нет взаимоблокировок при вложенности).
+    """
+    def __init__(self, total: int):
+        self.total = max(1, int(total))
+        self._free = self.total
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    @contextmanager
+    def slot(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            with self._cond:
+                while self._free <= 0:
+                    self._cond.wait()
+                self._free -= 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                with self._cond:
+                    self._free += 1
+                    self._cond.notify()
+
+    def try_acquire(self, n: int) -> int:
+        """Без ожидания взять до n свободных слотов (подзадачи вне потоков: процессы фолдов); вернуть, сколько взято."""
+        with self._cond:
+            got = max(0, min(int(n), self._free))
+            self._free -= got
+            return got
+
+    def release(self, n: int) -> None:
+        if n > 0:
+            with self._cond:
+                self._free += int(n)
+                self._cond.notify(int(n))
+
+    def in_use(self) -> int:
+        with self._cond:
+            return self.total - self._free
+
+
+_BUDGET: CpuBudget | None = None
+_BUDGET_LOCK = threading.Lock()
+
+
+def cpu_budget() -> CpuBudget:
+    global _BUDGET
+    with _BUDGET_LOCK:
+        if _BUDGET is None:
+            _BUDGET = CpuBudget(int(getattr(Config, "CPU_BUDGET", 4)))
+        return _BUDGET